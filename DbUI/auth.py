@@ -72,7 +72,8 @@ def enforce_session_expiration():
         "/auth/login",
         "/auth/logout",
         "/static",
-        "/favicon.ico"
+        "/favicon.ico",
+        "/metrics"  # scrapers; checked by DbUI.ui.metrics_access instead
     ]
     if any(request.path.startswith(p) for p in allowed_paths):
         return
@@ -1,75 +1,99 @@
-import time
-from datetime import datetime, timedelta
-from gpio.sensors import read_sensor_data
-from gpio.shutters import operate_shutter
+import threading
+from gpio.sensor_cache import sensor_cache, get_latest_sensor_data
+from gpio.shutters import operate_shutter, operation_intended_actions
 from management.logger import log_event
+from management import clock
+from management.config import stop_event, SENSOR_MAX_AGE
+from DbUI.settings import get_device_settings, add_settings_listener
+from DbUI.database import get_device_position
+from management.devices import device_names
 
-# Constants for automation settings
-SIDEWALL_OPEN_SETPOINT = 75.0  # °F
-SIDEWALL_CLOSE_SETPOINT = 70.0  # °F
-SHUTTER_OPEN_SETPOINT = 65.0  # °F
-SHUTTER_CLOSE_SETPOINT = 60.0  # °F
+# Clock time (management.clock) of each device's last automated movement. The idle-time
+# deadline is derived from it on every evaluation so setting edits apply at once.
+last_operation_time = {}
 
-SHUTTER_IDLE_TIME = timedelta(minutes=1)  # Minimum time between movements
-SIDEWALL_IDLE_TIME = timedelta(minutes=3)  # Minimum time between movements
+# Set by new sensor samples, settings changes and shutdown to wake the scheduler
+_wake = threading.Event()
 
-SHUTTER_RUNTIME = 15  # Seconds
-SIDEWALL_RUNTIME = 60  # Seconds
+def wake_automation():
+    """Wake the scheduler immediately (used on shutdown and settings changes)."""
+    _wake.set()
 
-# Last operation timestamps
-last_shutter_operation = None
-last_sidewall_operation = None
+def determine_action(rules: dict, temperature: float):
+    """Return "open", "close" or None for a device's setpoints."""
+    if temperature >= rules["open_setpoint"]:
+        return "open"
+    if temperature <= rules["close_setpoint"]:
+        return "close"
+    return None
 
-def automate_shutters_and_sidewalls():
+def evaluate_device(device: str, rules: dict, temperature: float, now: float):
     """
-    Automate the operation of shutters and sidewalls based on temperature.
+    Evaluate one device against the latest temperature.
+
+    Returns the clock deadline at which the device should be
+    re-evaluated because its idle time blocked a wanted move, or None.
     """
-    global last_shutter_operation, last_sidewall_operation
+    action = determine_action(rules, temperature)
+    if action is None:
+        return None
+    if operation_intended_actions.get(device) == action:
+        return None  # already moving that way
+    if get_device_position(device) == ("closed" if action == "close" else "open"):
+        return None  # already there; don't run the motor again
 
-    while True:
-        try:
-            # Read the current temperature
-            data = read_sensor_data()
-            if "error" in data:
-                log_event(f"[ERROR] Failed to read sensor data: {data['error']}")
-                time.sleep(5)  # Retry after 5 seconds
-                continue
+    last_operation = last_operation_time.get(device)
+    if last_operation is not None and now < last_operation + rules["idle_time"]:
+        return last_operation + rules["idle_time"]
 
-            temperature = data["temperature"]
-            log_event(f"Current temperature: {temperature:.2f} °F")
+    log_event(f"Automation: {temperature:.2f} °F crossed the {action} setpoint for {device}; "
+              f"initiating {action}.")
+    operate_shutter(device, action)
+    last_operation_time[device] = now
+    return None
 
-            # Automate sidewall
-            now = datetime.now()
-            if temperature >= SIDEWALL_OPEN_SETPOINT:
-                if last_sidewall_operation is None or now - last_sidewall_operation >= SIDEWALL_IDLE_TIME:
-                    log_event("Temperature exceeds sidewall open setpoint. Opening sidewall.")
-                    operate_shutter("Slug Sidewall", "open")
-                    last_sidewall_operation = now
-                    time.sleep(SIDEWALL_RUNTIME)
-            elif temperature <= SIDEWALL_CLOSE_SETPOINT:
-                if last_sidewall_operation is None or now - last_sidewall_operation >= SIDEWALL_IDLE_TIME:
-                    log_event("Temperature below sidewall close setpoint. Closing sidewall.")
-                    operate_shutter("Slug Sidewall", "close")
-                    last_sidewall_operation = now
-                    time.sleep(SIDEWALL_RUNTIME)
+def automate_shutters_and_sidewalls():
+    """
+    Automate the operation of shutters and sidewalls based on temperature.
 
-            # Automate shutter
-            if temperature >= SHUTTER_OPEN_SETPOINT:
-                if last_shutter_operation is None or now - last_shutter_operation >= SHUTTER_IDLE_TIME:
-                    log_event("Temperature exceeds shutter open setpoint. Opening shutter.")
-                    operate_shutter("Slug Shutter", "open")
-                    last_shutter_operation = now
-                    time.sleep(SHUTTER_RUNTIME)
-            elif temperature <= SHUTTER_CLOSE_SETPOINT:
-                if last_shutter_operation is None or now - last_shutter_operation >= SHUTTER_IDLE_TIME:
-                    log_event("Temperature below shutter close setpoint. Closing shutter.")
-                    operate_shutter("Slug Shutter", "close")
-                    last_shutter_operation = now
-                    time.sleep(SHUTTER_RUNTIME)
+    Runs as a single scheduler: it sleeps on an Event that is set by every
+    new sensor sample, settings change and shutdown, evaluates each device independently
+    and enforces per-device idle times as deadlines rather than sleeps.
+    """
+    sensor_cache.add_listener(_wake.set)
+    add_settings_listener(_wake.set)
+    sensor_error_logged = False
+    log_event("Automation scheduler started.")
 
-            # Sleep for a short interval before checking again
-            time.sleep(5)
+    try:
+        while not stop_event.is_set():
+            _wake.clear()
+            timeout = SENSOR_MAX_AGE
+            try:
+                data = get_latest_sensor_data()
+                if "error" in data:
+                    if not sensor_error_logged:
+                        age = f" ({data['age']:.0f}s old)" if "age" in data else ""
+                        log_event(f"[ERROR] Failed to read sensor data: {data['error']}{age}")
+                        sensor_error_logged = True
+                else:
+                    sensor_error_logged = False
+                    now = clock.monotonic()
+                    deadlines = []
+                    # Setpoints and idle times come from the settings snapshot,
+                    # so edits apply on the next evaluation.
+                    for device in device_names():
+                        rules = get_device_settings(device)
+                        deadline = evaluate_device(device, rules, data["temperature"], now)
+                        if deadline is not None:
+                            deadlines.append(deadline)
+                    if deadlines:
+                        timeout = min(timeout, max(0.0, min(deadlines) - now))
+            except Exception as e:
+                log_event(f"[ERROR] Exception in automation loop: {e}")
 
-        except Exception as e:
-            log_event(f"[ERROR] Exception in automation loop: {e}")
-            time.sleep(5)  # Retry after 5 seconds
+            # Sleep until the next sample, the next idle deadline or shutdown.
+            clock.wait(_wake, timeout)
+    finally:
+        sensor_cache.remove_listener(_wake.set)
+        log_event("Automation scheduler stopped.")
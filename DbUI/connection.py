@@ -0,0 +1,106 @@
+"""
+FarmPi5 Greenhouse Control System - Database Connection Management
+
+All SQLite access goes through this module. Connections are opened once,
+configured for WAL journaling with a busy timeout, and kept in a small pool
+so HTTP threads, shutter threads and the automation loop reuse them instead
+of opening, parsing and closing the database file on every call.
+
+Each pooled connection keeps its own prepared statement cache, so callers
+should pass fixed SQL strings with ? parameters rather than formatting
+values into the query text.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from management.config import DB_FILE, DB_BUSY_TIMEOUT, DB_POOL_SIZE
+from management.metrics import sqlite_transaction_seconds, sqlite_errors_total
+
+_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)  # idle connections, most recently used first
+_local = threading.local()                      # connection checked out by the current thread
+_all_connections = set()
+_all_connections_lock = threading.Lock()
+
+
+def _open_connection() -> sqlite3.Connection:
+    """Open and configure a new connection to DB_FILE."""
+    conn = sqlite3.connect(
+        DB_FILE,
+        timeout=DB_BUSY_TIMEOUT,
+        check_same_thread=False,   # safe: a connection is only used by one thread at a time
+        cached_statements=256,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}")
+    with _all_connections_lock:
+        _all_connections.add(conn)
+    return conn
+
+
+def _discard_connection(conn: sqlite3.Connection):
+    with _all_connections_lock:
+        _all_connections.discard(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+@contextmanager
+def get_connection():
+    """
+    Check out a pooled connection for the duration of the with-block.
+
+    The outermost block commits on success and rolls back on error. Nested
+    blocks in the same thread reuse the already checked-out connection.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        yield conn
+        return
+
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+
+    _local.conn = conn
+    started = time.perf_counter()
+    try:
+        with conn:
+            yield conn
+    except sqlite3.DatabaseError:
+        sqlite_errors_total.inc()
+        # Don't hand a possibly broken connection back to the pool.
+        _local.conn = None
+        _discard_connection(conn)
+        raise
+    finally:
+        sqlite_transaction_seconds.observe(time.perf_counter() - started)
+        if _local.conn is conn:
+            _local.conn = None
+            try:
+                _pool.put_nowait(conn)
+            except queue.Full:
+                _discard_connection(conn)
+
+
+def close_all_connections():
+    """Close every connection opened by the pool (used at shutdown)."""
+    while True:
+        try:
+            _pool.get_nowait()
+        except queue.Empty:
+            break
+    with _all_connections_lock:
+        connections = list(_all_connections)
+        _all_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
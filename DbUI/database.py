@@ -1,50 +1,304 @@
+import time
+from datetime import datetime
 from management.logger import log_event
-from management.config import DB_FILE
-import sqlite3
+from management.events import publish_event
+from DbUI.connection import get_connection
+from DbUI.samples import create_sample_tables
+from DbUI.settings import create_settings_table, load_settings
+from management.devices import device_names
+
+# Categories stored in logs.category, used to filter the log views in SQL.
+LOG_CATEGORIES = ("temperature", "shutter", "system")
+SHUTTER_KEYWORDS = ("shutter", "sidewall", "motor")
+RECENT_LOG_WINDOW = 24 * 60 * 60  # seconds of history in the "last 24 hours" views
+LOG_PAGE_SIZE = 200               # default rows per keyset page
+LOG_PAGE_SIZE_MAX = 1000
+
+# Legacy logs.timestamp formats written before timestamps were stored as epoch seconds.
+LEGACY_TIMESTAMP_FORMATS = ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %H:%M:%S")
+
+LOGS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp REAL NOT NULL,
+        category TEXT NOT NULL CHECK(category IN ('temperature', 'shutter', 'system')),
+        event TEXT NOT NULL
+    )
+'''
+
+# Positions persisted for crash recovery. "opening"/"closing" mean a motor
+# was running when the position was recorded.
+DEVICE_POSITIONS = ("open", "closed", "opening", "closing", "unknown")
+
+def _migration_1_base_schema(c):
+    """Shutters, logs (epoch timestamps), samples and settings tables."""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS shutters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL CHECK(name IN ('Slug Sidewall', 'Slug Shutter')),
+            status TEXT NOT NULL CHECK(status IN ('open', 'closed', 'automatic', 'live'))
+        )
+    ''')
+    _migrate_logs_table(c)
+    c.execute(LOGS_TABLE_SQL)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_logs_category_timestamp ON logs(category, timestamp)")
+    create_sample_tables(c)
+    create_settings_table(c)
+
+def _migration_2_device_position(c):
+    """Persist each device's last known position and when it was recorded."""
+    c.execute("ALTER TABLE shutters ADD COLUMN position TEXT NOT NULL DEFAULT 'unknown'")
+    c.execute("ALTER TABLE shutters ADD COLUMN position_updated REAL")
+    c.execute('''
+        UPDATE shutters SET position = status, position_updated = ?
+        WHERE status IN ('open', 'closed')
+    ''', (time.time(),))
+
+def _migration_3_registry_devices(c):
+    """Drop the hardcoded device-name CHECK so any registered device can be stored."""
+    c.execute("ALTER TABLE shutters RENAME TO shutters_old")
+    c.execute('''
+        CREATE TABLE shutters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('open', 'closed', 'automatic', 'live')),
+            position TEXT NOT NULL DEFAULT 'unknown',
+            position_updated REAL
+        )
+    ''')
+    c.execute('''
+        INSERT INTO shutters (id, name, status, position, position_updated)
+        SELECT id, name, status, position, position_updated FROM shutters_old
+    ''')
+    c.execute("DROP TABLE shutters_old")
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run, so existing data is upgraded in place and never rebuilt.
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_device_position,
+    _migration_3_registry_devices,
+]
 
 def init_db():
     """
-    Initialize the shutter database with shutters and logs tables.
+    Bring the database schema up to date and reconcile device state.
+
+    Pending migrations run in a single transaction. Existing shutter rows are
+    kept; registered devices without a row are added in automatic mode.
     """
     try:
-        with sqlite3.connect(DB_FILE) as conn:
+        with get_connection() as conn:
             c = conn.cursor()
-            # Drop existing table if it exists
-            c.execute('DROP TABLE IF EXISTS shutters')
-            
-            # Recreate with updated constraint including 'live'
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS shutters (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL CHECK(name IN ('Slug Sidewall', 'Slug Shutter')),
-                    status TEXT NOT NULL CHECK(status IN ('open', 'closed', 'automatic', 'live'))
-                )
-            ''')
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    event TEXT NOT NULL
-                )
-            ''')
-            # Initialize default values
-            c.execute("INSERT INTO shutters (name, status) VALUES ('Slug Sidewall', 'automatic')")
-            c.execute("INSERT INTO shutters (name, status) VALUES ('Slug Shutter', 'automatic')")
-            conn.commit()
-        log_event("Database initialized with updated schema.")
+            c.execute("BEGIN IMMEDIATE")
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            for number in range(version, len(MIGRATIONS)):
+                MIGRATIONS[number](c)
+                c.execute(f"PRAGMA user_version = {number + 1}")
+            c.executemany("INSERT OR IGNORE INTO shutters (name, status) VALUES (?, 'automatic')",
+                          [(name,) for name in device_names()])
+        if version < len(MIGRATIONS):
+            log_event(f"Database schema migrated from version {version} to {len(MIGRATIONS)}.")
+        reconcile_device_states()
+        load_settings()
+        log_event("Database initialized.")
     except Exception as e:
         log_event(f"ERROR: Database initialization failed: {e}")
 
+def reconcile_device_states():
+    """
+    Recover device state after a restart instead of resetting it.
+
+    A device whose motor was running when the process stopped ("live" status,
+    "opening"/"closing" position) is in an unknown position: its status falls
+    back to its last settled position, or automatic if there is none.
+    Devices that were at rest keep their status and position, so no motor
+    has to run just because the controller restarted.
+    """
+    try:
+        with get_connection() as conn:
+            rows = conn.execute("SELECT name, status, position, position_updated FROM shutters").fetchall()
+            for name, status, position, position_updated in rows:
+                new_position = position
+                if position in ("opening", "closing"):
+                    new_position = "unknown"
+                new_status = status
+                if status == "live":
+                    new_status = new_position if new_position in ("open", "closed") else "automatic"
+                if (new_status, new_position) == (status, position):
+                    continue
+                conn.execute(
+                    "UPDATE shutters SET status = ?, position = ?, position_updated = ? WHERE name = ?",
+                    (new_status, new_position, time.time(), name)
+                )
+                log_event(f"Recovered {name}: status {status} -> {new_status}, "
+                          f"position {position} -> {new_position} (last recorded "
+                          f"{format_log_time(position_updated) if position_updated else 'never'}).")
+    except Exception as e:
+        log_event(f"ERROR: Could not reconcile device states: {e}")
+
+def _parse_legacy_timestamp(value) -> float:
+    """Convert a pre-epoch logs.timestamp value to epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    for fmt in LEGACY_TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return 0.0
+
+def _migrate_logs_table(c):
+    """
+    Convert a logs table with 12-hour string timestamps and no category
+    column to the epoch/category schema, keeping every row.
+    """
+    columns = [row[1] for row in c.execute("PRAGMA table_info(logs)")]
+    if not columns or "category" in columns:
+        return
+
+    c.execute("ALTER TABLE logs RENAME TO logs_legacy")
+    c.execute(LOGS_TABLE_SQL)
+    rows = c.execute("SELECT id, timestamp, event FROM logs_legacy ORDER BY id").fetchall()
+    c.executemany(
+        "INSERT INTO logs (id, timestamp, category, event) VALUES (?, ?, ?, ?)",
+        [(row_id, _parse_legacy_timestamp(ts), categorize_event(event), event)
+         for row_id, ts, event in rows]
+    )
+    c.execute("DROP TABLE logs_legacy")
+    log_event(f"Database: migrated {len(rows)} log rows to epoch timestamps.")
+
+def categorize_event(event: str) -> str:
+    """
+    Pick the logs.category for an event message.
+    """
+    text = event.lower()
+    if "temperature" in text:
+        return "temperature"
+    if any(keyword in text for keyword in SHUTTER_KEYWORDS):
+        return "shutter"
+    return "system"
+
+def format_log_time(timestamp: float) -> str:
+    """Format an epoch log timestamp for display."""
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %I:%M %p")
+
+def insert_log_event(event: str, category: str = None):
+    """
+    Insert an event into the logs table with the current epoch time.
+    The category is derived from the message when not given.
+    """
+    if category is None:
+        category = categorize_event(event)
+    try:
+        with get_connection() as conn:
+            conn.execute(
+                "INSERT INTO logs (timestamp, category, event) VALUES (?, ?, ?)",
+                (time.time(), category, event)
+            )
+    except Exception as e:
+        log_event(f"[ERROR] Failed to insert log event: {e}")
+
+def get_logs(since: float = None, categories=None, limit: int = None) -> list:
+    """
+    Return (timestamp, event) rows, newest first, using the logs indexes.
+
+    Args:
+        since: Only return rows with timestamp >= since (epoch seconds)
+        categories: Iterable of categories to include (default: all)
+        limit: Maximum number of rows to return
+    """
+    clauses = []
+    params = []
+    if categories is not None:
+        categories = tuple(categories)
+        clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+
+    query = "SELECT timestamp, event FROM logs"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY timestamp DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    try:
+        with get_connection() as conn:
+            return conn.execute(query, params).fetchall()
+    except Exception as e:
+        log_event(f"ERROR: Could not fetch logs: {e}")
+        return []
+
+def get_logs_page(categories=None, since: float = None, before: tuple = None,
+                  limit: int = LOG_PAGE_SIZE) -> list:
+    """
+    Return one keyset page of (id, timestamp, category, event) rows, newest first.
+
+    Args:
+        categories: Iterable of categories to include (default: all)
+        since: Only return rows with timestamp >= since (epoch seconds)
+        before: (timestamp, id) of the last row of the previous page
+        limit: Maximum number of rows in the page
+
+    The page is an index range scan starting at the cursor, so fetching
+    page N costs the same as fetching page 1.
+    """
+    clauses = []
+    params = []
+    if categories is not None:
+        categories = tuple(categories)
+        clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if before is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+
+    query = "SELECT id, timestamp, category, event FROM logs"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit)
+
+    try:
+        with get_connection() as conn:
+            return conn.execute(query, params).fetchall()
+    except Exception as e:
+        log_event(f"ERROR: Could not fetch log page: {e}")
+        return []
+
+def iter_logs(categories=None, since: float = None, page_size: int = LOG_PAGE_SIZE):
+    """
+    Yield (id, timestamp, category, event) rows, newest first, one keyset
+    page at a time. Memory use is bounded by page_size and no connection or
+    read transaction is held between pages.
+    """
+    before = None
+    while True:
+        page = get_logs_page(categories=categories, since=since, before=before, limit=page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        last_id, last_ts = page[-1][0], page[-1][1]
+        before = (last_ts, last_id)
+
 def update_shutter_status(shutter_name: str, new_status: str):
     """
     Update shutter status in the database.
     """
     try:
-        with sqlite3.connect(DB_FILE) as conn:
+        with get_connection() as conn:
             c = conn.cursor()
             c.execute("UPDATE shutters SET status = ? WHERE name = ?", (new_status, shutter_name))
-            conn.commit()
         log_event(f"Database: Shutter '{shutter_name}' status updated to {new_status}.")
+        publish_event("status", {"device": shutter_name, "status": new_status})
     except Exception as e:
         log_event(f"ERROR: Database update failed for {shutter_name}: {e}")
 
@@ -53,7 +307,7 @@ def get_shutter_status(shutter_name: str) -> str:
     Retrieve the current status of a shutter from the database.
     """
     try:
-        with sqlite3.connect(DB_FILE) as conn:
+        with get_connection() as conn:
             c = conn.cursor()
             c.execute("SELECT status FROM shutters WHERE name = ?", (shutter_name,))
             result = c.fetchone()
@@ -62,4 +316,57 @@ def get_shutter_status(shutter_name: str) -> str:
             return "unknown"
     except Exception as e:
         log_event(f"ERROR: Could not retrieve status for {shutter_name}: {e}")
-        return "error"
\ No newline at end of file
+        return "error"
+
+def record_device_position(shutter_name: str, position: str, status: str = None):
+    """
+    Persist a device's position (and optionally its status) with a timestamp.
+    """
+    try:
+        with get_connection() as conn:
+            if status is None:
+                conn.execute(
+                    "UPDATE shutters SET position = ?, position_updated = ? WHERE name = ?",
+                    (position, time.time(), shutter_name)
+                )
+            else:
+                conn.execute(
+                    "UPDATE shutters SET status = ?, position = ?, position_updated = ? WHERE name = ?",
+                    (status, position, time.time(), shutter_name)
+                )
+    except Exception as e:
+        log_event(f"ERROR: Could not record position for {shutter_name}: {e}")
+        return
+    event = {"device": shutter_name, "position": position}
+    if status is not None:
+        event["status"] = status
+    publish_event("status", event)
+
+def get_device_position(shutter_name: str) -> str:
+    """
+    Return the last recorded position of a device ("unknown" if not recorded).
+    """
+    try:
+        with get_connection() as conn:
+            result = conn.execute("SELECT position FROM shutters WHERE name = ?", (shutter_name,)).fetchone()
+            return result[0] if result else "unknown"
+    except Exception as e:
+        log_event(f"ERROR: Could not retrieve position for {shutter_name}: {e}")
+        return "unknown"
+
+def get_all_device_states() -> dict:
+    """
+    Return {name: {"status", "position", "position_updated"}} for every device row in one query.
+    """
+    try:
+        with get_connection() as conn:
+            rows = conn.execute(
+                "SELECT name, status, position, position_updated FROM shutters ORDER BY id"
+            ).fetchall()
+    except Exception as e:
+        log_event(f"ERROR: Could not retrieve device states: {e}")
+        return {}
+    return {
+        name: {"status": status, "position": position, "position_updated": position_updated}
+        for name, status, position, position_updated in rows
+    }
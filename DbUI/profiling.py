@@ -0,0 +1,182 @@
+"""
+FarmPi5 Greenhouse Control System - Request Profiler
+
+Werkzeug's ProfilerMiddleware wrapped around the dashboard so it can be
+switched on in the field (main.py --profile, or POST /admin/profiler)
+without a redeploy. While enabled, each request is run under cProfile and
+its stats are dumped to PROFILE_DIR, which is pruned to the newest
+PROFILE_MAX_FILES files. /admin/profiler/summary aggregates the dumps with
+pstats and lists the top functions, so a slow query or template shows up
+by name.
+
+cProfile can only run one profile at a time, so a request arriving while
+another one is being profiled is served unprofiled. Streaming endpoints in
+PROFILE_SKIP_PATHS are never profiled because the middleware buffers the
+whole response.
+"""
+
+import io
+import os
+import re
+import threading
+import pstats
+from flask import Blueprint, Response, jsonify, request
+from werkzeug.middleware.profiler import ProfilerMiddleware
+from DbUI.auth import login_required
+from management.logger import log_event
+from management.config import (PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_TOP_N, PROFILE_TOP_MAX,
+                               PROFILE_SKIP_PATHS)
+
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls")
+
+
+class RequestProfiler:
+    """
+    WSGI wrapper that profiles requests while enabled and passes them
+    straight through otherwise.
+    """
+
+    def __init__(self, profile_dir: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES,
+                 skip_paths: tuple = PROFILE_SKIP_PATHS):
+        self.profile_dir = profile_dir
+        self.max_files = max_files
+        self.skip_paths = tuple(skip_paths)
+        self.enabled = False
+        self._app = None
+        self._middleware = None
+        self._busy = threading.Lock()    # one cProfile session at a time
+        self._files_lock = threading.Lock()
+
+    def wrap(self, wsgi_app):
+        """Return the WSGI callable to install as app.wsgi_app."""
+        self._app = wsgi_app
+        self._middleware = ProfilerMiddleware(wsgi_app, stream=None, profile_dir=self.profile_dir,
+                                              filename_format=self._filename)
+        return self
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if (not self.enabled or path.startswith(self.skip_paths)
+                or not self._busy.acquire(blocking=False)):
+            return self._app(environ, start_response)
+        try:
+            return self._middleware(environ, start_response)
+        finally:
+            self._busy.release()
+            self._prune()
+
+    def enable(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.enabled = True
+        log_event(f"Request profiler enabled; writing profiles to {self.profile_dir}/.")
+
+    def disable(self):
+        self.enabled = False
+        log_event("Request profiler disabled.")
+
+    @staticmethod
+    def _filename(environ) -> str:
+        info = environ["werkzeug.profiler"]
+        path = re.sub(r"[^A-Za-z0-9_-]+", "_", environ.get("PATH_INFO", "").strip("/")) or "root"
+        return f"{info['time'] * 1000:.0f}.{environ['REQUEST_METHOD']}.{path[:80]}.{info['elapsed']:.0f}ms.prof"
+
+    def _files(self) -> list:
+        """Profile file names, oldest first."""
+        try:
+            names = [name for name in os.listdir(self.profile_dir)
+                     if name.endswith(".prof") and name.split(".", 1)[0].isdigit()]
+        except FileNotFoundError:
+            return []
+        return sorted(names, key=lambda name: int(name.split(".", 1)[0]))
+
+    def _prune(self):
+        with self._files_lock:
+            names = self._files()
+            for name in names[:max(0, len(names) - self.max_files)]:
+                try:
+                    os.remove(os.path.join(self.profile_dir, name))
+                except OSError:
+                    pass
+
+    def profiles(self) -> list:
+        """Recorded profiles, newest first, as dicts parsed from their file names."""
+        result = []
+        for name in reversed(self._files()):
+            parts = name[:-len(".prof")].split(".")
+            if len(parts) != 4:
+                continue
+            stamp, method, path, elapsed = parts
+            # path is the request path with "/" and other unsafe characters as "_"
+            result.append({"name": name, "time": int(stamp) / 1000, "method": method,
+                           "path": path, "elapsed_ms": int(elapsed[:-len("ms")])})
+        return result
+
+    def summary(self, top: int = PROFILE_TOP_N, sort: str = "cumulative", names: list = None) -> str:
+        """
+        pstats listing of the top functions across the given profiles (all
+        recorded profiles by default).
+        """
+        names = names or self._files()
+        paths = [os.path.join(self.profile_dir, os.path.basename(name)) for name in names]
+        paths = [path for path in paths if os.path.exists(path)]
+        if not paths:
+            return "No profiles recorded.\n"
+        out = io.StringIO()
+        stats = pstats.Stats(paths[0], stream=out)
+        for path in paths[1:]:
+            stats.add(path)
+        print(f"{len(paths)} profile(s), sorted by {sort}", file=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(top)
+        return out.getvalue()
+
+    def clear(self):
+        with self._files_lock:
+            for name in self._files():
+                try:
+                    os.remove(os.path.join(self.profile_dir, name))
+                except OSError:
+                    pass
+
+
+# Shared profiler wrapped around DbUI.ui.app
+request_profiler = RequestProfiler()
+
+profiler = Blueprint("profiler", __name__, url_prefix="/admin/profiler")
+
+@profiler.route("", methods=["GET"])
+@login_required
+def profiler_status():
+    return jsonify({"enabled": request_profiler.enabled, "profiles": request_profiler.profiles()})
+
+@profiler.route("", methods=["POST"])
+@login_required
+def toggle_profiler():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get("enabled"), bool):
+        return jsonify({"message": 'Expected {"enabled": true|false}.'}), 400
+    if body["enabled"]:
+        request_profiler.enable()
+    else:
+        request_profiler.disable()
+    return jsonify({"enabled": request_profiler.enabled})
+
+@profiler.route("/summary")
+@login_required
+def profiler_summary():
+    """
+    Top-N functions across all profiles, or one (?profile=<name>);
+    ?sort=cumulative|tottime|calls, ?top=N (1 to PROFILE_TOP_MAX).
+    """
+    sort = request.args.get("sort", "cumulative")
+    if sort not in PROFILE_SORT_KEYS:
+        return jsonify({"message": f"sort must be one of {', '.join(PROFILE_SORT_KEYS)}."}), 400
+    # Non-numeric values fall back to the default; pstats misreads zero or negative counts
+    top = min(max(request.args.get("top", PROFILE_TOP_N, type=int), 1), PROFILE_TOP_MAX)
+    names = request.args.getlist("profile") or None
+    return Response(request_profiler.summary(top, sort, names), mimetype="text/plain")
+
+@profiler.route("/clear", methods=["POST"])
+@login_required
+def clear_profiles():
+    request_profiler.clear()
+    return jsonify({"profiles": []})
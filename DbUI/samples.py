@@ -0,0 +1,159 @@
+"""
+FarmPi5 Greenhouse Control System - Sensor Sample Store
+
+Typed storage for temperature and humidity samples fed by the sensor
+monitoring loop. Each sample is written to the raw samples table and folded
+into 1-minute, 15-minute and hourly min/max/avg rollups in the same
+transaction, so history queries read a few hundred pre-aggregated rows
+instead of scanning the raw data.
+"""
+
+import threading
+import time
+from management.logger import log_event
+from management.config import SAMPLE_RETENTION
+from DbUI.connection import get_connection
+
+# Rollup resolutions in seconds, keyed by the name used in the API.
+ROLLUP_RESOLUTIONS = {
+    "1m": 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+}
+PRUNE_INTERVAL = 60 * 60  # seconds between deletions of expired raw samples
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def create_sample_tables(c):
+    """
+    Create the samples and sample_rollups tables (called from init_db).
+    """
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS samples (
+            timestamp REAL NOT NULL,
+            temperature REAL NOT NULL,
+            humidity REAL NOT NULL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_samples_timestamp ON samples(timestamp)")
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sample_rollups (
+            resolution INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            temperature_min REAL NOT NULL,
+            temperature_max REAL NOT NULL,
+            temperature_sum REAL NOT NULL,
+            humidity_min REAL NOT NULL,
+            humidity_max REAL NOT NULL,
+            humidity_sum REAL NOT NULL,
+            PRIMARY KEY (resolution, bucket)
+        ) WITHOUT ROWID
+    ''')
+
+
+def record_sample(temperature: float, humidity: float, timestamp: float = None):
+    """
+    Store one sample and update every rollup bucket it falls into.
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    rollup_rows = [
+        (resolution, int(timestamp // resolution) * resolution,
+         temperature, temperature, temperature, humidity, humidity, humidity)
+        for resolution in ROLLUP_RESOLUTIONS.values()
+    ]
+    try:
+        with get_connection() as conn:
+            conn.execute(
+                "INSERT INTO samples (timestamp, temperature, humidity) VALUES (?, ?, ?)",
+                (timestamp, temperature, humidity)
+            )
+            conn.executemany('''
+                INSERT INTO sample_rollups (resolution, bucket, count,
+                    temperature_min, temperature_max, temperature_sum,
+                    humidity_min, humidity_max, humidity_sum)
+                VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (resolution, bucket) DO UPDATE SET
+                    count = count + 1,
+                    temperature_min = min(temperature_min, excluded.temperature_min),
+                    temperature_max = max(temperature_max, excluded.temperature_max),
+                    temperature_sum = temperature_sum + excluded.temperature_sum,
+                    humidity_min = min(humidity_min, excluded.humidity_min),
+                    humidity_max = max(humidity_max, excluded.humidity_max),
+                    humidity_sum = humidity_sum + excluded.humidity_sum
+            ''', rollup_rows)
+    except Exception as e:
+        log_event(f"ERROR: Could not record sensor sample: {e}")
+        return
+
+    _prune_if_due(timestamp)
+
+
+def _prune_if_due(now: float):
+    """Delete raw samples older than SAMPLE_RETENTION at most once per PRUNE_INTERVAL."""
+    global _last_prune
+    with _prune_lock:
+        if now - _last_prune < PRUNE_INTERVAL:
+            return
+        _last_prune = now
+    try:
+        with get_connection() as conn:
+            conn.execute("DELETE FROM samples WHERE timestamp < ?", (now - SAMPLE_RETENTION,))
+    except Exception as e:
+        log_event(f"ERROR: Could not prune old sensor samples: {e}")
+
+
+def get_samples(since: float, until: float = None) -> list:
+    """
+    Return raw (timestamp, temperature, humidity) samples in a time window, oldest first.
+    """
+    if until is None:
+        until = time.time()
+    try:
+        with get_connection() as conn:
+            return conn.execute(
+                "SELECT timestamp, temperature, humidity FROM samples "
+                "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+                (since, until)
+            ).fetchall()
+    except Exception as e:
+        log_event(f"ERROR: Could not fetch sensor samples: {e}")
+        return []
+
+
+def get_rollups(resolution: str, since: float, until: float = None) -> list:
+    """
+    Return rollup rows for a resolution ("1m", "15m" or "1h"), oldest first.
+
+    Each row is a dict with the bucket start time, sample count and the
+    min/max/avg temperature and humidity over the bucket.
+    """
+    seconds = ROLLUP_RESOLUTIONS[resolution]
+    if until is None:
+        until = time.time()
+    try:
+        with get_connection() as conn:
+            rows = conn.execute('''
+                SELECT bucket, count,
+                       temperature_min, temperature_max, temperature_sum / count,
+                       humidity_min, humidity_max, humidity_sum / count
+                FROM sample_rollups
+                WHERE resolution = ? AND bucket >= ? AND bucket < ?
+                ORDER BY bucket
+            ''', (seconds, int(since // seconds) * seconds, until)).fetchall()
+    except Exception as e:
+        log_event(f"ERROR: Could not fetch sensor rollups: {e}")
+        return []
+
+    return [
+        {
+            "timestamp": bucket,
+            "count": count,
+            "temperature": {"min": t_min, "max": t_max, "avg": t_avg},
+            "humidity": {"min": h_min, "max": h_max, "avg": h_avg},
+        }
+        for bucket, count, t_min, t_max, t_avg, h_min, h_max, h_avg in rows
+    ]
@@ -0,0 +1,378 @@
+"""
+FarmPi5 Greenhouse Control System - Production Web Server
+
+Werkzeug's WSGI server with a fixed pool of request threads instead of
+one new thread per connection (main.py --server production):
+
+- At most WEB_WORKERS connections are served at once; while they are all
+  busy the accept loop stops and new connections wait in the kernel's
+  listen backlog, so a burst of clients cannot exhaust the Pi's memory.
+- Server-Sent Events responses (/events, one per open dashboard tab) never
+  end, so they are handed off to a thread of their own and the worker goes
+  back to the pool. At most WEB_MAX_STREAMS streams are open at once;
+  further ones are answered with 503.
+- Connections are HTTP/1.1 keep-alive. An idle connection is closed after
+  WEB_KEEPALIVE_TIMEOUT, and a client that stalls mid-request after
+  WEB_REQUEST_TIMEOUT, so slow clients cannot pin the workers.
+- serve() returns once stop_event is set: it stops accepting, lets
+  in-flight requests finish for up to WEB_DRAIN_TIMEOUT and closes the
+  listening socket, so the caller shuts the hardware down afterwards
+  instead of exiting from inside a signal handler.
+- With reuse_port several web processes (main.py --role web) can listen on
+  the same port; the kernel spreads new connections across them.
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from werkzeug.exceptions import InternalServerError, ServiceUnavailable
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from management.logger import log_event
+from management.metrics import registry
+from management.config import (WEB_WORKERS, WEB_LISTEN_BACKLOG, WEB_REQUEST_TIMEOUT,
+                               WEB_KEEPALIVE_TIMEOUT, WEB_DRAIN_TIMEOUT, WEB_MAX_STREAMS)
+
+
+def _is_event_stream(headers) -> bool:
+    return any(name.lower() == "content-type" and value.startswith("text/event-stream")
+               for name, value in headers or ())
+
+
+class _RequestBody:
+    """
+    wsgi.input limited to the request's Content-Length, so whatever the
+    application left unread can be skipped before the next request.
+    """
+
+    def __init__(self, stream, length: int):
+        self._stream = stream
+        self.remaining = length
+
+    def _limit(self, size) -> int:
+        if size is None or size < 0 or size > self.remaining:
+            return self.remaining
+        return size
+
+    def read(self, size: int = -1) -> bytes:
+        size = self._limit(size)
+        data = self._stream.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        size = self._limit(size)
+        data = self._stream.readline(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+    def drain(self) -> bool:
+        """Discard the unread body. False if the client went away first."""
+        while self.remaining > 0:
+            if not self.read(min(self.remaining, 64 * 1024)):
+                return False
+        return True
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """
+    Keep-alive handler with separate idle and request timeouts.
+
+    Werkzeug's own run_wsgi always answers "Connection: close" and then
+    reads whatever is left on the socket, which would swallow the next
+    request on a kept-alive connection. This run_wsgi frames every
+    response (Content-Length or chunked) and only skips the declared
+    request body instead.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without TCP_NODELAY a kept-alive
+    # connection stalls ~40 ms per response on the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        self.timeout = self.server.request_timeout  # applied to the socket by setup()
+        super().setup()
+
+    def handle_one_request(self):
+        if getattr(self, "_served", False):
+            # Wait for the next request on this connection, but not forever.
+            self.connection.settimeout(self.server.keepalive_timeout)
+            try:
+                if not self.rfile.peek(1):
+                    self.close_connection = True
+                    return
+            except OSError:
+                self.close_connection = True
+                return
+            self.connection.settimeout(self.server.request_timeout)
+        self._served = True
+        super().handle_one_request()
+        if self.server.draining:
+            self.close_connection = True
+
+    def run_wsgi(self):
+        if self.headers.get("Expect", "").lower().strip() == "100-continue":
+            self.wfile.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        environ = self.make_environ()
+        body = None
+        if "wsgi.input_terminated" not in environ:  # chunked request bodies are not kept alive
+            length = environ.get("CONTENT_LENGTH", "")
+            body = _RequestBody(self.rfile, int(length) if length.isdigit() else 0)
+            environ["wsgi.input"] = body
+        keep_alive = (body is not None and self.request_version == "HTTP/1.1"
+                      and not self.close_connection and not self.server.draining)
+        response = {"status": None, "headers": None, "sent": False, "chunked": False}
+
+        def write(data: bytes):
+            if not response["sent"]:
+                code, _, reason = response["status"].partition(" ")
+                code = int(code)
+                self.send_response(code, reason)
+                names = set()
+                for name, value in response["headers"]:
+                    self.send_header(name, value)
+                    names.add(name.lower())
+                if ("content-length" not in names and environ["REQUEST_METHOD"] != "HEAD"
+                        and code >= 200 and code not in (204, 304)):
+                    response["chunked"] = True
+                    self.send_header("Transfer-Encoding", "chunked")
+                if not keep_alive:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                response["sent"] = True
+            if data:
+                if response["chunked"]:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                else:
+                    self.wfile.write(data)
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info:
+                try:
+                    if response["sent"]:
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            elif response["status"] is not None:
+                raise AssertionError("Headers already set")
+            response["status"], response["headers"] = status, headers
+            return write
+
+        def execute(application_iter):
+            try:
+                for data in application_iter:
+                    write(data)
+                if not response["sent"]:
+                    write(b"")
+                if response["chunked"]:
+                    self.wfile.write(b"0\r\n\r\n")
+            finally:
+                if hasattr(application_iter, "close"):
+                    application_iter.close()
+
+        try:
+            application_iter = self.server.app(environ, start_response)
+            if environ["REQUEST_METHOD"] != "HEAD" and _is_event_stream(response["headers"]):
+                keep_alive = False  # the stream ends with the connection
+                if self.server.claim_stream(self.connection):
+                    try:
+                        write(b"")  # status line and headers; the body follows on the stream thread
+                    except BaseException:
+                        self.server.release_stream(self.connection)
+                        if hasattr(application_iter, "close"):
+                            application_iter.close()
+                        raise
+                    self.server.run_stream(self.connection, application_iter, response["chunked"])
+                    self.close_connection = True
+                    return
+                if hasattr(application_iter, "close"):
+                    application_iter.close()
+                response["status"] = response["headers"] = None
+                application_iter = ServiceUnavailable(
+                    "Too many live update streams are open.", retry_after=30)(environ, start_response)
+            execute(application_iter)
+        except (ConnectionError, socket.timeout) as e:
+            self.connection_dropped(e, environ)
+            self.close_connection = True
+            return
+        except Exception as e:
+            log_event(f"ERROR: Unhandled exception serving {environ.get('PATH_INFO')}: {e!r}")
+            self.close_connection = True
+            if not response["sent"]:
+                response["status"] = response["headers"] = None
+                keep_alive = False
+                try:
+                    execute(InternalServerError()(environ, start_response))
+                except Exception:
+                    pass
+            return
+
+        if not keep_alive or not body.drain():
+            self.close_connection = True
+
+    def log_request(self, code="-", size="-"):
+        pass  # per-request lines would flood the event log; /metrics has the counts
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    BaseWSGIServer dispatching connections to a bounded thread pool, with
+    event streams moved off the pool onto their own threads.
+    """
+
+    multithread = True
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, app, workers: int = WEB_WORKERS,
+                 backlog: int = WEB_LISTEN_BACKLOG, request_timeout: float = WEB_REQUEST_TIMEOUT,
+                 keepalive_timeout: float = WEB_KEEPALIVE_TIMEOUT, reuse_port: bool = False,
+                 max_streams: int = WEB_MAX_STREAMS):
+        self.request_queue_size = backlog
+        self.allow_reuse_port = reuse_port  # SO_REUSEPORT, set by server_bind
+        self.workers = workers
+        self.request_timeout = request_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.draining = False
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+        self.max_streams = max_streams
+        self._streams = {}          # connection -> its stream thread (None while starting)
+        self._streams_lock = threading.Lock()
+        super().__init__(host, port, app, handler=PooledRequestHandler)
+
+    def active_connections(self) -> int:
+        with self._futures_lock:
+            return len(self._futures)
+
+    def active_streams(self) -> int:
+        with self._streams_lock:
+            return len(self._streams)
+
+    def claim_stream(self, request) -> bool:
+        """Reserve a stream slot for a connection; False at max_streams or while draining."""
+        with self._streams_lock:
+            if self.draining or len(self._streams) >= self.max_streams:
+                return False
+            self._streams[request] = None
+            return True
+
+    def release_stream(self, request):
+        with self._streams_lock:
+            self._streams.pop(request, None)
+
+    def run_stream(self, request, application_iter, chunked: bool):
+        """
+        Send the rest of a claimed streaming response from a new thread, which
+        then owns the connection and closes it when the stream ends.
+        """
+        thread = threading.Thread(target=self._stream, args=(request, application_iter, chunked),
+                                  name="http-stream", daemon=True)
+        with self._streams_lock:
+            self._streams[request] = thread
+        thread.start()
+
+    def _stream(self, request, application_iter, chunked: bool):
+        try:
+            for data in application_iter:
+                if data:
+                    request.sendall(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+            if chunked:
+                request.sendall(b"0\r\n\r\n")
+        except OSError:
+            pass  # client went away or stopped reading for request_timeout
+        except Exception as e:
+            log_event(f"ERROR: Unhandled exception in event stream: {e!r}")
+        finally:
+            try:
+                if hasattr(application_iter, "close"):
+                    application_iter.close()
+            finally:
+                self.release_stream(request)
+                self.shutdown_request(request)
+
+    def process_request(self, request, client_address):
+        # Block the accept loop while every worker is busy; waiting
+        # connections stay in the listen backlog.
+        while not self._slots.acquire(timeout=0.5):
+            if self.draining:
+                self.shutdown_request(request)
+                return
+        try:
+            future = self._executor.submit(self._process, request, client_address)
+        except RuntimeError:  # executor already shut down
+            self._slots.release()
+            self.shutdown_request(request)
+            return
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(self._finished)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._streams_lock:
+                handed_off = request in self._streams
+            if not handed_off:
+                self.shutdown_request(request)
+
+    def _finished(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+        self._slots.release()
+
+    def drain(self, timeout: float = WEB_DRAIN_TIMEOUT) -> int:
+        """
+        Wait for in-flight connections and streams after serve_forever has
+        returned. Returns the number still open when the timeout expired.
+        """
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        with self._futures_lock:
+            pending = set(self._futures)
+        _done, not_done = wait(pending, timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._streams_lock:
+            streams = [thread for thread in self._streams.values() if thread is not None]
+        for thread in streams:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return len(not_done) + sum(thread.is_alive() for thread in streams)
+
+
+def serve(app, host: str, port: int, stop_event: threading.Event, **options):
+    """
+    Serve app with a PooledWSGIServer until stop_event is set, then drain.
+    Blocks the calling thread; options are passed to PooledWSGIServer.
+    """
+    server = PooledWSGIServer(host, port, app, **options)
+    registry.gauge("http_connections_active", "Connections being served by the request pool.",
+                   function=server.active_connections)
+    registry.gauge("http_streams_active", "Event streams being served outside the request pool.",
+                   function=server.active_streams)
+
+    def stop_when_asked():
+        stop_event.wait()
+        # Refuse queued connections and end keep-alive before stopping the accept loop
+        server.draining = True
+        server.shutdown()
+
+    threading.Thread(target=stop_when_asked, name="http-stop", daemon=True).start()
+    log_event(f"Production web server listening on {host}:{server.port} "
+              f"({server.workers} workers, {server.max_streams} streams, "
+              f"keep-alive {server.keepalive_timeout}s)")
+    server.serve_forever()   # returns after shutdown() and closes the listening socket
+    still_open = server.drain()
+    if still_open:
+        log_event(f"Web server stopped with {still_open} connection(s) still open "
+                  "(e.g. /events streams).")
+    else:
+        log_event("Web server drained all connections.")
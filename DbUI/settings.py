@@ -0,0 +1,149 @@
+"""
+FarmPi5 Greenhouse Control System - Runtime Settings
+
+Setpoints, hysteresis and check intervals live in the settings table so they
+can be tuned from the UI without restarting the controller. Readers use an
+in-memory snapshot that is replaced atomically on every update, so the
+automation loop never needs a database round-trip per tick. Listeners are
+notified after each change so the scheduler can re-evaluate immediately.
+"""
+
+import math
+import threading
+from management.logger import log_event
+from management.config import LOWER_TEMP, HIGHER_TEMP, AUTO_CHECK_INTERVAL
+from management.devices import all_devices
+from DbUI.connection import get_connection
+
+DEVICE_SETTINGS = ("open_setpoint", "close_setpoint", "idle_time")
+
+# Default value for every known setting. Per-device keys are "<device>/<name>"
+# for each registered device, seeded from its registry entry.
+DEFAULT_SETTINGS = {
+    "lower_temp": LOWER_TEMP,
+    "higher_temp": HIGHER_TEMP,
+    "auto_check_interval": AUTO_CHECK_INTERVAL,
+}
+for _device in all_devices():
+    for _name in DEVICE_SETTINGS:
+        DEFAULT_SETTINGS[f"{_device['name']}/{_name}"] = _device[_name]
+
+_snapshot = None               # dict of the current settings; replaced, never mutated
+_device_snapshots = {}         # device name -> {setting: value}, rebuilt with _snapshot
+_update_lock = threading.Lock()
+_listeners = []
+
+
+def create_settings_table(c):
+    """
+    Create the settings table and add defaults for any missing keys (called from init_db).
+    """
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        )
+    ''')
+    c.executemany("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+                  list(DEFAULT_SETTINGS.items()))
+
+
+def _set_snapshot(settings: dict):
+    """Publish a new snapshot together with its per-device view."""
+    global _snapshot, _device_snapshots
+    device_snapshots = {}
+    for key, value in settings.items():
+        device, _, name = key.rpartition("/")
+        if device:
+            device_snapshots.setdefault(device, {})[name] = value
+    _device_snapshots = device_snapshots
+    _snapshot = settings
+
+
+def load_settings() -> dict:
+    """
+    (Re)load the snapshot from the database. Falls back to the defaults
+    if the table cannot be read.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with get_connection() as conn:
+            for key, value in conn.execute("SELECT key, value FROM settings"):
+                if key in settings:
+                    settings[key] = value
+    except Exception as e:
+        log_event(f"ERROR: Could not load settings, using defaults: {e}")
+    _set_snapshot(settings)
+    return settings
+
+
+def get_settings() -> dict:
+    """
+    Return the current settings snapshot. Callers must treat it as read-only.
+    """
+    settings = _snapshot
+    if settings is None:
+        settings = load_settings()
+    return settings
+
+
+def get_device_settings(device: str) -> dict:
+    """
+    Return the per-device settings (e.g. open_setpoint, idle_time) without the device prefix.
+    """
+    if _snapshot is None:
+        load_settings()
+    return _device_snapshots.get(device, {})
+
+
+def _validate(settings: dict):
+    """Raise ValueError if a combination of settings makes no sense."""
+    if settings["lower_temp"] >= settings["higher_temp"]:
+        raise ValueError("lower_temp must be below higher_temp")
+    if settings["auto_check_interval"] <= 0:
+        raise ValueError("auto_check_interval must be positive")
+    for key, value in settings.items():
+        if key.endswith("/open_setpoint"):
+            device = key[:-len("/open_setpoint")]
+            if value <= settings[f"{device}/close_setpoint"]:
+                raise ValueError(f"{device} open_setpoint must be above close_setpoint")
+        if key.endswith("/idle_time") and value < 0:
+            raise ValueError(f"{key} must not be negative")
+
+
+def update_settings(changes: dict) -> dict:
+    """
+    Validate and persist a set of changes, swap in the new snapshot and
+    notify listeners. Raises ValueError for unknown keys or invalid values.
+    Returns the new snapshot.
+    """
+    with _update_lock:
+        settings = dict(get_settings())
+        for key, value in changes.items():
+            if key not in DEFAULT_SETTINGS:
+                raise ValueError(f"Unknown setting '{key}'")
+            try:
+                settings[key] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Setting '{key}' must be a number")
+            # NaN passes every comparison in _validate and inf would reach the scheduler's wait
+            if not math.isfinite(settings[key]):
+                raise ValueError(f"Setting '{key}' must be a finite number")
+        _validate(settings)
+
+        with get_connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                             [(key, settings[key]) for key in changes])
+        _set_snapshot(settings)
+        listeners = list(_listeners)
+
+    log_event(f"Settings updated: {', '.join(f'{k}={settings[k]:g}' for k in changes)}")
+    for callback in listeners:
+        callback()
+    return settings
+
+
+def add_settings_listener(callback):
+    """Register a callable invoked (with no arguments) after every settings update."""
+    with _update_lock:
+        _listeners.append(callback)
@@ -1,48 +1,121 @@
 
-from flask import Blueprint, render_template
-from datetime import datetime, timedelta
-import sqlite3
-from management.config import DB_FILE  # update path as needed
-from management.logger import log_event
+from flask import Blueprint, Response, jsonify, request, stream_template
+import time
+from DbUI.database import (iter_logs, get_logs_page, format_log_time, LOG_CATEGORIES,
+                           RECENT_LOG_WINDOW, LOG_PAGE_SIZE, LOG_PAGE_SIZE_MAX)
+from DbUI.samples import get_rollups, get_samples, ROLLUP_RESOLUTIONS
+
+NON_TEMPERATURE_CATEGORIES = ("shutter", "system")
+STREAM_BUFFER_SIZE = 8192  # characters of rendered HTML sent per chunk
 
 shutter_data = Blueprint("shutter_data", __name__)
 
+def _display_rows(rows):
+    """Turn (id, timestamp, category, event) rows into (time string, event) pairs lazily."""
+    for _id, ts, _category, event in rows:
+        yield format_log_time(ts), event
+
+def _temperature_rows(rollups):
+    """Newest-first rollup rows with a display time added."""
+    for rollup in reversed(rollups):
+        rollup["time"] = format_log_time(rollup["timestamp"])
+        yield rollup
+
+def buffered(chunks, size: int = STREAM_BUFFER_SIZE):
+    """Join small template chunks so each write to the client carries a useful payload."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield "".join(buffer)
+
 @shutter_data.route("/shutter-data")
 def view_full_log():
-    all_logs = []
-    try:
-        with sqlite3.connect(DB_FILE) as conn:
-            c = conn.cursor()
-            c.execute("SELECT timestamp, event FROM logs ORDER BY timestamp DESC")
-            all_logs = c.fetchall()
-    except Exception as e:
-        log_event(f"[ERROR] Failed to fetch logs from database: {e}")
-        all_logs = []
-
-    # Separate logs into shutter logs and temperature logs
-    logs = []
-    temperature_logs = []
-
-    for ts, event in all_logs:
-        if "temperature" in event.lower():
-            temperature_logs.append((ts, event.split(":")[-1].strip()))
-        else:
-            logs.append((ts, event))
-
-    # Filter shutter logs from last 24 hours
-    last_24_hours_logs = []
-    now = datetime.now()
-    for ts, event in logs:
-        try:
-            log_time = datetime.strptime(ts, "%Y-%m-%d %I:%M %p")
-            if now - log_time <= timedelta(hours=24):
-                last_24_hours_logs.append((ts, event))
-        except Exception as e:
-            log_event(f"[WARNING] Failed to parse timestamp '{ts}': {e}")
-
-    return render_template(
+    # Rows are pulled from the database page by page while the template renders,
+    # so time-to-first-byte and memory use do not depend on the size of the log.
+    since = time.time() - RECENT_LOG_WINDOW
+    stream = stream_template(
         "shutter_log.html",
-        logs=logs,
-        temperature_logs=temperature_logs,
-        last_24_hours_logs=last_24_hours_logs
+        logs=_display_rows(iter_logs(categories=NON_TEMPERATURE_CATEGORIES)),
+        temperature_logs=_temperature_rows(get_rollups("15m", since)),
+        last_24_hours_logs=_display_rows(iter_logs(categories=NON_TEMPERATURE_CATEGORIES, since=since))
     )
+    return Response(buffered(stream), mimetype="text/html")
+
+def parse_cursor(value: str):
+    """Parse a "<timestamp>:<id>" page cursor; returns None if absent."""
+    if not value:
+        return None
+    ts, _, row_id = value.partition(":")
+    return float(ts), int(row_id)
+
+@shutter_data.route("/shutter-data/logs")
+def log_page():
+    """
+    Keyset-paginated JSON view of the event log.
+
+    Query parameters:
+        category: temperature, shutter or system (repeatable, default: all)
+        since: Only include events at or after this epoch time
+        before: Cursor returned as "next" by the previous page
+        limit: Page size (default LOG_PAGE_SIZE, capped at LOG_PAGE_SIZE_MAX)
+    """
+    categories = request.args.getlist("category") or None
+    if categories and any(category not in LOG_CATEGORIES for category in categories):
+        return jsonify({"message": "Invalid category."}), 400
+    try:
+        before = parse_cursor(request.args.get("before"))
+        since = request.args.get("since", type=float)
+        limit = min(request.args.get("limit", LOG_PAGE_SIZE, type=int), LOG_PAGE_SIZE_MAX)
+    except ValueError:
+        return jsonify({"message": "Invalid page cursor."}), 400
+    if limit < 1:
+        return jsonify({"message": "Invalid page size."}), 400
+
+    rows = get_logs_page(categories=categories, since=since, before=before, limit=limit)
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = f"{rows[-1][1]!r}:{rows[-1][0]}"
+
+    return jsonify({
+        "logs": [
+            {"id": row_id, "timestamp": ts, "time": format_log_time(ts),
+             "category": category, "event": event}
+            for row_id, ts, category, event in rows
+        ],
+        "next": next_cursor
+    })
+
+@shutter_data.route("/shutter-data/samples")
+def sample_history():
+    """
+    Temperature/humidity history as JSON.
+
+    Query parameters:
+        resolution: 1m, 15m, 1h (rollups) or raw (default: 15m)
+        since: Start of the window as epoch time (default: 24 hours ago)
+        until: End of the window as epoch time (default: now)
+    """
+    resolution = request.args.get("resolution", "15m")
+    if resolution != "raw" and resolution not in ROLLUP_RESOLUTIONS:
+        return jsonify({"message": "Invalid resolution."}), 400
+    try:
+        since = request.args.get("since", time.time() - RECENT_LOG_WINDOW, type=float)
+        until = request.args.get("until", type=float)
+    except ValueError:
+        return jsonify({"message": "Invalid time window."}), 400
+
+    if resolution == "raw":
+        samples = [
+            {"timestamp": ts, "temperature": temperature, "humidity": humidity}
+            for ts, temperature, humidity in get_samples(since, until)
+        ]
+    else:
+        samples = get_rollups(resolution, since, until)
+    return jsonify({"resolution": resolution, "samples": samples})
@@ -1,71 +1,74 @@
-from flask import Flask, render_template, jsonify
-import threading
-import sqlite3
-from datetime import datetime, timedelta
-from gpio.sensors import monitor_sensors, read_sensor_data  # Import sensor functions
-from gpio.shutters import operate_shutter, cancel_shutter_operation, operation_intended_actions
-from DbUI.database import update_shutter_status, get_shutter_status
+from flask import Flask, Response, render_template, jsonify, request, stream_template, g
+import time
+import json
+import queue
+import hashlib
+import hmac
+from functools import wraps
+from DbUI.database import (update_shutter_status, get_shutter_status, insert_log_event,
+                           get_logs, iter_logs, format_log_time, RECENT_LOG_WINDOW,
+                           get_all_device_states)
+from DbUI.shutter_data import buffered
+from DbUI.profiling import request_profiler
 from management.logger import log_event
-import gpio.gpio_control
-from management.config import DB_FILE
+from management.events import event_hub
+from management.ipc import HardwareUnavailable
+from management.metrics import registry, http_request_seconds, http_responses_total
+from management.devices import get_device, device_names
+from management.config import (stop_event, SSE_KEEPALIVE_INTERVAL, METRICS_TOKEN,
+                               METRICS_ALLOWED_HOSTS)
+import gpio.control  # hardware facade: this process, or the hardware daemon (--role web)
 
 app = Flask(__name__)
+# Pass-through until profiling is switched on (--profile or /admin/profiler)
+app.wsgi_app = request_profiler.wrap(app.wsgi_app)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency per route pattern (not per URL, so label sets stay bounded)."""
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        http_request_seconds.observe(time.perf_counter() - started, route=route, method=request.method)
+        http_responses_total.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.errorhandler(HardwareUnavailable)
+def hardware_unavailable(e):
+    log_event(f"ERROR: {e}")
+    return jsonify({"message": "Hardware controller unavailable."}), 503
 
-# ✅ Fetch temperature from sensors.py
+# ✅ Fetch temperature from the shared sensor cache (never touches the RS485 bus)
 def get_temperature() -> float:
-    """Fetch the latest temperature from the sensor."""
+    """Fetch the latest cached temperature."""
     try:
-        data = read_sensor_data()  # Use the function from sensors.py
+        data = gpio.control.hardware.sensor_data()
         if "error" in data:
             log_event(f"[ERROR] Failed to fetch temperature: {data['error']}")
             return 0.0
         temperature = data["temperature"]
-        log_event(f"Temperature fetched from sensor: {temperature:.2f} °F")
         return round(temperature, 2)
     except Exception as e:
         log_event(f"[ERROR] Exception in get_temperature: {e}")
         return 0.0
 
-# Log any event with a timestamp
-def insert_log_event(event: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %I:%M %p")
-    try:
-        with sqlite3.connect(DB_FILE) as conn:
-            c = conn.cursor()
-            c.execute("INSERT INTO logs (timestamp, event) VALUES (?, ?)", (timestamp, event))
-            conn.commit()
-    except Exception as e:
-        log_event(f"[ERROR] Failed to insert log event: {e}")
-
 @app.route("/")
 def index():
-    slug_shutter_status = get_shutter_status("Slug Shutter")
-    slug_sidewall_status = get_shutter_status("Slug Sidewall")
+    states = get_all_device_states()
+    devices = [(name, states.get(name, {}).get("status", "unknown")) for name in device_names()]
 
-    recent_logs = []
-    try:
-        with sqlite3.connect(DB_FILE) as conn:
-            c = conn.cursor()
-            c.execute("SELECT timestamp, event FROM logs ORDER BY timestamp DESC")
-            all_logs = c.fetchall()
-
-            now = datetime.now()
-            for ts_str, event in all_logs:
-                try:
-                    log_time = datetime.strptime(ts_str, "%Y-%m-%d %I:%M %p")
-                    if now - log_time <= timedelta(hours=24):
-                        recent_logs.append((ts_str, event))
-                except Exception as e:
-                    log_event(f"Invalid timestamp in log: {ts_str} - {e}")
-    except Exception as e:
-        log_event(f"Error fetching logs for home page: {e}")
+    since = time.time() - RECENT_LOG_WINDOW
+    recent_logs = [(format_log_time(ts), event) for ts, event in get_logs(since=since)]
 
     temperature = get_temperature()  # Get the temperature from the sensor
     return render_template(
         "index.html",
         temperature=temperature,
-        slug_shutter_status=slug_shutter_status,
-        slug_sidewall_status=slug_sidewall_status,
+        devices=devices,
         recent_logs=recent_logs
     )
 
@@ -81,6 +84,8 @@ def temperature():
 def change_status(device, action):
     device = device.strip()
     action = action.strip().lower()
+    if get_device(device) is None:
+        return jsonify({"message": "Unknown device."}), 404
     if action not in ["open", "close", "automatic"]:
         return jsonify({"message": "Invalid action."}), 400
 
@@ -88,7 +93,7 @@ def change_status(device, action):
 
     if action == "automatic":
         if current_status == "live":
-            cancel_shutter_operation(device)
+            gpio.control.hardware.cancel(device)
         update_shutter_status(device, "automatic")
         insert_log_event(f"{device} set to automatic mode via UI button")
         insert_log_event(f"Temperature at button press: {get_temperature():.1f} °F")
@@ -97,41 +102,146 @@ def change_status(device, action):
     if current_status == action and current_status != "live":
         return jsonify({"message": f"{device} is already {action}."})
 
-    if current_status == "live":
-        current_live_action = operation_intended_actions.get(device)
-        if current_live_action == action:
-            return jsonify({"message": f"{device} is already {action}."})
-        else:
-            cancel_shutter_operation(device)
-            update_shutter_status(device, "live")
-            insert_log_event(f"{device} switching to {action} via UI button")
-            insert_log_event(f"Temperature at button press: {get_temperature():.1f} °F")
-            threading.Thread(target=operate_shutter, args=(device, action), daemon=True).start()
-            return jsonify({"message": f"{device} switching to {action} operation initiated."})
+    # The actuator manager coalesces commands: the same action again is a
+    # no-op and a different one cancels the running movement first.
+    current_live_action = gpio.control.hardware.intended_action(device)
+    if current_live_action == action:
+        return jsonify({"message": f"{device} is already {action}."})
 
     update_shutter_status(device, "live")
-    insert_log_event(f"{device} set to {action} via UI button")
+    if current_live_action is not None:
+        insert_log_event(f"{device} switching to {action} via UI button")
+        message = f"{device} switching to {action} operation initiated."
+    else:
+        insert_log_event(f"{device} set to {action} via UI button")
+        message = f"{device} set to {action} operation initiated."
     insert_log_event(f"Temperature at button press: {get_temperature():.1f} °F")
-    threading.Thread(target=operate_shutter, args=(device, action), daemon=True).start()
-    return jsonify({"message": f"{device} set to {action} operation initiated."})
+    gpio.control.hardware.operate(device, action)
+    return jsonify({"message": message})
 
 @app.route("/status/<device>")
 def status(device):
     current_status = get_shutter_status(device.strip())
     return jsonify({"status": current_status})
 
+def format_sse(event_type: str, data: dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/events")
+def events():
+    """
+    Server-Sent Events stream of sensor samples ("sensor"), device status and
+    position changes ("status"), actuator state transitions ("actuator") and
+    the active motor count ("motors").
+    The current state is sent first so a new page needs no other request.
+    """
+    def stream():
+        subscription = event_hub.subscribe()
+        try:
+            sample = gpio.control.hardware.sensor_data()
+            if "error" not in sample:
+                yield format_sse("sensor", {"temperature": round(sample["temperature"], 2),
+                                            "humidity": round(sample["humidity"], 2),
+                                            "timestamp": sample["timestamp"]})
+            states = get_all_device_states()
+            for device in device_names():
+                yield format_sse("status", {"device": device, **states.get(device, {})})
+            yield format_sse("motors", {"count": gpio.control.hardware.active_motor_count()})
+
+            while not stop_event.is_set():
+                try:
+                    event_type, data = subscription.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event_type, data)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    response = Response(stream(), mimetype="text/event-stream")
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route("/api/snapshot")
+def snapshot():
+    """
+    Everything the dashboard shows in one response: device states, the latest
+    cached sensor sample and its age, in-flight operations, actuator states,
+    limit-switch travel times and the active motor count. The ETag covers
+    everything except the sample age, so an unchanged state answers
+    If-None-Match with 304 and no body.
+    """
+    state = {"devices": get_all_device_states(), **gpio.control.hardware.snapshot()}
+    sample_age = state["sensor"].pop("age", None)
+
+    etag = hashlib.sha1(json.dumps(state, sort_keys=True).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        state["sensor_age"] = sample_age
+        response = jsonify(state)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def metrics_access(f):
+    """
+    Guard for the scrape endpoints, which the session login lets through:
+    require the METRICS_TOKEN bearer token, or a METRICS_ALLOWED_HOSTS
+    client when no token is configured.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if METRICS_TOKEN:
+            allowed = hmac.compare_digest(request.headers.get("Authorization", ""),
+                                          f"Bearer {METRICS_TOKEN}")
+        else:
+            allowed = request.remote_addr in METRICS_ALLOWED_HOSTS
+        if not allowed:
+            return Response("Forbidden\n", status=403, mimetype="text/plain")
+        return f(*args, **kwargs)
+    return decorated_function
+
+@app.route("/metrics")
+@metrics_access
+def metrics():
+    """Every registered metric in the Prometheus text exposition format."""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics/hardware")
+@metrics_access
+def hardware_metrics():
+    """The hardware daemon's metrics (Modbus, motors) when it runs as its own process."""
+    if not gpio.control.hardware.remote:
+        return Response("# Hardware metrics are part of /metrics in a single-process deployment.\n",
+                        mimetype="text/plain; version=0.0.4")
+    return Response(gpio.control.hardware.metrics(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/active_motor_count")
 def active_motor_count():
-    return jsonify({"count": gpio.gpio_control.active_motor_count})
+    return jsonify({"count": gpio.control.hardware.active_motor_count()})
 
 @app.route("/shutter-data")
 def shutter_data():
+    # Stream the full log page by page instead of loading every row first.
+    logs = ((format_log_time(ts), event) for _id, ts, _category, event in iter_logs())
+    return Response(buffered(stream_template("shutter_data.html", logs=logs)), mimetype="text/html")
+
+
+@app.route("/settings", methods=["GET"])
+def settings():
+    return jsonify(gpio.control.hardware.settings())
+
+@app.route("/settings", methods=["POST"])
+def change_settings():
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict) or not changes:
+        return jsonify({"message": "Expected a JSON object of settings to change."}), 400
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            c = conn.cursor()
-            c.execute("SELECT timestamp, event FROM logs ORDER BY timestamp DESC")
-            logs = c.fetchall()
-    except Exception as e:
-        logs = []
-        log_event(f"ERROR fetching shutter logs: {e}")
-    return render_template("shutter_data.html", logs=logs)
+        new_settings = gpio.control.hardware.update_settings(changes)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    insert_log_event(f"Settings changed via UI: {', '.join(sorted(changes))}", category="system")
+    return jsonify(new_settings)
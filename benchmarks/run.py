@@ -0,0 +1,437 @@
+"""
+FarmPi5 Greenhouse Control System - Benchmark Suite
+
+Measures the web and control stack against simulated hardware and writes
+the results to JSON so releases can be compared:
+
+- "/", "/shutter-data", "/status/<device>" and "/change_status" through
+  the Flask test client, against a shutters_control.db seeded with 10k,
+  1M or 10M log rows (throughput plus p50/p99 latency)
+- log_event enqueue throughput and the writer's batch write time
+- read_sensor_data round trips through the RS485 bus owner and the
+  simulated Modbus slave
+- the production web server (DbUI.server) against Flask's development
+  server over real sockets: concurrent keep-alive clients, with a few
+  clients stalling mid-request
+
+Every database size lives in its own directory under --workdir and is
+reused by later runs, so the 10M-row seed is paid once. Run from the
+repository root:
+
+    python -m benchmarks.run --rows 10k 1m --output results.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROW_COUNTS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+SEED_BATCH = 50_000           # rows inserted per transaction while seeding
+SEED_INTERVAL = 5.0           # seconds between seeded log entries (newest is "now")
+
+# Seeded messages in roughly the mix the controller writes: mostly
+# temperature readings, then shutter operations, then system events.
+SEED_EVENTS = (
+    (0.70, "temperature", "Temperature reading: {temperature:.1f} °F"),
+    (0.10, "shutter", "START: {action} operation initiated for {device}."),
+    (0.10, "shutter", "COMPLETE: {action} operation completed for {device}."),
+    (0.05, "shutter", "{device} set to automatic mode via UI button"),
+    (0.05, "system", "Modbus slave 1 (climate) is responding again"),
+)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(durations: list, errors: int = 0) -> dict:
+    """Throughput and latency figures (milliseconds) for a list of durations in seconds."""
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "errors": errors,
+        "throughput_per_s": len(ordered) / total if total else None,
+        "mean_ms": 1000 * total / len(ordered) if ordered else None,
+        "p50_ms": 1000 * percentile(ordered, 0.50) if ordered else None,
+        "p99_ms": 1000 * percentile(ordered, 0.99) if ordered else None,
+        "max_ms": 1000 * ordered[-1] if ordered else None,
+    }
+
+
+def seed_logs(rows: int):
+    """Fill the logs table of the current database up to rows entries."""
+    from DbUI.connection import get_connection
+    from management.devices import device_names
+
+    with get_connection() as conn:
+        existing = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+    if existing >= rows:
+        return existing
+
+    rng = random.Random(rows)
+    devices = device_names()
+    weights = [weight for weight, _category, _template in SEED_EVENTS]
+    start = time.time() - rows * SEED_INTERVAL
+
+    def generate(first: int, last: int):
+        for index in range(first, last):
+            _weight, category, template = rng.choices(SEED_EVENTS, weights)[0]
+            event = template.format(temperature=rng.uniform(50, 90), device=rng.choice(devices),
+                                    action=rng.choice(("OPEN", "CLOSE")))
+            yield start + index * SEED_INTERVAL, category, event
+
+    for first in range(existing, rows, SEED_BATCH):
+        with get_connection() as conn:
+            conn.executemany("INSERT INTO logs (timestamp, category, event) VALUES (?, ?, ?)",
+                             generate(first, min(rows, first + SEED_BATCH)))
+    return rows
+
+
+def make_client():
+    """Test client for the dashboard, configured the way main.py configures the app."""
+    from DbUI.ui import app
+    from DbUI.auth import auth
+    from DbUI.shutter_data import shutter_data
+    from DbUI.profiling import profiler
+
+    if "auth" not in app.blueprints:
+        app.secret_key = "benchmark"
+        app.register_blueprint(auth, url_prefix="/auth")
+        app.register_blueprint(shutter_data)
+        app.register_blueprint(profiler)
+    return app.test_client()
+
+
+def login(client):
+    """Start a fresh session so the login expiry never interrupts a measurement."""
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+        session["login_time"] = datetime.datetime.utcnow().isoformat()
+
+
+def bench_endpoint(client, method: str, paths, iterations: int) -> dict:
+    """Request each path in turn (cycling) and time the full response body."""
+    durations, errors = [], 0
+    for index in range(iterations):
+        path = paths[index % len(paths)]
+        login(client)
+        started = time.perf_counter()
+        response = client.open(path, method=method)
+        response.get_data()
+        durations.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors += 1
+        response.close()
+    return summarize(durations, errors)
+
+
+def bench_web(iterations: int, shutter_data_iterations: int) -> dict:
+    from urllib.parse import quote
+    from management.devices import device_names
+
+    client = make_client()
+    devices = [quote(name) for name in device_names()]
+    return {
+        "index": bench_endpoint(client, "GET", ["/"], iterations),
+        "shutter_data": bench_endpoint(client, "GET", ["/shutter-data"], shutter_data_iterations),
+        "status": bench_endpoint(client, "GET", [f"/status/{name}" for name in devices], iterations),
+        "change_status": bench_endpoint(
+            client, "POST",
+            [f"/change_status/{name}/{action}" for action in ("open", "close") for name in devices],
+            iterations),
+    }
+
+
+def bench_log_event(count: int) -> dict:
+    """Enqueue rate of log_event and the time until the writer has written every entry."""
+    from management import logger
+    from management.metrics import log_write_seconds
+
+    before = log_write_seconds.snapshot()
+    durations = []
+    started = time.perf_counter()
+    for index in range(count):
+        call_started = time.perf_counter()
+        logger.log_event(f"Benchmark log entry {index}")
+        durations.append(time.perf_counter() - call_started)
+    enqueued = time.perf_counter()
+    if not logger.flush(timeout=60):
+        raise RuntimeError("Log writer did not drain the benchmark entries within 60s")
+    drained = time.perf_counter()
+    after = log_write_seconds.snapshot()
+
+    result = summarize(durations)
+    batches = after["count"] - before["count"]
+    result.update({
+        "queue_drain_s": drained - enqueued,
+        "end_to_end_per_s": count / (drained - started),
+        "write_batches": batches,
+        "write_ms_per_batch": 1000 * (after["sum"] - before["sum"]) / batches if batches else None,
+    })
+    return result
+
+
+def bench_sensor_reads(count: int) -> dict:
+    """read_sensor_data round trips through the bus owner to the simulated slave."""
+    from gpio.sensors import read_sensor_data
+
+    durations, errors = [], 0
+    for _ in range(count):
+        started = time.perf_counter()
+        sample = read_sensor_data()
+        durations.append(time.perf_counter() - started)
+        if "error" in sample:
+            errors += 1
+    return summarize(durations, errors)
+
+
+def _session_cookie(app) -> str:
+    """A signed, logged-in session cookie for raw HTTP clients."""
+    serializer = app.session_interface.get_signing_serializer(app)
+    value = serializer.dumps({"logged_in": True,
+                              "login_time": datetime.datetime.utcnow().isoformat()})
+    return f"{app.config['SESSION_COOKIE_NAME']}={value}"
+
+
+def _http_get(sock, reader, host: str, path: str, cookie: str) -> tuple:
+    """
+    One GET on an open socket. Returns (status code, whether the server
+    keeps the connection open) after reading the body.
+    """
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n\r\n".encode())
+    status_line = reader.readline().split()
+    if len(status_line) < 2:
+        raise ConnectionError("connection closed by the server")
+    length, keep_alive = 0, True
+    while True:
+        line = reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value == "close":
+            keep_alive = False
+    reader.read(length)
+    return int(status_line[1]), keep_alive
+
+
+def bench_server(mode: str, clients: int, requests: int, slow_clients: int,
+                 sse_clients: int) -> dict:
+    """
+    Serve the dashboard on a free local port with the given server mode and
+    hit /status/<device> from concurrent keep-alive clients while
+    slow_clients connections send half a request and stall and sse_clients
+    dashboards keep an /events stream open.
+    """
+    from urllib.parse import quote
+    from werkzeug.serving import make_server
+    from DbUI.server import PooledWSGIServer
+    from management.devices import device_names
+
+    make_client()  # registers the blueprints
+    from DbUI.ui import app
+    if mode == "dev":
+        server = make_server("127.0.0.1", 0, app, threaded=True)  # what app.run() uses
+    else:
+        server = PooledWSGIServer("127.0.0.1", 0, app)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"127.0.0.1:{server.port}"
+    cookie = _session_cookie(app)
+    path = f"/status/{quote(device_names()[0])}"
+
+    stalled = []
+    for _ in range(slow_clients):
+        sock = socket.create_connection(("127.0.0.1", server.port))
+        sock.sendall(b"GET / HTTP/1.1\r\nHost: ")
+        stalled.append(sock)
+
+    streams = []
+    for _ in range(sse_clients):
+        sock = socket.create_connection(("127.0.0.1", server.port), timeout=60)
+        sock.sendall(f"GET /events HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n\r\n".encode())
+        sock.recv(4096)  # wait for the stream to start
+        streams.append(sock)
+
+    durations, errors = [], []
+    lock = threading.Lock()
+
+    def client():
+        # Connections are reused while the server allows it (the development
+        # server closes each one), and connect time counts toward latency.
+        local, failed, sock = [], 0, None
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                if sock is None:
+                    sock = socket.create_connection(("127.0.0.1", server.port), timeout=60)
+                    reader = sock.makefile("rb")
+                status, keep_alive = _http_get(sock, reader, host, path, cookie)
+                if status != 200:
+                    failed += 1
+            except OSError:
+                failed += 1
+                keep_alive = False
+            local.append(time.perf_counter() - started)
+            if not keep_alive and sock is not None:
+                sock.close()
+                sock = None
+        if sock is not None:
+            sock.close()
+        with lock:
+            durations.extend(local)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    for sock in stalled + streams:
+        sock.close()
+    if mode != "dev":
+        server.draining = True
+    server.shutdown()
+    if mode != "dev":
+        server.drain(timeout=1)  # an /events stream only notices the close on its next write
+
+    result = summarize(durations, sum(errors))
+    result.update({"clients": clients, "slow_clients": slow_clients, "sse_clients": sse_clients,
+                   "throughput_per_s": len(durations) / wall if wall else None})
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FarmPi5 benchmark suite")
+    parser.add_argument("--rows", nargs="+", choices=sorted(ROW_COUNTS), default=["10k"],
+                        help="Log table sizes to benchmark the web routes against (default: 10k)")
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="Requests per route (default: %(default)s)")
+    parser.add_argument("--shutter-data-iterations", type=int, default=5,
+                        help="Requests to /shutter-data, which renders the whole log (default: %(default)s)")
+    parser.add_argument("--log-events", type=int, default=100_000,
+                        help="log_event calls to time (default: %(default)s)")
+    parser.add_argument("--sensor-reads", type=int, default=200,
+                        help="read_sensor_data calls to time (default: %(default)s)")
+    parser.add_argument("--server-clients", type=int, default=16,
+                        help="Concurrent keep-alive clients for the web server comparison (default: %(default)s)")
+    parser.add_argument("--server-requests", type=int, default=200,
+                        help="Requests per client in the web server comparison (default: %(default)s)")
+    parser.add_argument("--slow-clients", type=int, default=4,
+                        help="Connections that stall mid-request during the comparison (default: %(default)s)")
+    parser.add_argument("--sse-clients", type=int, default=20,
+                        help="Open /events streams during the comparison (default: %(default)s)")
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="Simulation clock speedup; 1 keeps real RS485 wire timing (default: %(default)s)")
+    parser.add_argument("--workdir", default=os.path.join(REPO_DIR, "benchmarks", "work"),
+                        help="Directory holding the seeded databases (default: %(default)s)")
+    parser.add_argument("--output", default=None,
+                        help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or os.path.join(
+        REPO_DIR, "benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json"))
+    workdir = os.path.abspath(args.workdir)
+    if REPO_DIR not in sys.path:
+        sys.path.append(REPO_DIR)
+
+    # DB_FILE and LOG_FILE are relative, so each run happens inside its work directory.
+    os.makedirs(os.path.join(workdir, "common"), exist_ok=True)
+    os.chdir(os.path.join(workdir, "common"))
+
+    from gpio.simulation import enable_simulation
+    from gpio.actuators import actuator_manager
+    from gpio import gpio_control
+    from DbUI.database import init_db
+    from DbUI.connection import close_all_connections
+    from management.logger import stop_log_writer
+
+    results = {
+        "meta": {
+            "timestamp": time.time(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "speedup": args.speedup,
+            "iterations": args.iterations,
+        },
+        "web": {},
+        "server": {},
+    }
+
+    # The controller logs every motor step and the development server every
+    # request to the console; keep them out of the report.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            contextlib.redirect_stderr(devnull):
+        enable_simulation(args.speedup)
+        init_db()
+        gpio_control.init_gpio()
+        results["log_event"] = bench_log_event(args.log_events)
+        results["sensor_read"] = bench_sensor_reads(args.sensor_reads)
+
+        for size in args.rows:
+            close_all_connections()
+            os.makedirs(os.path.join(workdir, size), exist_ok=True)
+            os.chdir(os.path.join(workdir, size))
+            init_db()
+            seed_started = time.perf_counter()
+            rows = seed_logs(ROW_COUNTS[size])
+            results["web"][size] = {"rows": rows, "seed_s": time.perf_counter() - seed_started,
+                                    **bench_web(args.iterations, args.shutter_data_iterations)}
+
+        for mode in ("dev", "production"):
+            results["server"][mode] = bench_server(mode, args.server_clients, args.server_requests,
+                                                   args.slow_clients, args.sse_clients)
+
+        actuator_manager.shutdown()
+        stop_log_writer()
+        close_all_connections()
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name in ("log_event", "sensor_read"):
+        r = results[name]
+        print(f"{name:<24} {r['throughput_per_s']:>10.0f}/s  p50 {r['p50_ms']:.3f} ms  p99 {r['p99_ms']:.3f} ms")
+    for size, routes in results["web"].items():
+        for route, r in routes.items():
+            if isinstance(r, dict):
+                print(f"{size:>4} {route:<19} {r['throughput_per_s']:>10.1f}/s  p50 {r['p50_ms']:.2f} ms"
+                      f"  p99 {r['p99_ms']:.2f} ms  errors {r['errors']}")
+    for mode, r in results["server"].items():
+        print(f"server {mode:<17} {r['throughput_per_s']:>10.1f}/s  p50 {r['p50_ms']:.2f} ms"
+              f"  p99 {r['p99_ms']:.2f} ms  errors {r['errors']}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
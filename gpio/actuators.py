@@ -0,0 +1,308 @@
+"""
+FarmPi5 Greenhouse Control System - Actuator Manager
+
+Every motor movement goes through one ActuatorManager. Each registered
+device has an explicit state machine:
+
+    idle -> opening/closing -> idle (limit switch reached or runtime elapsed)
+    opening/closing -> cancelling -> idle (or straight into the next command)
+    any -> fault (the output line failed); the next command retries
+
+Commands are coalesced per device: the last command wins, and a command
+matching what the device is already doing (or about to do) is a no-op.
+Motors are driven by a bounded pool of worker threads, one per device, so
+thread count and lock contention stay constant however often the UI, the
+automation scheduler or an operator issue commands. Limit switch and
+button edges from gpio.inputs arrive through limit_changed() and
+button_pressed(); limit edges also feed per-device travel time statistics.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from management import config, clock
+from management.logger import log_event
+from management.events import publish_event
+from management.metrics import motor_runtime_seconds
+from management.config import ACTUATOR_WORKERS
+from management.devices import get_device, device_names
+from DbUI.database import record_device_position
+from gpio.gpio_control import gpio_lines, set_outputs, all_motors_off, motor_started, motor_finished
+
+ACTUATOR_STATES = ("idle", "opening", "closing", "cancelling", "fault")
+MOVING_STATES = {"open": "opening", "close": "closing"}
+
+
+class _Actuator:
+    """Per-device state; only touched with the manager lock held."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "idle"
+        self.action = None       # action the motor is running (or being cancelled from)
+        self.pending = None      # next action to run once the current one stops
+        self.cancel = None       # Event that stops the running action
+        self.limits = {}         # action -> True while that end-of-travel switch is closed
+        self.limit_hit_at = None # clock time the running action reached its limit switch
+
+
+class ActuatorManager:
+    """
+    Per-device state machines sharing one bounded worker pool. By default
+    the pool has a worker for every registered device (and at least
+    ACTUATOR_WORKERS), so no movement waits for another to finish.
+    """
+
+    def __init__(self, workers: int = None):
+        if workers is None:
+            workers = max(ACTUATOR_WORKERS, len(device_names()))
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="actuator")
+        self._actuators = {}
+        self._shutdown = False
+        # device -> action running or queued to run; kept in sync under the lock
+        # and exposed read-only as gpio.shutters.operation_intended_actions.
+        self.intended_actions = {}
+        # device -> action -> {"count", "last", "min", "max", "mean"} seconds from
+        # motor start at one limit switch to the other
+        self._travel_stats = {}
+
+    def _actuator(self, device: str) -> _Actuator:
+        actuator = self._actuators.get(device)
+        if actuator is None:
+            actuator = self._actuators[device] = _Actuator(device)
+        return actuator
+
+    def _set_state(self, actuator: _Actuator, state: str, action=None):
+        """Record a transition (lock held) and refresh the intended action."""
+        actuator.state = state
+        actuator.action = action
+        intended = actuator.pending or (action if state in ("opening", "closing") else None)
+        if intended:
+            self.intended_actions[actuator.name] = intended
+        else:
+            self.intended_actions.pop(actuator.name, None)
+        publish_event("actuator", {"device": actuator.name, "state": state,
+                                   "action": action, "pending": actuator.pending})
+
+    def command(self, device: str, action: str) -> str:
+        """
+        Ask a device to "open", "close" or "stop". Never blocks on the motor.
+
+        Returns "started", "queued" (the current movement is being cancelled
+        first), "stopping", or "noop" when the command changes nothing.
+        Raises ValueError for an unknown device or action.
+        """
+        if get_device(device) is None:
+            raise ValueError(f"Unknown device '{device}'")
+        if action not in MOVING_STATES and action != "stop":
+            raise ValueError(f"Unknown action '{action}'")
+
+        with self._lock:
+            if self._shutdown:
+                return "noop"
+            actuator = self._actuator(device)
+
+            if action == "stop":
+                actuator.pending = None
+                if actuator.state in ("opening", "closing"):
+                    actuator.cancel.set()
+                    self._set_state(actuator, "cancelling", actuator.action)
+                    return "stopping"
+                if actuator.state == "cancelling":
+                    self._set_state(actuator, "cancelling", actuator.action)
+                    return "stopping"
+                return "noop"
+
+            if actuator.state in ("idle", "fault"):
+                self._start(actuator, action)
+                return "started"
+
+            if actuator.state == MOVING_STATES[action] or actuator.pending == action:
+                return "noop"  # already doing (or about to do) exactly this
+
+            # Last command wins: stop the current movement, then run this one.
+            actuator.pending = action
+            if actuator.state != "cancelling":
+                actuator.cancel.set()
+            self._set_state(actuator, "cancelling", actuator.action)
+            return "queued"
+
+    def _start(self, actuator: _Actuator, action: str):
+        """Move a device into opening/closing and hand the motor to a worker (lock held)."""
+        actuator.pending = None
+        actuator.cancel = threading.Event()
+        self._set_state(actuator, MOVING_STATES[action], action)
+        self._executor.submit(self._run, actuator, action, actuator.cancel)
+
+    def limit_changed(self, device: str, action: str, active: bool, timestamp: float = None):
+        """
+        An end-of-travel switch changed (timestamp is the edge time on the
+        clock). Reaching the limit of the running direction stops the motor
+        at once and counts as a completed movement.
+        """
+        with self._lock:
+            actuator = self._actuator(device)
+            actuator.limits[action] = active
+            if active and actuator.state == MOVING_STATES[action]:
+                actuator.limit_hit_at = timestamp if timestamp is not None else clock.monotonic()
+                actuator.cancel.set()
+                return
+            idle = actuator.state in ("idle", "fault")
+        if active and idle:
+            # Moved by hand (or settled) onto a limit while no motor was running.
+            final_state = "closed" if action == "close" else action
+            record_device_position(device, final_state)
+
+    def button_pressed(self, device: str, action: str) -> str:
+        """
+        Manual override button: start that direction, or stop the motor if
+        that direction is already running.
+        """
+        with self._lock:
+            moving = self._actuator(device).state == MOVING_STATES[action]
+        result = self.command(device, "stop" if moving else action)
+        log_event(f"{device}: {action.upper()} button pressed ({result}).")
+        return result
+
+    def _record_travel(self, device: str, action: str, seconds: float):
+        with self._lock:
+            stats = self._travel_stats.setdefault(device, {}).setdefault(
+                action, {"count": 0, "last": None, "min": None, "max": None, "mean": 0.0})
+            stats["count"] += 1
+            stats["last"] = seconds
+            stats["min"] = seconds if stats["min"] is None else min(stats["min"], seconds)
+            stats["max"] = seconds if stats["max"] is None else max(stats["max"], seconds)
+            stats["mean"] += (seconds - stats["mean"]) / stats["count"]
+
+    def travel_times(self) -> dict:
+        """Per-device, per-direction travel time statistics in seconds."""
+        with self._lock:
+            return {device: {action: dict(stats) for action, stats in actions.items()}
+                    for device, actions in self._travel_stats.items()}
+
+    def _run(self, actuator: _Actuator, action: str, cancel: threading.Event):
+        ok = self._drive(actuator, action, cancel)
+        with self._lock:
+            if actuator.pending and not self._shutdown:
+                self._start(actuator, actuator.pending)
+            elif ok:
+                self._set_state(actuator, "idle")
+            else:
+                actuator.pending = None
+                self._set_state(actuator, "fault")
+
+    def _drive(self, actuator: _Actuator, action: str, cancel: threading.Event) -> bool:
+        """
+        Run one motor until its limit switch closes, the device's runtime
+        passes or the movement is cancelled. Returns False if the motor
+        could not be driven.
+        """
+        device = actuator.name
+        device_info = get_device(device)
+        runtime = device_info["runtime"]
+        # Persisted while the motor runs so a restart knows the position is uncertain
+        moving_position = "opening" if action == "open" else "closing"
+        final_state = "closed" if action == "close" else action
+
+        # Simulation branch: when motorControl is False no GPIO line is driven
+        simulated = not config.motorControl
+        prefix = "SIMULATION: " if simulated else ""
+        out_pin = device_info["pins"][action]["out_pin"]
+        # Both direction pins of the device, driven low together in one update
+        all_off = {pins["out_pin"]: 0 for pins in device_info["pins"].values()}
+        out_line = None
+        if not simulated:
+            out_line = gpio_lines.get(out_pin)
+            if not out_line:
+                log_event(f"ERROR: Could not access output line for {device}.")
+                return False
+
+        with self._lock:
+            if cancel.is_set():
+                # Stopped or replaced before a worker got to it: nothing moved
+                log_event(f"{device}: {action.upper()} cancelled before the motor started.")
+                return True
+            at_limit = actuator.limits.get(action, False)
+            # Only a run from the opposite end switch measures the full travel time
+            from_end = actuator.limits.get("close" if action == "open" else "open", False)
+            actuator.limit_hit_at = None
+        if at_limit:
+            log_event(f"{device}: {action.upper()} limit switch already closed; motor not started.")
+            record_device_position(device, final_state, status=final_state)
+            return True
+
+        log_event(f"{prefix}START: {action.upper()} operation initiated for {device}.")
+        motor_started()
+        try:
+            record_device_position(device, moving_position)
+            if out_line:
+                out_line.set_value(1)
+                log_event(f"{device}: Motor (pin {out_pin}) set to HIGH for {action.upper()}.")
+            started_at = clock.monotonic()
+
+            # Returns True as soon as the operation is cancelled or reaches its limit switch.
+            cancelled = clock.wait(cancel, runtime)
+
+            if out_line:
+                set_outputs(all_off)
+                log_event(f"{device}: Motor (pin {out_pin}) set to LOW, ending {action.upper()} operation.")
+            motor_runtime_seconds.observe(clock.monotonic() - started_at, device=device, action=action)
+            with self._lock:
+                limit_hit_at, actuator.limit_hit_at = actuator.limit_hit_at, None
+            if limit_hit_at is not None:
+                travel = max(0.0, limit_hit_at - started_at)
+                if from_end:
+                    self._record_travel(device, action, travel)
+                log_event(f"{device}: {action.upper()} limit switch reached after {travel:.2f}s.")
+                cancelled = False
+            elif not cancelled and "limit_pin" in device_info["pins"][action]:
+                log_event(f"WARNING: {device} ran {runtime}s without reaching its {action.upper()} limit switch.")
+            if cancelled:
+                record_device_position(device, "unknown")
+                log_event(f"{prefix}Operation for {device} was cancelled; stopping motor immediately.")
+                return True
+
+            record_device_position(device, final_state, status=final_state)
+            log_event(f"{prefix}COMPLETE: {action.upper()} operation completed for {device}.")
+            return True
+        except Exception as ex:
+            log_event(f"ERROR: Exception in shutter operation for {device} during {action}: {ex}")
+            if out_line:
+                try:
+                    set_outputs(all_off)
+                except Exception:
+                    pass
+            record_device_position(device, "unknown")
+            return False
+        finally:
+            motor_finished()
+
+    def state(self, device: str) -> dict:
+        """Return {"state", "action", "pending"} for a device."""
+        with self._lock:
+            actuator = self._actuator(device)
+            return {"state": actuator.state, "action": actuator.action,
+                    "pending": actuator.pending}
+
+    def states(self) -> dict:
+        """Return the state of every registered device."""
+        return {device: self.state(device) for device in device_names()}
+
+    def shutdown(self):
+        """
+        Cancel every movement, drop queued commands, wait for the workers and
+        force every motor output low in one update.
+        """
+        with self._lock:
+            self._shutdown = True
+            for actuator in self._actuators.values():
+                actuator.pending = None
+                if actuator.cancel is not None:
+                    actuator.cancel.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if config.motorControl:
+            all_motors_off()
+
+
+# Shared manager for the whole process
+actuator_manager = ActuatorManager()
@@ -0,0 +1,205 @@
+"""
+FarmPi5 Greenhouse Control System - Hardware Control Facade
+
+The one way the web interface reaches the shutters, the sensor cache and
+the automation settings. In a single-process deployment (main.py --role
+all) `hardware` is a LocalControl that calls straight into this process.
+In a split deployment the hardware daemon (--role hardware) owns GPIO, the
+RS485 bus and automation and serves a LocalControl over management.ipc;
+each web process (--role web) swaps in a RemoteControl with
+use_remote_hardware(), which makes the same calls over the Unix socket and
+relays the daemon's events into the local hub for /events. Web processes
+also forward their log entries, so only the daemon writes and rotates
+LOG_FILE.
+
+Callers must look the facade up as gpio.control.hardware at call time, not
+import the name, because use_remote_hardware() replaces it.
+"""
+
+import threading
+from gpio import gpio_control
+from gpio.actuators import actuator_manager
+from gpio.sensor_cache import get_latest_sensor_data
+from gpio.shutters import operate_shutter, cancel_shutter_operation, operation_intended_actions
+from DbUI.settings import get_settings, update_settings
+from management.logger import log_event, log_entries, forward_log
+from management.events import event_hub, forward_events
+from management.metrics import registry
+from management.ipc import IPCClient, IPCServer, HardwareUnavailable, NOTIFICATION
+from management.config import IPC_SOCKET, IPC_RECONNECT_INTERVAL, stop_event
+
+# Methods a web process may call on the hardware daemon
+CONTROL_METHODS = ("operate", "cancel", "intended_action", "sensor_data", "active_motor_count",
+                   "snapshot", "settings", "update_settings", "metrics")
+
+
+class LocalControl:
+    """
+    Hardware calls served by this process.
+    """
+
+    remote = False
+
+    def operate(self, device: str, action: str):
+        """Start (or replace) a movement; see gpio.shutters.operate_shutter."""
+        operate_shutter(device, action)
+
+    def cancel(self, device: str):
+        cancel_shutter_operation(device)
+
+    def intended_action(self, device: str):
+        """The action of the running or queued movement of device, or None."""
+        return operation_intended_actions.get(device)
+
+    def sensor_data(self, max_age: float = None) -> dict:
+        return get_latest_sensor_data(max_age)
+
+    def active_motor_count(self) -> int:
+        return gpio_control.active_motor_count
+
+    def snapshot(self) -> dict:
+        """In-flight operations, actuator states, travel times, motor count and latest sample."""
+        return {
+            "operations": dict(operation_intended_actions),
+            "actuators": actuator_manager.states(),
+            "travel_times": actuator_manager.travel_times(),
+            "active_motor_count": gpio_control.active_motor_count,
+            "sensor": get_latest_sensor_data(),
+        }
+
+    def settings(self) -> dict:
+        return dict(get_settings())
+
+    def update_settings(self, changes: dict) -> dict:
+        """Persist changes and wake automation; raises ValueError for invalid settings."""
+        return dict(update_settings(changes))
+
+    def metrics(self) -> str:
+        """This process's metrics in the Prometheus text format."""
+        return registry.render()
+
+
+class RemoteControl:
+    """
+    Hardware calls forwarded to the hardware daemon. Every method raises
+    management.ipc.HardwareUnavailable while the daemon is unreachable.
+    """
+
+    remote = True
+
+    def __init__(self, path: str = IPC_SOCKET):
+        self.client = IPCClient(path)
+        self._relay_thread = None
+        self._relay_channel = None
+        self._stopping = False
+
+    def operate(self, device: str, action: str):
+        self.client.call("operate", device, action)
+
+    def cancel(self, device: str):
+        self.client.call("cancel", device)
+
+    def intended_action(self, device: str):
+        return self.client.call("intended_action", device)
+
+    def sensor_data(self, max_age: float = None) -> dict:
+        return self.client.call("sensor_data", max_age)
+
+    def active_motor_count(self) -> int:
+        return self.client.call("active_motor_count")
+
+    def snapshot(self) -> dict:
+        return self.client.call("snapshot")
+
+    def settings(self) -> dict:
+        return self.client.call("settings")
+
+    def update_settings(self, changes: dict) -> dict:
+        return self.client.call("update_settings", changes)
+
+    def metrics(self) -> str:
+        return self.client.call("metrics")
+
+    def start(self):
+        """
+        Relay the daemon's events into the local hub, and send events
+        published in this process (e.g. status changes written by a request)
+        to the daemon, which fans them out to every web process. Log entries
+        go to the daemon as well.
+        """
+        self._stopping = False
+        forward_log(self._forward_log)
+        forward_events(self._forward)
+        self._relay_thread = threading.Thread(target=self._relay, name="ipc-events", daemon=True)
+        self._relay_thread.start()
+
+    def stop(self):
+        # Log forwarding stays on: the log writer drains at exit, and this
+        # process must never write LOG_FILE itself.
+        self._stopping = True
+        forward_events(None)
+        channel = self._relay_channel
+        if channel is not None:
+            channel.close()
+        if self._relay_thread is not None:
+            self._relay_thread.join(timeout=2)
+        self.client.close()
+
+    def _forward(self, event_type: str, data: dict):
+        try:
+            self.client.notify("publish", event_type, data)
+        except HardwareUnavailable as e:
+            log_event(f"ERROR: Could not forward {event_type} event to the hardware daemon: {e}")
+            event_hub.publish(event_type, data)  # at least this process's streams see it
+
+    def _forward_log(self, entries: list):
+        self.client.notify("log", entries)
+
+    def _relay(self):
+        connected = None
+        while not self._stopping and not stop_event.is_set():
+            try:
+                self._relay_channel = channel = self.client.subscribe()
+                if connected is not True:
+                    log_event(f"Receiving hardware events from {self.client.path}")
+                connected = True
+                while True:
+                    message = channel.receive()
+                    if message[0] == NOTIFICATION and message[1] == "event":
+                        event_type, data = message[2]
+                        event_hub.publish(event_type, data)
+            except (OSError, ValueError) as e:  # HardwareUnavailable is an OSError
+                self._relay_channel = None
+                if self._stopping or stop_event.is_set():
+                    break
+                if connected is not False:
+                    log_event(f"ERROR: Hardware event stream unavailable, retrying: {e}")
+                connected = False
+                stop_event.wait(IPC_RECONNECT_INTERVAL)
+
+
+# Facade used by DbUI.ui; replaced by use_remote_hardware() in web processes
+hardware = LocalControl()
+
+
+def use_remote_hardware(path: str = IPC_SOCKET) -> RemoteControl:
+    """Send every hardware call from this process to the daemon listening on path."""
+    global hardware
+    hardware = RemoteControl(path)
+    hardware.start()
+    return hardware
+
+
+def serve_hardware(path: str = IPC_SOCKET) -> IPCServer:
+    """
+    Serve this process's hardware to web processes on path. Events they
+    publish are fanned out on this process's hub and their log entries
+    are written to this process's log.
+    """
+    control = LocalControl()
+    handlers = {name: getattr(control, name) for name in CONTROL_METHODS}
+    handlers["publish"] = event_hub.publish
+    handlers["log"] = log_entries
+    server = IPCServer(path, handlers)
+    server.start()
+    return server
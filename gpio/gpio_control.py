@@ -9,121 +9,141 @@ through LED sequences.
 """
 
 import sys
-import time
 import threading
-import gpiod  # type: ignore
+from datetime import timedelta
+try:
+    import gpiod  # type: ignore
+except ImportError:  # not available off the Pi; use the simulated backend there
+    gpiod = None
+from management import config
 from management.logger import log_event
-from management.config import SLUG_SHUTTER_PINS, SLUG_SIDEWALL_PINS, LED_PIN, motorControl
+from management.events import publish_event
+from management.config import LED_PIN, GPIO_CHIP, INPUT_DEBOUNCE_MS
+from management.devices import motor_pins, input_pins
+from gpio.led import LedEngine
 
+# Module providing the gpiod v2 API (Chip, LineSettings, EdgeEvent and the
+# line enums): gpiod itself, or gpio.simulation
+gpio_backend = gpiod
 chip = None
-gpio_lines = {}
+line_request = None   # one LineRequest for every requested offset, held for the process lifetime
+gpio_lines = {}       # offset -> OutputLine
+input_offsets = []    # limit switch and button offsets in line_request
+
+class OutputLine:
+    """
+    Handle for one offset of the shared LineRequest, so callers can keep
+    using line.set_value(0/1) for single-pin changes.
+    """
+
+    def __init__(self, offset: int):
+        self.offset = offset
+
+    def set_value(self, value: int):
+        set_outputs({self.offset: value})
+
+    def get_value(self) -> int:
+        return int(line_request.get_value(self.offset) == gpio_backend.line.Value.ACTIVE)
+
+def use_gpio_backend(backend):
+    """Select the gpiod-compatible backend used by init_gpio (e.g. gpio.simulation)."""
+    global gpio_backend
+    gpio_backend = backend
+
+def set_outputs(values: dict):
+    """
+    Drive several output offsets at once ({offset: 0/1}) with a single
+    set_values call on the shared request.
+    """
+    Value = gpio_backend.line.Value
+    line_request.set_values({offset: Value.ACTIVE if value else Value.INACTIVE
+                             for offset, value in values.items()})
+
+def all_motors_off():
+    """Force every requested motor output low in one update."""
+    offsets = [offset for offset in gpio_lines if offset != LED_PIN]
+    if line_request is not None and offsets:
+        set_outputs({offset: 0 for offset in offsets})
 
 def init_gpio():
     """
-    Initialize the GPIO lines using gpiod.
-    When motorControl is True, only the LED pin is initialized.
-    When False, all output pins (motors + LED) are initialized.
+    Request the GPIO lines using the selected gpiod backend.
+    When motorControl is False, only the LED pin is requested.
+    When True, all motor and LED outputs (initially low) and the limit
+    switch and button inputs (edge detection on both edges) are requested
+    together as one LineRequest.
     """
-    global chip, gpio_lines
+    global chip, line_request
+    if gpio_backend is None:
+        log_event("ERROR: gpiod is not installed; run with --simulate to use simulated GPIO.")
+        sys.exit(1)
     try:
-        chip = gpiod.Chip('gpiochip4')
+        chip = gpio_backend.Chip(GPIO_CHIP)
     except Exception as e:
-        log_event(f"ERROR: Could not open gpiochip4: {e}")
+        log_event(f"ERROR: Could not open {GPIO_CHIP}: {e}")
         sys.exit(1)
-    
-    if not motorControl:
+
+    line = gpio_backend.line
+    if config.motorControl:
+        offsets = sorted(motor_pins() | {LED_PIN})
+        inputs = sorted(input_pins())
+    else:
         # Initialize only the LED pin for motor simulation
-        try:
-            gpio_lines[LED_PIN] = chip.get_line(LED_PIN)
-            gpio_lines[LED_PIN].request(consumer="APP_OUT", type=gpiod.LINE_REQ_DIR_OUT, default_vals=[0])
-            log_event("GPIO initialized for LED output in simulated motor control mode.")
-        except Exception as e:
-            log_event(f"ERROR: Could not initialize LED pin {LED_PIN}: {e}")
+        offsets = [LED_PIN]
+        inputs = []
+
+    line_config = {tuple(offsets): gpio_backend.LineSettings(direction=line.Direction.OUTPUT,
+                                                             output_value=line.Value.INACTIVE)}
+    if inputs:
+        # Switches and buttons pull the line to ground, so active_low makes
+        # "closed"/"pressed" read as ACTIVE and arrive as a rising edge.
+        line_config[tuple(inputs)] = gpio_backend.LineSettings(
+            direction=line.Direction.INPUT, edge_detection=line.Edge.BOTH, bias=line.Bias.PULL_UP,
+            active_low=True, debounce_period=timedelta(milliseconds=INPUT_DEBOUNCE_MS))
+    try:
+        line_request = chip.request_lines(config=line_config, consumer="APP_OUT")
+    except Exception as e:
+        log_event(f"ERROR: Could not request GPIO lines {offsets + inputs}: {e}")
         return
+    gpio_lines.clear()
+    gpio_lines.update({offset: OutputLine(offset) for offset in offsets})
+    input_offsets[:] = inputs
 
-    # Normal operation: Initialize all output pins.
-    pins_needed = set()
-    for mapping in (SLUG_SHUTTER_PINS, SLUG_SIDEWALL_PINS):
-        for mapping_item in mapping.values():
-            pins_needed.add(mapping_item["out_pin"])
-    pins_needed.add(LED_PIN)
-    
-    for pin in pins_needed:
-        try:
-            gpio_lines[pin] = chip.get_line(pin)
-            gpio_lines[pin].request(consumer="APP_OUT", type=gpiod.LINE_REQ_DIR_OUT, default_vals=[0])
-        except Exception as e:
-            log_event(f"ERROR: Could not initialize output for pin {pin}: {e}")
-
-    log_event("GPIO initialized for output-only shutter control.")
+    if config.motorControl:
+        log_event(f"GPIO initialized for shutter control (outputs {offsets}, inputs {inputs}).")
+    else:
+        log_event("GPIO initialized for LED output in simulated motor control mode.")
 
 # --- Global variables for centralized LED control ---
 active_motor_count = 0
 active_motor_lock = threading.Lock()
-led_stop_timer = None
 
-def led_start_sequence():
-    """
-    Trigger a flash sequence and leave the LED ON.
-    This is called when the first motor operation begins.
-    """
-    led_line = gpio_lines.get(LED_PIN)
-    if not led_line:
-        log_event("ERROR: LED pin not available for start sequence.")
-        return
-    # Flash LED 5 times quickly (no cancel checks)
-    for _ in range(5):
-        time.sleep(0.2)
-        led_line.set_value(0)
-        time.sleep(0.2)
-        led_line.set_value(1)
-    # Ensure LED stays on
-    led_line.set_value(1)
-    log_event("Global LED start sequence completed; LED is now ON.")
-
-def led_stop_sequence():
-    """
-    Trigger a slow blink sequence and then turn the LED OFF.
-    This is called when the last motor operation finishes.
-    """
-    led_line = gpio_lines.get(LED_PIN)
-    if not led_line:
-        log_event("ERROR: LED pin not available for stop sequence.")
-        return
-    # Slow blink LED 3 times
-    for _ in range(3):
-        led_line.set_value(0)
-        time.sleep(0.5)
-        led_line.set_value(1)
-        time.sleep(0.5)
-    led_line.set_value(0)
-    log_event("Global LED stop sequence completed; LED is now OFF.")
+# LED patterns run on their own thread; motor start/stop only posts a command.
+led_engine = LedEngine(lambda: gpio_lines.get(LED_PIN))
 
 def motor_started():
     """
     Increment active motor count atomically.
-    If the count goes from 0 to 1, trigger the LED start sequence.
+    If the count goes from 0 to 1, start the LED flash sequence
+    (which also cuts short a pending stop sequence).
     """
-    global active_motor_count, led_stop_timer
+    global active_motor_count
     with active_motor_lock:
-        # Cancel any pending LED shutdown if a new motor starts
-        if active_motor_count == 0 and led_stop_timer is not None:
-            led_stop_timer.cancel()
-            led_stop_timer = None
         active_motor_count += 1
+        publish_event("motors", {"count": active_motor_count})
         if active_motor_count == 1:
-            led_start_sequence()
+            led_engine.play("start")
 
 def motor_finished():
     """
     Decrement active motor count atomically.
-    If the count drops to 0, trigger the LED stop sequence.
+    If the count drops to 0, queue the LED stop sequence, which holds the
+    LED on for 2 seconds before blinking it off.
     """
-    global active_motor_count, led_stop_timer
+    global active_motor_count
     with active_motor_lock:
         if active_motor_count > 0:
             active_motor_count -= 1
+        publish_event("motors", {"count": active_motor_count})
         if active_motor_count == 0:
-            # Delay the LED shutdown by 2 seconds
-            led_stop_timer = threading.Timer(2, led_stop_sequence)
-            led_stop_timer.start()
+            led_engine.play("stop")
@@ -0,0 +1,103 @@
+"""
+FarmPi5 Greenhouse Control System - Limit Switch and Button Inputs
+
+The limit switches and manual push buttons of every registered device are
+part of the shared gpiod LineRequest with edge detection enabled. One
+thread waits on the request's file descriptor in a selector, so an edge is
+handled within milliseconds without polling: it drains the kernel's edge
+events and forwards them, with their kernel timestamps, to the actuator
+manager. A closing limit switch stops the running motor; a button press
+starts or stops its direction.
+"""
+
+import os
+import selectors
+import threading
+from management.logger import log_event
+from management.devices import input_pins
+from gpio import gpio_control
+from gpio.actuators import actuator_manager
+
+
+class InputMonitor:
+    """
+    Dispatches edge events of the input lines in gpio_control.line_request.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._pins = {}
+        self._wake_r = self._wake_w = None
+        self._stopping = False
+
+    def start(self):
+        """Read the initial switch levels and start the event thread."""
+        request = gpio_control.line_request
+        self._pins = {pin: info for pin, info in input_pins().items()
+                      if pin in gpio_control.input_offsets}
+        if request is None or not self._pins:
+            log_event("No limit switch or button inputs requested; input monitoring disabled.")
+            return
+
+        active = gpio_control.gpio_backend.line.Value.ACTIVE
+        offsets = list(self._pins)
+        for pin, value in zip(offsets, request.get_values(offsets)):
+            device, kind, action = self._pins[pin]
+            if kind == "limit":
+                actuator_manager.limit_changed(device, action, value == active)
+
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, args=(request,), name="gpio-inputs",
+                                        daemon=True)
+        self._thread.start()
+        log_event(f"Input monitoring started for lines {sorted(offsets)}.")
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the event thread."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        os.write(self._wake_w, b"x")
+        self._thread.join(timeout)
+
+    def _run(self, request):
+        selector = selectors.DefaultSelector()
+        selector.register(request.fd, selectors.EVENT_READ, "edges")
+        selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        try:
+            while not self._stopping:
+                for key, _mask in selector.select():
+                    if key.data == "wake":
+                        os.read(self._wake_r, 64)
+                        continue
+                    # Drain everything the kernel has buffered for this request.
+                    while request.wait_edge_events(0):
+                        for event in request.read_edge_events():
+                            self._dispatch(event)
+        except Exception as e:
+            log_event(f"ERROR: Input monitoring stopped: {e}")
+        finally:
+            selector.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _dispatch(self, event):
+        info = self._pins.get(event.line_offset)
+        if info is None:
+            return
+        device, kind, action = info
+        # active_low inputs: a rising edge means the switch closed / button pressed
+        active = event.event_type == gpio_control.gpio_backend.EdgeEvent.Type.RISING_EDGE
+        # Kernel edge timestamps use CLOCK_MONOTONIC, the same base as management.clock
+        timestamp = event.timestamp_ns / 1e9
+        try:
+            if kind == "limit":
+                actuator_manager.limit_changed(device, action, active, timestamp)
+            elif active:
+                actuator_manager.button_pressed(device, action)
+        except Exception as e:
+            log_event(f"ERROR: Handling {kind} input for {device} failed: {e}")
+
+
+# Shared monitor for the whole process
+input_monitor = InputMonitor()
@@ -0,0 +1,127 @@
+"""
+FarmPi5 Greenhouse Control System - LED Indicator Engine
+
+The status LED flashes when the first motor starts and blinks slowly
+before going dark once the last motor stops. Patterns are played by a
+single animation thread; play() only records the command and returns, so
+callers such as motor_started() never wait for the animation.
+
+Overlapping commands are merged by priority: a command preempts a running
+pattern of lower priority (a new motor start cuts a pending stop blink
+short), is queued behind a higher-priority one (a stop arriving during the
+start flash plays once the flash is done) and is ignored if that pattern
+is already running or queued. Repeating the running pattern also drops a
+lower-priority one queued behind it, so a motor starting during the start
+flash cancels the stop of a motor that finished meanwhile.
+"""
+
+import collections
+import threading
+from management import clock
+from management.logger import log_event
+
+# name -> steps of (LED value, seconds held), value left on afterwards,
+# priority and the message logged when the pattern completes.
+LED_PATTERNS = {
+    "start": {
+        "steps": [(0, 0.2), (1, 0.2)] * 5,   # flash 5 times quickly
+        "final": 1,
+        "priority": 1,
+        "message": "Global LED start sequence completed; LED is now ON.",
+    },
+    "stop": {
+        "steps": [(1, 2.0)] + [(0, 0.5), (1, 0.5)] * 3,  # hold 2 s, then blink slowly 3 times
+        "final": 0,
+        "priority": 0,
+        "message": "Global LED stop sequence completed; LED is now OFF.",
+    },
+}
+
+
+class LedEngine:
+    """
+    Plays LED_PATTERNS on the line returned by get_line() from one
+    background thread, timed on management.clock.
+    """
+
+    def __init__(self, get_line, patterns: dict = LED_PATTERNS):
+        self.get_line = get_line
+        self.patterns = patterns
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._current = None       # name of the running pattern
+        self._queued = None        # name of the pattern to run after it
+        self._steps = collections.deque()
+        self._deadline = None      # clock time the current step ends
+
+    def play(self, name: str):
+        """Start, queue or merge a pattern without blocking."""
+        pattern = self.patterns[name]
+        with self._lock:
+            if name in (self._current, self._queued):
+                queued = self.patterns.get(self._queued)
+                if (name == self._current and queued is not None
+                        and queued["priority"] < pattern["priority"]):
+                    self._queued = None
+                return
+            current = self.patterns.get(self._current)
+            if current is not None and current["priority"] > pattern["priority"]:
+                self._queued = name
+                return
+            self._queued = None
+            self._begin(name)
+            self._ensure_running()
+        self._wake.set()
+
+    def current(self):
+        """Name of the pattern being played, or None."""
+        return self._current
+
+    def _begin(self, name: str):
+        """Switch to a pattern; its first step is applied by the thread (lock held)."""
+        self._current = name
+        self._steps = collections.deque(self.patterns[name]["steps"])
+        self._deadline = clock.monotonic()
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="led-engine", daemon=True)
+            self._thread.start()
+
+    def _set(self, value: int):
+        line = self.get_line()
+        if line is None:
+            return
+        try:
+            line.set_value(value)
+        except Exception as e:
+            log_event(f"ERROR: Could not set LED: {e}")
+
+    def _advance(self, now: float):
+        """Apply every step that is due (lock held). Returns the next deadline or None."""
+        while self._current is not None and now >= self._deadline:
+            if self._steps:
+                value, hold = self._steps.popleft()
+                self._set(value)
+                self._deadline += hold
+                continue
+            pattern = self.patterns[self._current]
+            self._set(pattern["final"])
+            log_event(pattern["message"])
+            self._current = None
+            if self._queued is not None:
+                queued, self._queued = self._queued, None
+                self._begin(queued)
+        return self._deadline if self._current is not None else None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._current is not None and self.get_line() is None:
+                    log_event(f"ERROR: LED pin not available for {self._current} sequence.")
+                    self._current = self._queued = None
+                deadline = self._advance(clock.monotonic())
+            timeout = None if deadline is None else deadline - clock.monotonic()
+            clock.wait(self._wake, timeout)
+            self._wake.clear()
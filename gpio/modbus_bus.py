@@ -0,0 +1,259 @@
+"""
+FarmPi5 Greenhouse Control System - RS485 Bus Owner and Scheduler
+
+Several Modbus RTU slaves (temperature/humidity, CO2, soil probes, ...)
+share the single half-duplex RS485 line on MODBUS_PORT. ModbusBus is the
+only thing that talks to that port: one owner thread keeps it open, runs
+every transaction in turn and hands results back through futures, so
+frames from different callers can never interleave on the wire.
+
+Besides ad-hoc transactions submitted from any thread, the owner polls
+each configured slave/register block at its own interval. Due work runs
+back-to-back, separated only by the inter-frame silent period, so the bus
+is limited by the wire rather than by a fixed sleep. A slave that stops
+answering is backed off exponentially so it cannot starve the others, and
+the port is only closed and reopened after an I/O error.
+"""
+
+import collections
+import heapq
+import threading
+from concurrent.futures import Future
+import minimalmodbus  # type: ignore[import]
+from management import clock
+from management.logger import log_event
+from management.metrics import modbus_roundtrip_seconds, modbus_errors_total
+from management.config import MODBUS_PORT, MODBUS_BAUDRATE, MODBUS_TIMEOUT, MODBUS_BACKOFF_MAX
+
+
+class ModbusBus:
+    """
+    Owner of one RS485 port.
+
+    A target is a dict with "slave", "register", "count", optional
+    "function" (default 3) and an optional "decoder" callable that turns the
+    list of register values into a sample dict. Poll targets additionally
+    need "name" and "interval"; on_result(target, sample) is called on the
+    owner thread after every good poll and must not block.
+
+    port is a device name or a serial-like object such as
+    gpio.simulation.SimulatedSerial. Poll intervals are in management.clock
+    seconds.
+    """
+
+    def __init__(self, port=MODBUS_PORT, baudrate: int = MODBUS_BAUDRATE,
+                 timeout: float = MODBUS_TIMEOUT, backoff_max: float = MODBUS_BACKOFF_MAX):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.backoff_max = backoff_max
+        # 3.5 character times between frames, as required by Modbus RTU
+        self.silent_period = minimalmodbus._calculate_minimum_silent_period(baudrate)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._requests = collections.deque()  # (target, Future) waiting for the owner
+        self._targets = []
+        self._on_result = None
+        self._schedule = []                   # heap of (clock due time, target index)
+        self._thread = None
+        self._stopping = False
+
+        # Owned by the bus thread only
+        self._instruments = {}   # slave address -> Instrument sharing the port
+        self._failures = {}      # target name -> consecutive failed polls
+        self._bus_free_at = 0.0  # clock time the next frame may start
+        self._served_request = False
+
+    # --- Public API (any thread) ---
+
+    def submit(self, target: dict) -> Future:
+        """
+        Queue one transaction and return a Future for its (decoded) result.
+        Queued transactions run ahead of scheduled polls.
+        """
+        future = Future()
+        with self._lock:
+            if self._stopping:
+                future.set_exception(RuntimeError(f"Modbus bus on {self.port_name} is stopped"))
+                return future
+            self._requests.append((target, future))
+        self._ensure_running()
+        self._wake.set()
+        return future
+
+    def schedule(self, targets: list, on_result):
+        """Replace the set of polled targets; each is first polled right away."""
+        now = clock.monotonic()
+        with self._lock:
+            self._targets = list(targets)
+            self._on_result = on_result
+            self._schedule = [(now, index) for index in range(len(self._targets))]
+            heapq.heapify(self._schedule)
+        self._ensure_running()
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the owner thread, fail queued transactions and close the port."""
+        with self._lock:
+            self._stopping = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    # --- Owner thread ---
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._stopping or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name="modbus-bus", daemon=True)
+            self._thread.start()
+
+    @property
+    def port_name(self) -> str:
+        """Device name of the port (port may also be a serial-like object)."""
+        return getattr(self.port, "port", self.port)
+
+    def _instrument(self, slave: int):
+        """Return the Instrument for a slave, opening the port on first use."""
+        instr = self._instruments.get(slave)
+        if instr is None:
+            if not isinstance(self.port, str) and not self.port.is_open:
+                self.port.open()  # minimalmodbus only reopens ports it created by name
+            # minimalmodbus shares one serial object per port name, so every
+            # slave talks through the same open handle.
+            instr = minimalmodbus.Instrument(self.port, slave, close_port_after_each_call=False)
+            instr.serial.baudrate = self.baudrate
+            instr.serial.bytesize = 8
+            instr.serial.parity = minimalmodbus.serial.PARITY_NONE
+            instr.serial.stopbits = 1
+            instr.serial.timeout = self.timeout
+            instr.mode = minimalmodbus.MODE_RTU
+            instr.clear_buffers_before_each_transaction = True
+            self._instruments[slave] = instr
+        return instr
+
+    def _transact(self, target: dict):
+        """Run one transaction for target and return the decoded result."""
+        try:
+            instr = self._instrument(target["slave"])
+            registers = instr.read_registers(target["register"], target["count"],
+                                             target.get("function", 3))
+        except (minimalmodbus.NoResponseError, minimalmodbus.InvalidResponseError) as e:
+            modbus_errors_total.inc(slave=target["slave"], error=type(e).__name__)
+            raise
+        except (minimalmodbus.serial.SerialException, minimalmodbus.ModbusException, OSError) as e:
+            modbus_errors_total.inc(slave=target["slave"], error=type(e).__name__)
+            # The port itself is in trouble; reopen it on the next transaction.
+            log_event(f"Modbus port {self.port_name} error: {e}; reopening on next transaction")
+            self._close_port()
+            raise
+        except Exception as e:
+            modbus_errors_total.inc(slave=target["slave"], error=type(e).__name__)
+            raise
+        finally:
+            self._bus_free_at = clock.monotonic() + self.silent_period
+        if instr.roundtrip_time is not None:
+            modbus_roundtrip_seconds.observe(instr.roundtrip_time, slave=target["slave"])
+        decoder = target.get("decoder")
+        return decoder(registers) if decoder is not None else registers
+
+    def _next_delay(self, target: dict) -> float:
+        """Seconds until target is polled again, backed off after failures."""
+        failures = self._failures.get(target["name"], 0)
+        if not failures:
+            return target["interval"]
+        return max(target["interval"], min(self.backoff_max, target["interval"] * 2 ** failures))
+
+    def _poll(self, target: dict, on_result):
+        name = target["name"]
+        try:
+            sample = self._transact(target)
+        except Exception as e:
+            self._failures[name] = self._failures.get(name, 0) + 1
+            log_event(f"Modbus slave {target['slave']} ({name}) failed: {e}; "
+                      f"retrying in {self._next_delay(target):.0f}s")
+            return
+
+        if self._failures.pop(name, 0):
+            log_event(f"Modbus slave {target['slave']} ({name}) is responding again")
+        try:
+            on_result(target, sample)
+        except Exception as e:
+            log_event(f"Error handling Modbus sample from {name}: {e}")
+
+    def _next_work(self):
+        """
+        Return ("request", (target, future)), ("poll", (due, index, target,
+        on_result)) or ("wait", seconds or None) for the owner loop.
+        """
+        now = clock.monotonic()
+        if self._bus_free_at > now:
+            return "wait", self._bus_free_at - now
+        with self._lock:
+            poll_due = bool(self._schedule) and self._schedule[0][0] <= now
+            # Queued transactions go first, but alternate with due polls so
+            # a busy caller cannot starve the schedule.
+            if self._requests and not (poll_due and self._served_request):
+                self._served_request = True
+                return "request", self._requests.popleft()
+            self._served_request = False
+            if not poll_due:
+                return "wait", (self._schedule[0][0] - now) if self._schedule else None
+            due, index = heapq.heappop(self._schedule)
+            return "poll", (due, index, self._targets[index], self._on_result)
+
+    def _run(self):
+        try:
+            while not self._stopping:
+                kind, work = self._next_work()
+                if kind == "wait":
+                    clock.wait(self._wake, work)
+                    self._wake.clear()
+                    continue
+
+                if kind == "request":
+                    target, future = work
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        future.set_result(self._transact(target))
+                    except Exception as e:
+                        future.set_exception(e)
+                    continue
+
+                due, index, target, on_result = work
+                self._poll(target, on_result)
+                # Keep a steady cadence, but don't try to catch up after a long stall.
+                next_due = due + self._next_delay(target)
+                now = clock.monotonic()
+                if next_due < now:
+                    next_due = now + self._next_delay(target)
+                with self._lock:
+                    if index < len(self._targets) and self._targets[index] is target:
+                        heapq.heappush(self._schedule, (next_due, index))
+        except Exception as e:
+            log_event(f"Modbus bus on {self.port_name} stopped unexpectedly: {e}")
+        finally:
+            with self._lock:
+                pending = list(self._requests)
+                self._requests.clear()
+            for _target, future in pending:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError(f"Modbus bus on {self.port_name} is stopped"))
+            self._close_port()
+
+    def _close_port(self):
+        """Close the shared serial port and forget the instruments."""
+        for instr in self._instruments.values():
+            try:
+                instr.serial.close()
+            except Exception:
+                pass
+        self._instruments = {}
+
+
+# Shared owner of MODBUS_PORT for the whole process
+sensor_bus = ModbusBus()
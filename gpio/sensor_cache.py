@@ -0,0 +1,107 @@
+"""
+FarmPi5 Greenhouse Control System - Sensor Sample Cache
+
+This module holds the most recent good sample of each sensor polled by the
+sensor monitoring loop, keyed by poll target name. Web handlers, automation
+and shutter control read from here instead of talking to the RS485 bus
+themselves, so their latency no longer depends on the serial line.
+"""
+
+import threading
+import time
+from management import clock
+from management.config import SENSOR_MAX_AGE
+
+# Cache key of the temperature/humidity sensor that drives automation
+PRIMARY_SENSOR = "climate"
+
+
+class SensorCache:
+    """
+    Thread-safe, timestamped latest-value cache for sensor samples, one per key.
+    """
+
+    def __init__(self, max_age: float = SENSOR_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # key -> (sample, wall clock time for display, clock time for staleness)
+        self._samples = {}
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Register a callable invoked (with no arguments) after every publish
+        of the primary sensor. Listeners run on the publishing thread and
+        must not block.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def publish(self, sample: dict, key: str = PRIMARY_SENSOR):
+        """
+        Store a new good sample for key, replacing the previous one, and
+        notify listeners if it is the primary sensor.
+        """
+        with self._lock:
+            self._samples[key] = (dict(sample), time.time(), clock.monotonic())
+            listeners = list(self._listeners) if key == PRIMARY_SENSOR else []
+        for callback in listeners:
+            callback()
+
+    def get(self, max_age: float = None, key: str = PRIMARY_SENSOR) -> dict:
+        """
+        Return the latest sample for key if it is younger than max_age seconds.
+
+        The returned dict mirrors read_sensor_data(): it contains the sample
+        values plus "timestamp" and "age", or an "error" key when no fresh
+        sample is available (plus "age" if the sample is only stale).
+        """
+        if max_age is None:
+            max_age = self.max_age
+        with self._lock:
+            entry = self._samples.get(key)
+
+        if entry is None:
+            return {"error": "No sensor sample available yet"}
+
+        sample, timestamp, sampled_at = entry
+        age = clock.monotonic() - sampled_at
+        if age > max_age:
+            # Fixed message; the age has its own field (excluded from /api/snapshot's ETag)
+            return {"error": "Sensor sample is stale", "age": age}
+
+        data = dict(sample)
+        data["timestamp"] = timestamp
+        data["age"] = age
+        return data
+
+    def keys(self) -> list:
+        """Return the keys that currently have a cached sample."""
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self, key: str = None):
+        """Forget the cached sample for key, or all samples (e.g. when monitoring stops)."""
+        with self._lock:
+            if key is None:
+                self._samples.clear()
+            else:
+                self._samples.pop(key, None)
+
+
+# Shared cache instance fed by gpio.sensors.monitor_sensors
+sensor_cache = SensorCache()
+
+
+def get_latest_sensor_data(max_age: float = None, key: str = PRIMARY_SENSOR) -> dict:
+    """
+    Return the latest cached sample for key (the primary sensor by default),
+    or an error dict if it is missing or older than max_age (defaults to
+    SENSOR_MAX_AGE).
+    """
+    return sensor_cache.get(max_age, key)
@@ -9,144 +9,120 @@ for more reliable communication with half-duplex RS485 devices.
 """
 
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import minimalmodbus  # type: ignore[import]
 from management.logger import log_event
-from management.config import stop_event, MODBUS_PORT
+from management.config import stop_event, MODBUS_PORT, MODBUS_POLL_TARGETS, MODBUS_REQUEST_TIMEOUT
+from gpio.sensor_cache import sensor_cache, PRIMARY_SENSOR
+from gpio.modbus_bus import sensor_bus
+from DbUI.samples import record_sample
+from management.events import publish_event
+from management.metrics import modbus_errors_total
 
-# Global instrument instance for reuse
-instrument = None
-
-def get_modbus_instrument():
+def decode_temperature_humidity(data):
     """
-    Get or create a MinimalModbus instrument instance.
-    
-    Returns:
-        minimalmodbus.Instrument: Configured Modbus instrument
+    Convert the two raw registers of the temperature/humidity sensor.
     """
-    global instrument
-    
-    if instrument is None:
-        try:
-            # Create a new Modbus instrument
-            # slave_address=9: The slave/unit address of the sensor
-            mb_address = 1  # Modbus address of sensor
-            instrument = minimalmodbus.Instrument(MODBUS_PORT, mb_address)
-            
-            # Configure serial settings
-            instrument.serial.baudrate = 9600
-            instrument.serial.bytesize = 8
-            instrument.serial.parity = minimalmodbus.serial.PARITY_NONE
-            instrument.serial.stopbits = 1
-            instrument.serial.timeout = 0.5
-            
-            # Set the mode explicitly (RTU or ASCII)
-            instrument.mode = minimalmodbus.MODE_RTU
-            
-            # Critical settings for RS485 half-duplex communication
-            # Good practice to clean up before and after each execution
-            instrument.clear_buffers_before_each_transaction = True
-            instrument.close_port_after_each_call = True
-            
-            # Debug mode: Set to True during troubleshooting
-            instrument.debug = False
-            
-            log_event(f"Modbus instrument initialized on {MODBUS_PORT}")
-        except Exception as e:
-            log_event(f"Failed to initialize Modbus instrument: {e}")
-            instrument = None
-    
-    return instrument
-
-def read_sensor_data():
+    # Process the raw data by dividing by 10 to get the actual floating point values
+    # Note: In this sensor, register 0 is humidity and register 1 is temperature
+    humidity = data[1] / 100.0
+    temperature = (9 * data[0] / 500.0) + 32
+
+    return {
+        "temperature": temperature,
+        "humidity": humidity
+    }
+
+# Register decoders referenced by name from MODBUS_POLL_TARGETS
+DECODERS = {
+    "temperature_humidity": decode_temperature_humidity,
+    "raw": lambda data: {"values": list(data)},
+}
+
+def _poll_targets():
+    """Return MODBUS_POLL_TARGETS with decoder names resolved to functions."""
+    targets = []
+    for target in MODBUS_POLL_TARGETS:
+        if target["decoder"] not in DECODERS:
+            log_event(f"Skipping Modbus target {target['name']}: unknown decoder '{target['decoder']}'")
+            continue
+        targets.append(dict(target, decoder=DECODERS[target["decoder"]]))
+    return targets
+
+def read_sensor_data(name: str = PRIMARY_SENSOR):
     """
-    Reads temperature and humidity data from the Modbus device.
-    
+    Reads one sample directly from the Modbus device behind a poll target.
+
+    The transaction is queued on the shared bus owner, so it never
+    interleaves with the polling loop or other callers. Regular readers
+    should use gpio.sensor_cache instead.
+
     Returns:
         dict: A dictionary with temperature and humidity values,
               or an error message if something went wrong.
     """
     try:
-        # Get or create the instrument
-        instr = get_modbus_instrument()
-        if instr is None:
-            return {"error": f"Unable to initialize Modbus device on {MODBUS_PORT}"}
-        
-        # Add a small delay to ensure RS485 transceiver is ready
-        time.sleep(0.05)
-        
-        # Get list of values from MULTIPLE registers
-        # Arguments - (register start address, number of registers to read, function code)
-        data = instr.read_registers(0, 2, 3)
-        
-        # Process the raw data by dividing by 10 to get the actual floating point values
-        # Note: In this sensor, register 0 is humidity and register 1 is temperature
-        humidity = data[1] / 100.0
-        temperature = (9 * data[0] / 500.0) + 32
-        
-        return {
-            "temperature": temperature,
-            "humidity": humidity
-        }
-    
+        target = next((t for t in _poll_targets() if t["name"] == name), None)
+        if target is None:
+            return {"error": f"No Modbus target named '{name}'"}
+
+        future = sensor_bus.submit(target)
+        return future.result(timeout=MODBUS_REQUEST_TIMEOUT)
+
     except minimalmodbus.NoResponseError as e:
         log_event(f"No response from Modbus device: {e}")
         return {"error": f"No response from device: {e}"}
-    
+
     except minimalmodbus.InvalidResponseError as e:
         log_event(f"Invalid response from Modbus device: {e}")
         return {"error": f"Invalid response: {e}"}
-    
+
+    except FutureTimeoutError:
+        # The transaction is still queued behind others; _transact counts wire errors.
+        # Nobody will read its result, so don't let it add to the backlog.
+        future.cancel()
+        modbus_errors_total.inc(slave=target["slave"], error="BusTimeout")
+        log_event(f"Timed out waiting for the Modbus bus on {MODBUS_PORT}")
+        return {"error": f"Timed out waiting for the Modbus bus on {MODBUS_PORT}"}
+
     except Exception as e:
         log_event(f"Unexpected error reading sensor data: {e}")
         return {"error": f"Unexpected error: {e}"}
 
+def publish_sample(target, data):
+    """
+    Publish a decoded sample from the bus scheduler. Every target is cached
+    under its name; the primary climate sensor also feeds the live event
+    stream and the sample store.
+    """
+    name = target["name"]
+    sensor_cache.publish(data, key=name)
+    if name != PRIMARY_SENSOR:
+        publish_event("reading", {"name": name, **data, "timestamp": time.time()})
+        return
+
+    publish_event("sensor", {"temperature": round(data["temperature"], 2),
+                             "humidity": round(data["humidity"], 2),
+                             "timestamp": time.time()})
+    record_sample(data["temperature"], data["humidity"])
+
 def monitor_sensors():
     """
-    Continuously monitor sensors and print readings.
-    Checks for the stop_event flag for graceful shutdown.
+    Continuously poll every slave in MODBUS_POLL_TARGETS, publish good
+    readings to the sensor cache and record climate samples in the sample store.
+    The bus scheduler is the only regular reader of the RS485 bus; everything
+    else reads gpio.sensor_cache. Returns once stop_event is set.
     """
     log_event("Starting continuous sensor monitoring...")
-    retry_count = 0
-    max_retries = 3
-    retry_delay = 5  # seconds
-    
     try:
-        while not stop_event.is_set():
-            # Read sensor data
-            data = read_sensor_data()
-            
-            if "error" in data:
-                print(f"Error: {data['error']}")
-                # Implement retry logic with backoff
-                retry_count += 1
-                if retry_count > max_retries:
-                    log_event(f"Exceeded maximum retries ({max_retries}). Waiting longer before next attempt.")
-                    time.sleep(retry_delay * 2)  
-                    retry_count = 0  # Reset counter
-                else:
-                    time.sleep(retry_delay)
-            else:
-                # Reset retry counter on success
-                retry_count = 0
-                
-                temp = data["temperature"]
-                humidity = data["humidity"]
-                print(f"Temperature: {temp:.1f}°F, Humidity: {humidity:.1f}%")
-                
-                # Normal monitoring interval
-                time.sleep(3)
-    
+        sensor_bus.schedule(_poll_targets(), on_result=publish_sample)
+        stop_event.wait()
     except Exception as e:
         log_event(f"Error in sensor monitoring: {e}")
     finally:
         # Clean up resources
-        global instrument
-        if instrument is not None:
-            try:
-                instrument.serial.close()
-            except:
-                pass
-            instrument = None
+        sensor_bus.stop()
+        sensor_cache.clear()
         log_event("Sensor monitoring stopped")
 
 # For standalone testing
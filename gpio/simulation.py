@@ -0,0 +1,524 @@
+"""
+FarmPi5 Greenhouse Control System - Hardware Simulation Backends
+
+Stand-ins for the RS485 sensors and the gpiod chip so the whole controller
+can run on a laptop (main.py --simulate):
+
+- SimulatedSerial is a serial-port object that answers Modbus RTU read
+  requests from in-memory slaves, with CRC checking and wire timing at the
+  configured baudrate. minimalmodbus accepts it in place of a pyserial port.
+- SimulatedClimateSensor serves the temperature/humidity registers from a
+  named climate profile driven by management.clock.
+- SimulatedChip mimics the gpiod v2 chip and LineRequest calls used by
+  gpio_control and records every line transition with its clock time, so
+  motor runtimes and LED sequences can be checked after a run. Its
+  SimulatedPlant moves the vents with the motor outputs and closes their
+  limit switches, delivered as edge events like the kernel's.
+
+enable_simulation() swaps these in; combined with a clock speedup, a day
+of greenhouse operation runs in minutes.
+"""
+
+import collections
+import dataclasses
+import enum
+import math
+import os
+import select
+import struct
+import sys
+import threading
+import types
+from datetime import timedelta
+import minimalmodbus  # type: ignore[import]
+from management import clock
+from management.logger import log_event
+from management.devices import device_names, get_device
+from management.config import (MODBUS_BAUDRATE, MODBUS_POLL_TARGETS, GPIO_CHIP, SIM_SPEEDUP,
+                               SIM_CLIMATE_PROFILE, SIM_GPIO_HISTORY, SIM_TRAVEL_TIME)
+
+# --- Climate profiles: clock seconds since start -> (temperature °F, humidity %) ---
+
+DAY = 24 * 3600
+
+def _diurnal(t: float):
+    # Coolest (54 °F) at 06:00, warmest (82 °F) at 18:00; the run starts at 06:00.
+    temperature = 68 - 14 * math.cos(2 * math.pi * t / DAY)
+    return temperature, _humidity_for(temperature)
+
+def _step(t: float):
+    # Alternate between cool and hot every hour to exercise every setpoint.
+    temperature = 58.0 if int(t // 3600) % 2 == 0 else 80.0
+    return temperature, _humidity_for(temperature)
+
+def _humidity_for(temperature: float) -> float:
+    return min(95.0, max(20.0, 70 - 1.5 * (temperature - 68)))
+
+CLIMATE_PROFILES = {
+    "diurnal": _diurnal,
+    "step": _step,
+    "hot": lambda t: (85.0, _humidity_for(85.0)),
+    "cold": lambda t: (50.0, _humidity_for(50.0)),
+}
+
+
+class SimulatedClimateSensor:
+    """
+    Holding registers of the temperature/humidity sensor, encoded the way
+    gpio.sensors.decode_temperature_humidity expects them.
+    """
+
+    def __init__(self, profile: str = SIM_CLIMATE_PROFILE):
+        if profile not in CLIMATE_PROFILES:
+            raise ValueError(f"Unknown climate profile '{profile}'")
+        self.profile = CLIMATE_PROFILES[profile]
+        self._start = clock.monotonic()
+
+    def __call__(self, register: int, count: int) -> list:
+        temperature, humidity = self.profile(clock.monotonic() - self._start)
+        registers = [max(0, round((temperature - 32) * 500 / 9)), round(humidity * 100)]
+        if register + count > len(registers):
+            raise IndexError("register out of range")
+        return registers[register:register + count]
+
+
+class StaticRegisters:
+    """A slave whose registers hold fixed values (zero unless given)."""
+
+    def __init__(self, values: dict = None):
+        self.values = dict(values or {})
+
+    def __call__(self, register: int, count: int) -> list:
+        return [self.values.get(address, 0) for address in range(register, register + count)]
+
+
+class SimulatedSerial:
+    """
+    Serial-port stand-in answering Modbus RTU function 3/4 reads.
+
+    slaves maps a slave address to a callable(register, count) returning
+    the register values. Unknown addresses and corrupt frames get no reply,
+    just like on a real bus, so the caller sees a timeout.
+    """
+
+    def __init__(self, slaves: dict, baudrate: int = MODBUS_BAUDRATE, port: str = "sim://modbus"):
+        self.port = port
+        self.baudrate = baudrate
+        self.bytesize = 8
+        self.parity = minimalmodbus.serial.PARITY_NONE
+        self.stopbits = 1
+        self.timeout = 0.05
+        self.write_timeout = 2.0
+        self.is_open = True
+        self.slaves = dict(slaves)
+        self.transactions = 0
+        self._lock = threading.Lock()
+        self._request_size = 0
+        self._response = b""
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._response = b""
+
+    def reset_output_buffer(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def write(self, request: bytes) -> int:
+        if not self.is_open:
+            raise minimalmodbus.serial.SerialException("Simulated port is closed")
+        response = self._respond(bytes(request))
+        with self._lock:
+            self._request_size = len(request)
+            self._response = response
+            self.transactions += 1
+        return len(request)
+
+    def read(self, size: int = 1) -> bytes:
+        with self._lock:
+            data, self._response = self._response[:size], self._response[size:]
+            wire_bytes, self._request_size = self._request_size + len(data), 0
+        if data:
+            # Time the request and response take on the wire (11 bits per character)
+            clock.sleep(wire_bytes * 11 / self.baudrate)
+        else:
+            clock.sleep(self.timeout)  # a silent slave costs the caller its full timeout
+        return data
+
+    def _respond(self, request: bytes) -> bytes:
+        if len(request) < 8 or minimalmodbus._calculate_crc(request[:-2]) != request[-2:]:
+            return b""
+        address, function = request[0], request[1]
+        slave = self.slaves.get(address)
+        if slave is None:
+            return b""
+        if function not in (3, 4):
+            return self._frame(address, function | 0x80, bytes([1]))  # illegal function
+        register, count = struct.unpack(">HH", request[2:6])
+        try:
+            values = slave(register, count)
+            payload = bytes([2 * count]) + struct.pack(f">{count}H", *values)
+        except (IndexError, KeyError, ValueError, struct.error):
+            return self._frame(address, function | 0x80, bytes([2]))  # illegal data address
+        return self._frame(address, function, payload)
+
+    @staticmethod
+    def _frame(address: int, function: int, payload: bytes) -> bytes:
+        frame = bytes([address, function]) + payload
+        return frame + minimalmodbus._calculate_crc(frame)
+
+
+def create_simulated_port(climate_profile: str = SIM_CLIMATE_PROFILE) -> SimulatedSerial:
+    """
+    Build a simulated bus with one slave per address in MODBUS_POLL_TARGETS.
+    Temperature/humidity targets follow the climate profile; other slaves
+    return zeros.
+    """
+    slaves = {}
+    for target in MODBUS_POLL_TARGETS:
+        if target["decoder"] == "temperature_humidity":
+            slaves[target["slave"]] = SimulatedClimateSensor(climate_profile)
+        else:
+            slaves.setdefault(target["slave"], StaticRegisters())
+    return SimulatedSerial(slaves)
+
+
+# --- In-memory gpiod backend (the subset of the gpiod v2 API gpio_control uses) ---
+
+class _Direction(enum.Enum):
+    AS_IS = 1
+    INPUT = 2
+    OUTPUT = 3
+
+
+class _Value(enum.Enum):
+    INACTIVE = 0
+    ACTIVE = 1
+
+
+class _Edge(enum.Enum):
+    NONE = 1
+    RISING = 2
+    FALLING = 3
+    BOTH = 4
+
+
+class _Bias(enum.Enum):
+    AS_IS = 1
+    UNKNOWN = 2
+    DISABLED = 3
+    PULL_UP = 4
+    PULL_DOWN = 5
+
+
+# Mirrors the gpiod.line submodule
+line = types.SimpleNamespace(Direction=_Direction, Value=_Value, Edge=_Edge, Bias=_Bias)
+
+
+@dataclasses.dataclass
+class LineSettings:
+    direction: _Direction = _Direction.AS_IS
+    edge_detection: _Edge = _Edge.NONE
+    bias: _Bias = _Bias.AS_IS
+    active_low: bool = False
+    debounce_period: timedelta = timedelta()
+    output_value: _Value = _Value.INACTIVE
+
+
+@dataclasses.dataclass
+class EdgeEvent:
+    """Mirrors gpiod.EdgeEvent; timestamp_ns is management.clock time."""
+
+    class Type(enum.Enum):
+        RISING_EDGE = 1
+        FALLING_EDGE = 2
+
+    event_type: "EdgeEvent.Type"
+    timestamp_ns: int
+    line_offset: int
+    global_seqno: int
+    line_seqno: int
+
+
+class SimulatedLineRequest:
+    """
+    Requested lines of a SimulatedChip. set_calls counts set_values calls,
+    i.e. the number of ioctls the real request would have issued.
+
+    Edge events of input lines are queued behind a pipe, so fd becomes
+    readable while events are pending, like the request fd of gpiod.
+    Values are logical (after active_low), as gpiod reports them.
+    """
+
+    def __init__(self, chip, settings: dict, consumer: str = None):
+        self.chip = chip
+        self.consumer = consumer
+        self.settings = settings     # offset -> LineSettings
+        self.set_calls = 0
+        self.released = False
+        self._events = collections.deque()
+        self._events_lock = threading.Lock()
+        self._line_seqno = collections.Counter()
+        self.fd, self._notify_fd = os.pipe()
+        self.chip._record({offset: setting.output_value.value
+                           for offset, setting in settings.items()
+                           if setting.direction == _Direction.OUTPUT})
+
+    @property
+    def offsets(self) -> list:
+        return list(self.settings)
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def get_value(self, offset: int) -> _Value:
+        return _Value(self.chip.values.get(offset, 0))
+
+    def get_values(self, offsets: list = None) -> list:
+        return [self.get_value(offset) for offset in (offsets or self.offsets)]
+
+    def set_value(self, offset: int, value: _Value):
+        self.set_values({offset: value})
+
+    def set_values(self, values: dict):
+        if self.released:
+            raise RuntimeError("Line request has been released")
+        unknown = set(values) - set(self.settings)
+        if unknown:
+            raise ValueError(f"Offsets {sorted(unknown)} are not part of this request")
+        inputs = [offset for offset in values if self.settings[offset].direction != _Direction.OUTPUT]
+        if inputs:
+            raise ValueError(f"Offsets {sorted(inputs)} are not configured as outputs")
+        self.set_calls += 1
+        self.chip._record({offset: value.value for offset, value in values.items()})
+
+    def wait_edge_events(self, timeout=None) -> bool:
+        """Wait up to timeout (seconds or timedelta) for pending edge events."""
+        if isinstance(timeout, timedelta):
+            timeout = timeout.total_seconds()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(readable)
+
+    def read_edge_events(self, max_events: int = None) -> list:
+        with self._events_lock:
+            count = len(self._events) if max_events is None else min(max_events, len(self._events))
+            events = [self._events.popleft() for _ in range(count)]
+            if count:
+                os.read(self.fd, count)
+        return events
+
+    def _edge(self, offset: int, value: int, timestamp: float, seqno: int):
+        """Queue an edge event if the line watches this edge."""
+        setting = self.settings.get(offset)
+        if self.released or setting is None:
+            return
+        edge = setting.edge_detection
+        if edge == _Edge.NONE or edge == (_Edge.FALLING if value else _Edge.RISING):
+            return
+        with self._events_lock:
+            self._line_seqno[offset] += 1
+            event_type = EdgeEvent.Type.RISING_EDGE if value else EdgeEvent.Type.FALLING_EDGE
+            self._events.append(EdgeEvent(event_type, int(timestamp * 1e9), offset, seqno,
+                                          self._line_seqno[offset]))
+            os.write(self._notify_fd, b"\0")
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            os.close(self.fd)
+            os.close(self._notify_fd)
+
+
+class SimulatedPlant:
+    """
+    Vents moved by the simulated motor outputs. Each device travels from
+    its close limit switch to its open one in SIM_TRAVEL_TIME clock
+    seconds; its limit switches close on arrival and open again as the
+    vent leaves them. Every vent starts fully closed.
+    """
+
+    def __init__(self, chip, travel_time: float = SIM_TRAVEL_TIME):
+        self.chip = chip
+        self.travel_time = travel_time
+        self._lock = threading.Lock()
+        self._vents = {}
+        for name in device_names():
+            pins = get_device(name)["pins"]
+            self._vents[name] = {
+                "out": {action: pins[action]["out_pin"] for action in ("open", "close")},
+                "limit": {action: pins[action].get("limit_pin") for action in ("open", "close")},
+                "position": 0.0,     # 0 = closed, 1 = open
+                "direction": 0,      # +1 opening, -1 closing
+                "since": clock.monotonic(),
+                "timer": None,
+            }
+        self._motor_pins = {pin: name for name, vent in self._vents.items()
+                            for pin in vent["out"].values()}
+        for vent in self._vents.values():
+            if vent["limit"]["close"] is not None:
+                chip.values[vent["limit"]["close"]] = 1
+
+    def position(self, device: str) -> float:
+        """Current vent position between 0 (closed) and 1 (open)."""
+        with self._lock:
+            vent = self._vents[device]
+            self._advance(vent, clock.monotonic())
+            return vent["position"]
+
+    def _advance(self, vent: dict, now: float):
+        travelled = vent["direction"] * (now - vent["since"]) / self.travel_time
+        vent["position"] = min(1.0, max(0.0, vent["position"] + travelled))
+        vent["since"] = now
+
+    def outputs_changed(self, offsets):
+        """Re-evaluate the vents whose motor outputs changed."""
+        devices = {self._motor_pins[offset] for offset in offsets if offset in self._motor_pins}
+        if not devices:
+            return
+        injections = {}
+        now = clock.monotonic()
+        with self._lock:
+            for device in devices:
+                vent = self._vents[device]
+                self._advance(vent, now)
+                opening = self.chip.values.get(vent["out"]["open"], 0)
+                closing = self.chip.values.get(vent["out"]["close"], 0)
+                direction = (1 if opening else -1) if opening != closing else 0
+                if vent["timer"] is not None:
+                    vent["timer"].cancel()
+                    vent["timer"] = None
+                vent["direction"] = direction
+                if direction == 0:
+                    continue
+                target = "open" if direction > 0 else "close"
+                leaving = vent["limit"]["close" if direction > 0 else "open"]
+                remaining = (1.0 - vent["position"]) if direction > 0 else vent["position"]
+                if leaving is not None and remaining > 0:
+                    injections[leaving] = 0
+                if remaining > 0 and vent["limit"][target] is not None:
+                    delay = remaining * self.travel_time / clock.get_speedup()
+                    vent["timer"] = threading.Timer(delay, self._arrive, (device, target))
+                    vent["timer"].daemon = True
+                    vent["timer"].start()
+        for offset, value in injections.items():
+            self.chip.inject(offset, value)
+
+    def _arrive(self, device: str, action: str):
+        with self._lock:
+            vent = self._vents[device]
+            vent["position"] = 1.0 if action == "open" else 0.0
+            vent["since"] = clock.monotonic()
+            vent["timer"] = None
+            limit = vent["limit"][action]
+        self.chip.inject(limit, 1)
+
+    def stop(self):
+        with self._lock:
+            for vent in self._vents.values():
+                if vent["timer"] is not None:
+                    vent["timer"].cancel()
+                    vent["timer"] = None
+
+
+class SimulatedChip:
+    """
+    In-memory gpiod chip. Every line transition is kept in history as
+    (clock time, offset, value), bounded to SIM_GPIO_HISTORY entries; lines
+    changed by one set_values call share a timestamp. Input lines are
+    driven by a SimulatedPlant or by inject().
+    """
+
+    def __init__(self, path: str = GPIO_CHIP, history: int = SIM_GPIO_HISTORY):
+        self.path = path
+        self.values = {}
+        self.history = collections.deque(maxlen=history)
+        self.requests = []
+        self._lock = threading.Lock()
+        self._seqno = 0
+        self.plant = SimulatedPlant(self)
+
+    def request_lines(self, config: dict, consumer: str = None, **_kwargs) -> SimulatedLineRequest:
+        settings = {}
+        for lines, setting in config.items():
+            for offset in (lines if isinstance(lines, tuple) else (lines,)):
+                settings[offset] = setting or LineSettings()
+        with self._lock:
+            taken = {offset for request in self.requests if not request.released
+                     for offset in request.settings}
+        if taken & set(settings):
+            raise OSError(f"Lines {sorted(taken & set(settings))} are busy")
+        request = SimulatedLineRequest(self, settings, consumer)
+        self.requests.append(request)
+        return request
+
+    def inject(self, offset: int, active):
+        """Set an input line (switch closed / button pressed when active)."""
+        self._record({offset: int(bool(active))})
+
+    def press(self, offset: int):
+        """Press and release a button line."""
+        self.inject(offset, 1)
+        self.inject(offset, 0)
+
+    def _record(self, values: dict):
+        now = clock.monotonic()
+        changed = {}
+        with self._lock:
+            for offset, value in values.items():
+                if self.values.get(offset) != value:
+                    self.values[offset] = value
+                    self.history.append((now, offset, value))
+                    self._seqno += 1
+                    changed[offset] = (value, self._seqno)
+            requests = list(self.requests)
+        for offset, (value, seqno) in changed.items():
+            for request in requests:
+                request._edge(offset, value, now, seqno)
+        if changed:
+            self.plant.outputs_changed(changed)
+
+    def transitions(self, offset: int = None) -> list:
+        """Return recorded (time, offset, value) transitions, optionally for one line."""
+        with self._lock:
+            return [entry for entry in self.history if offset is None or entry[1] == offset]
+
+    def high_durations(self, offset: int) -> list:
+        """Return the length in clock seconds of each completed HIGH pulse on a line."""
+        durations = []
+        rose_at = None
+        for timestamp, _offset, value in self.transitions(offset):
+            if value:
+                rose_at = timestamp
+            elif rose_at is not None:
+                durations.append(timestamp - rose_at)
+                rose_at = None
+        return durations
+
+    def close(self):
+        self.plant.stop()
+
+Chip = SimulatedChip
+
+
+def enable_simulation(speedup: float = SIM_SPEEDUP, climate_profile: str = SIM_CLIMATE_PROFILE):
+    """
+    Replace the Modbus port and the gpiod chip with the simulated backends
+    and set the clock speedup. Must run before init_gpio() and monitor_sensors().
+    """
+    from gpio import gpio_control
+    from gpio.modbus_bus import sensor_bus
+
+    port = create_simulated_port(climate_profile)
+    clock.set_speedup(speedup)
+    gpio_control.use_gpio_backend(sys.modules[__name__])
+    sensor_bus.port = port
+    log_event(f"SIMULATION: simulated sensors ({climate_profile} profile) and GPIO enabled, "
+              f"clock speedup x{speedup:g}")
@@ -7,45 +7,100 @@ Date: April 6, 2025
 This is the main entry point for the Greenhouse Control System.
 It initializes components, handles command-line arguments,
 sets up sensor monitoring, and runs the Flask web interface.
+
+By default (--role all) everything runs in this one process. For a split
+deployment start the hardware daemon (--role hardware), which owns GPIO,
+the RS485 bus and automation, and then one or more web processes
+(--role web) from the same working directory; they share the web port
+and reach the daemon over the IPC_SOCKET Unix socket.
 """
 
 import signal
 import sys
 import argparse
-import asyncio
 import threading
 import time
 from DbUI.database import init_db
+from DbUI.connection import close_all_connections
 from gpio.gpio_control import init_gpio
+from gpio.actuators import actuator_manager
+from gpio.inputs import input_monitor
 from gpio.sensors import monitor_sensors
-from management.config import stop_event
+from gpio.simulation import enable_simulation, CLIMATE_PROFILES
+from gpio.control import serve_hardware, use_remote_hardware
+from management.config import (stop_event, SIM_SPEEDUP, SIM_CLIMATE_PROFILE, WEB_HOST, WEB_PORT,
+                               IPC_SOCKET)
 from DbUI.ui import app
+from DbUI.server import serve
 from management.logger import log_event
 from DbUI.auth import auth
 from DbUI.shutter_data import shutter_data
-from DbUI.automation import automate_shutters_and_sidewalls  # Import automation logic
+from DbUI.profiling import profiler, request_profiler
+from DbUI.automation import automate_shutters_and_sidewalls, wake_automation  # Import automation logic
+
+# Set by main(): the production server and the hardware daemon return from
+# main() on their own, the development server has to be left via sys.exit
+# in the handler.
+server_mode = "production"
+role = "all"
+remote_hardware = None  # RemoteControl of a web process
+
+def shutdown():
+    """Stop the hardware side once nothing else will issue commands."""
+    if role == "web":
+        remote_hardware.stop()
+        close_all_connections()
+        return
+    input_monitor.stop()
+    # Stop any running motor and drop queued commands
+    actuator_manager.shutdown()
+    # Give background tasks a moment to notice the stop event
+    time.sleep(0.5)
+    close_all_connections()
 
 def signal_handler(sig, frame):
     """Handle termination signals by setting the stop event."""
     log_event(f"Signal {sig} received, shutting down gracefully.")
     stop_event.set()
-    # Give background tasks a moment to notice the stop event
-    time.sleep(0.5)
+    wake_automation()
+    if server_mode == "production" or role == "hardware":
+        return  # main() drains the web server or IPC server, then calls shutdown()
+    shutdown()
     sys.exit(0)
 
 def run_sensor_monitoring():
-    """Run the sensor monitoring in a dedicated thread with its own event loop."""
+    """Run the RS485 bus scheduler in a dedicated thread until stop_event is set."""
     log_event("Sensor monitoring thread starting...")
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(monitor_sensors())
+        monitor_sensors()
     except Exception as e:
         log_event(f"Error in sensor monitoring: {e}")
     finally:
-        loop.close()
         log_event("Sensor monitoring thread stopped")
 
+def start_hardware(disable_sensors: bool):
+    """Initialize GPIO and the database and start the input, sensor and automation threads."""
+    # Initialize the application components before any thread touches them;
+    # init_db migrates the schema and restores the last known device state.
+    init_db()
+    init_gpio()
+    # Limit switches and manual buttons drive the actuators from here on
+    input_monitor.start()
+    
+    # Log whether sensor monitoring is enabled.
+    if disable_sensors:
+        log_event("Sensor monitoring disabled via command-line flag.")
+    else:
+        log_event("Sensor monitoring enabled (default setting).")
+        # Start sensor monitoring in a dedicated thread.
+        sensor_thread = threading.Thread(target=run_sensor_monitoring, daemon=True)
+        sensor_thread.start()
+
+    # Start the automation logic in a dedicated thread
+    log_event("Starting automation thread...")
+    automation_thread = threading.Thread(target=automate_shutters_and_sidewalls, daemon=True)
+    automation_thread.start()
+
 def main():
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Shutter Control System")
@@ -55,42 +110,76 @@ def main():
     # When provided, this flag will disable sensor monitoring.
     parser.add_argument("-s", "--disable-sensors", action="store_true",
                         help="Disable sensor monitoring (default: enabled)")
+    # Run against simulated sensors and GPIO lines instead of the hardware.
+    parser.add_argument("--simulate", action="store_true",
+                        help="Use the simulated Modbus sensors and GPIO chip")
+    parser.add_argument("--speedup", type=float, default=SIM_SPEEDUP,
+                        help="Clock speedup factor for simulation runs (default: %(default)s)")
+    parser.add_argument("--climate-profile", choices=sorted(CLIMATE_PROFILES),
+                        default=SIM_CLIMATE_PROFILE,
+                        help="Temperature profile of the simulated sensor (default: %(default)s)")
+    # Profile every dashboard request from startup (can also be toggled at /admin/profiler).
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a cProfile dump per request to the profile directory")
+    # "dev" is Flask's development server (app.run), kept for debugging.
+    parser.add_argument("--server", choices=["production", "dev"], default="production",
+                        help="Web server: bounded thread pool with keep-alive and graceful "
+                             "drain, or the Flask development server (default: %(default)s)")
+    # Split GPIO/RS485/automation and the dashboard into separate processes.
+    parser.add_argument("--role", choices=["all", "hardware", "web"], default="all",
+                        help="all: hardware and dashboard in this process; hardware: daemon "
+                             "serving web processes over the IPC socket; web: dashboard only, "
+                             "several may share the port (default: %(default)s)")
     args = parser.parse_args()
+    global server_mode, role, remote_hardware
+    server_mode = args.server
+    role = args.role
+    if role == "web" and (args.simulate or args.disable_motors or args.disable_sensors):
+        parser.error("--simulate, --disable-motors and --disable-sensors apply to the hardware role")
     
     # Override the global motorControl value in config.
     # Default is enabled; disable if flag provided.
     from management import config
     config.motorControl = not args.disable_motors
 
+    if args.simulate:
+        enable_simulation(args.speedup, args.climate_profile)
+    elif args.speedup != SIM_SPEEDUP:
+        parser.error("--speedup requires --simulate")
+
     # Register signal handlers for graceful shutdown.
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    
-    # Log whether sensor monitoring is enabled.
-    if args.disable_sensors:
-        log_event("Sensor monitoring disabled via command-line flag.")
-    else:
-        log_event("Sensor monitoring enabled (default setting).")
-        # Start sensor monitoring in a dedicated thread.
-        sensor_thread = threading.Thread(target=run_sensor_monitoring, daemon=True)
-        sensor_thread.start()
 
-    # Start the automation logic in a dedicated thread
-    log_event("Starting automation thread...")
-    automation_thread = threading.Thread(target=automate_shutters_and_sidewalls, daemon=True)
-    automation_thread.start()
+    if role == "web":
+        # Every hardware call and event goes through the daemon
+        remote_hardware = use_remote_hardware(IPC_SOCKET)
+    else:
+        start_hardware(args.disable_sensors)
 
-    # Initialize the application components.
-    init_db()
-    init_gpio()
+    if role == "hardware":
+        ipc_server = serve_hardware(IPC_SOCKET)
+        stop_event.wait()  # set by signal_handler
+        ipc_server.stop()
+        shutdown()
+        log_event("Shutdown complete.")
+        return
     
     app.secret_key = "your_super_secure_key"
     app.register_blueprint(auth, url_prefix="/auth")
     app.register_blueprint(shutter_data)
+    app.register_blueprint(profiler)
+    if args.profile:
+        request_profiler.enable()
     
-    # Start the Flask app (this will block until shutdown).
-    log_event("Flask app starting on 0.0.0.0:5000")
-    app.run(host="0.0.0.0", port=5000)
+    # Serve the Flask app (this will block until shutdown).
+    if args.server == "dev":
+        log_event(f"Flask development server starting on {WEB_HOST}:{WEB_PORT}")
+        app.run(host=WEB_HOST, port=WEB_PORT)
+        return
+    serve(app, WEB_HOST, WEB_PORT, stop_event, reuse_port=role == "web")
+    shutdown()
+    log_event("Shutdown complete.")
 
 if __name__ == "__main__":
     main()
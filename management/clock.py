@@ -0,0 +1,48 @@
+"""
+FarmPi5 Greenhouse Control System - Clock Module
+
+Motor runtimes, idle times, poll intervals and sensor staleness are
+measured on this clock rather than on time.monotonic() directly. On the
+greenhouse controller it runs at wall speed; simulation runs can speed it
+up so that hours of operation pass in minutes. Wall clock timestamps for
+logs and stored samples are not affected.
+"""
+
+import threading
+import time
+
+_lock = threading.Lock()
+_speedup = 1.0
+_origin = time.monotonic()  # real monotonic time of the last rebase
+_offset = _origin           # clock reading at _origin
+
+
+def set_speedup(factor: float):
+    """Run the clock factor times faster than real time from now on."""
+    global _speedup, _origin, _offset
+    if factor <= 0:
+        raise ValueError("Clock speedup must be positive")
+    with _lock:
+        now = time.monotonic()
+        _offset = _offset + (now - _origin) * _speedup
+        _origin = now
+        _speedup = float(factor)
+
+
+def get_speedup() -> float:
+    return _speedup
+
+
+def monotonic() -> float:
+    """Monotonic clock reading in (possibly accelerated) seconds."""
+    return _offset + (time.monotonic() - _origin) * _speedup
+
+
+def sleep(seconds: float):
+    """Sleep for the given number of clock seconds."""
+    time.sleep(seconds / _speedup)
+
+
+def wait(event: threading.Event, timeout: float = None) -> bool:
+    """event.wait() with the timeout measured in clock seconds."""
+    return event.wait(None if timeout is None else max(0.0, timeout) / _speedup)
@@ -22,32 +22,152 @@ import threading
 # Sensor modbus port for temperature and humidity readings.
 MODBUS_PORT = "/dev/ttyUSB0" #/dev/ttyUSB0 for usb converter /dev/serial0 was here
 
+SENSOR_POLL_INTERVAL = 3      # seconds between sensor reads in the monitoring loop
+SENSOR_MAX_AGE = 15           # seconds before a cached sensor sample is considered stale
+
+# RS485 bus settings shared by every slave on MODBUS_PORT.
+MODBUS_BAUDRATE = 9600
+MODBUS_TIMEOUT = 0.5          # seconds to wait for a slave's response
+MODBUS_BACKOFF_MAX = 60       # longest delay (seconds) between polls of a slave that stopped responding
+MODBUS_REQUEST_TIMEOUT = 5    # seconds a caller waits for a queued bus transaction
+
+# Slaves and register blocks polled on the bus, each at its own interval (seconds).
+# "name" is the sensor cache key, "decoder" picks the conversion in gpio.sensors.DECODERS.
+# "climate" is the primary temperature/humidity sensor used by automation.
+MODBUS_POLL_TARGETS = [
+    {"name": "climate", "slave": 1, "register": 0, "count": 2, "function": 3,
+     "interval": SENSOR_POLL_INTERVAL, "decoder": "temperature_humidity"},
+]
+
+# Simulation (main.py --simulate): a simulated Modbus slave and in-memory
+# GPIO lines replace the hardware, and the clock can run faster than real time.
+SIM_SPEEDUP = 1.0                  # clock speedup factor (--speedup)
+SIM_CLIMATE_PROFILE = "diurnal"    # temperature profile served by the simulated sensor
+SIM_GPIO_HISTORY = 10000           # line transitions kept by the simulated GPIO chip
+SIM_TRAVEL_TIME = 12               # seconds a simulated vent takes from one limit switch to the other
+
 # GPIO pins on or off for motor control. True means motor (GPIO) control is active.
 motorControl = True
 
-# Shutter GPIO mapping: only output pins are now used.
+# Shutter GPIO mapping per direction: "out_pin" drives the motor, the optional
+# "limit_pin" is the end-of-travel switch and "button_pin" the manual push button.
+# Inputs are wired to ground (active low, internal pull-up); remove a key if
+# the switch or button is not fitted.
 SLUG_SHUTTER_PINS = {
-    "open": {"out_pin": 4},  # 5
-    "close": {"out_pin": 17},  # 11
+    "open": {"out_pin": 4, "limit_pin": 23, "button_pin": 6},  # 5, 16, 31
+    "close": {"out_pin": 17, "limit_pin": 24, "button_pin": 13},  # 11, 18, 33
 }
 SLUG_SIDEWALL_PINS = {
-    "open": {"out_pin": 27},  # 13
-    "close": {"out_pin": 22},  # 15
+    "open": {"out_pin": 27, "limit_pin": 25, "button_pin": 19},  # 13, 22, 35
+    "close": {"out_pin": 22, "limit_pin": 16, "button_pin": 26},  # 15, 36, 37
 }
+INPUT_DEBOUNCE_MS = 10        # kernel debounce period for limit switches and buttons
 
+GPIO_CHIP = "/dev/gpiochip4"   # gpiod chip carrying the header pins on the Pi 5
 LED_PIN = 5                   # LED for pre-/post-operation indication
 MOTOR_RUNTIME = 15            # seconds the motor must stay HIGH exactly
+ACTUATOR_WORKERS = 4          # minimum worker threads driving motors; raised to one per registered device
 
 
 # Temperature thresholds for automatic control (in Celsius)
+# These and the setpoints below are defaults for the settings table;
+# the live values are edited at runtime through /settings.
 LOWER_TEMP = 18  # Below this, shutters will close
 HIGHER_TEMP = 30  # Above this, shutters will open
 AUTO_CHECK_INTERVAL = 600  # Check every 10 minutes (600 seconds)
 
+# Automation scheduler setpoints (in Fahrenheit) and minimum seconds between movements.
+SIDEWALL_OPEN_SETPOINT = 75.0
+SIDEWALL_CLOSE_SETPOINT = 70.0
+SHUTTER_OPEN_SETPOINT = 65.0
+SHUTTER_CLOSE_SETPOINT = 60.0
+SIDEWALL_IDLE_TIME = 3 * 60
+SHUTTER_IDLE_TIME = 60
+
+# Device registry: every shutter/sidewall the controller drives, in display order.
+# Add an entry here to control another vent; the UI, automation and GPIO
+# layers pick it up from management.devices. Setpoints and idle times are the
+# defaults for the device's entries in the settings table.
+DEVICES = [
+    {
+        "name": "Slug Shutter",
+        "pins": SLUG_SHUTTER_PINS,
+        "runtime": MOTOR_RUNTIME,
+        "open_setpoint": SHUTTER_OPEN_SETPOINT,
+        "close_setpoint": SHUTTER_CLOSE_SETPOINT,
+        "idle_time": SHUTTER_IDLE_TIME,
+    },
+    {
+        "name": "Slug Sidewall",
+        "pins": SLUG_SIDEWALL_PINS,
+        "runtime": MOTOR_RUNTIME,
+        "open_setpoint": SIDEWALL_OPEN_SETPOINT,
+        "close_setpoint": SIDEWALL_CLOSE_SETPOINT,
+        "idle_time": SIDEWALL_IDLE_TIME,
+    },
+]
+
+# Live event channel (/events): events buffered per connected client, and
+# seconds between keep-alive comments on an idle stream.
+EVENT_QUEUE_SIZE = 100
+SSE_KEEPALIVE_INTERVAL = 15
 
 # Database and log configuration.
 DB_FILE = "shutters_control.db"
+DB_BUSY_TIMEOUT = 5.0         # seconds a writer waits on a locked database before failing
+DB_POOL_SIZE = 8              # idle SQLite connections kept open for reuse
+SAMPLE_RETENTION = 7 * 24 * 60 * 60  # seconds raw sensor samples are kept (rollups are kept forever)
 LOG_FILE = "logged_data.json"
+LOG_QUEUE_SIZE = 10000        # entries buffered for the background log writer
+LOG_BATCH_SIZE = 256          # entries written per batch
+LOG_FLUSH_INTERVAL = 1.0      # seconds before a partial batch is flushed
+LOG_OVERFLOW_POLICY = "drop_oldest"  # "drop_oldest", "drop_newest" or "block" when the queue is full
+LOG_BLOCK_TIMEOUT = 1.0              # seconds "block" waits for room before writing the entry directly
+LOG_MAX_BYTES = 5 * 1024 * 1024      # rotate the log file once it reaches this size
+LOG_MAX_AGE = 24 * 60 * 60           # ... or once its first entry is this many seconds old
+LOG_COMPRESSION = "gzip"             # compaction of rotated segments: "gzip", "msgpack" or None
+LOG_RETENTION_SEGMENTS = 30          # rotated segments kept on disk
+LOG_RETENTION_AGE = 90 * 24 * 60 * 60  # seconds before a rotated segment is deleted
+
+# Metrics exposed at /metrics (Prometheus text format): histogram bucket
+# upper bounds in seconds.
+METRICS_PREFIX = "farmpi"
+METRICS_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+METRICS_MOTOR_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 60, 120)
+# /metrics skips the dashboard login so scrapers can read it. With a token
+# set, scrapers must send "Authorization: Bearer <token>"; without one only
+# these client addresses (a scraper on the Pi itself) are answered.
+METRICS_TOKEN = None
+METRICS_ALLOWED_HOSTS = ("127.0.0.1", "::1")
+
+# Request profiler (--profile or the /admin/profiler toggle): one cProfile
+# file per request, oldest deleted beyond PROFILE_MAX_FILES.
+PROFILE_DIR = "profiles"
+PROFILE_MAX_FILES = 200
+PROFILE_TOP_N = 30                   # functions listed by the summary view
+PROFILE_TOP_MAX = 500                # most functions ?top= may ask the summary view for
+PROFILE_SKIP_PATHS = ("/events", "/static", "/admin/profiler")  # never profiled (/events never ends)
+
+# Production web server (main.py --server production). Every open connection
+# holds one worker until it closes; /events streams are moved to their own
+# threads instead.
+WEB_HOST = "0.0.0.0"
+WEB_PORT = 5000
+WEB_WORKERS = 16              # request threads; further connections wait in the listen backlog
+WEB_LISTEN_BACKLOG = 64       # connections the kernel queues while every worker is busy
+WEB_REQUEST_TIMEOUT = 30      # seconds a client may stall while sending a request
+WEB_KEEPALIVE_TIMEOUT = 5     # seconds an idle keep-alive connection is kept open
+WEB_DRAIN_TIMEOUT = 10        # seconds in-flight requests get to finish at shutdown
+WEB_MAX_STREAMS = 64          # open /events streams, each on its own thread outside the pool
+
+# Split deployment (main.py --role hardware / --role web): the hardware
+# daemon serves GPIO, sensor and settings calls to the web processes on this
+# Unix socket, relative to the working directory like DB_FILE.
+IPC_SOCKET = "farmpi5-hardware.sock"
+IPC_TIMEOUT = 5.0             # seconds a web process waits for the daemon's answer
+IPC_POOL_SIZE = 8             # idle connections each web process keeps to the daemon
+IPC_MAX_MESSAGE = 1024 * 1024 # bytes buffered for one message before the connection is dropped
+IPC_RECONNECT_INTERVAL = 2.0  # seconds between attempts to re-open the event stream
 
 # Global stop event – used by threads for graceful shutdown.
 stop_event = threading.Event()
@@ -0,0 +1,80 @@
+"""
+FarmPi5 Greenhouse Control System - Device Registry
+
+Maps device names to their GPIO pins, motor runtime and default setpoints.
+The registry is built once from management.config.DEVICES; lookups by name
+are dictionary lookups, and every layer iterates all_devices() instead of
+naming individual shutters.
+"""
+
+from management.config import DEVICES
+
+DEVICE_ACTIONS = ("open", "close")
+
+_registry = {}  # name -> device dict, in configuration order
+
+
+def load_devices(devices: list = DEVICES):
+    """
+    (Re)build the registry from a list of device dicts.
+    Raises ValueError for duplicate names, missing pin mappings or a pin
+    used twice.
+    """
+    registry = {}
+    for device in devices:
+        name = device["name"]
+        if name in registry:
+            raise ValueError(f"Duplicate device name '{name}'")
+        for action in DEVICE_ACTIONS:
+            if "out_pin" not in device["pins"].get(action, {}):
+                raise ValueError(f"Device '{name}' has no out_pin for '{action}'")
+        registry[name] = device
+
+    used = {}
+    for device in registry.values():
+        for action in DEVICE_ACTIONS:
+            for key, pin in device["pins"][action].items():
+                if pin in used:
+                    raise ValueError(f"Pin {pin} of '{device['name']}' is already used by {used[pin]}")
+                used[pin] = f"'{device['name']}' {action} {key}"
+    _registry.clear()
+    _registry.update(registry)
+
+
+def get_device(name: str) -> dict:
+    """Return the registry entry for a device, or None if it is unknown."""
+    return _registry.get(name)
+
+
+def all_devices() -> list:
+    """Return every registered device, in configuration order."""
+    return list(_registry.values())
+
+
+def device_names() -> list:
+    """Return the names of every registered device, in configuration order."""
+    return list(_registry)
+
+
+def motor_pins() -> set:
+    """Return every motor output pin used by a registered device."""
+    return {device["pins"][action]["out_pin"]
+            for device in _registry.values() for action in DEVICE_ACTIONS}
+
+
+def input_pins() -> dict:
+    """
+    Return every limit switch and button input as
+    {pin: (device name, "limit" or "button", action)}.
+    """
+    inputs = {}
+    for device in _registry.values():
+        for action in DEVICE_ACTIONS:
+            pins = device["pins"][action]
+            for kind in ("limit", "button"):
+                if f"{kind}_pin" in pins:
+                    inputs[pins[f"{kind}_pin"]] = (device["name"], kind, action)
+    return inputs
+
+
+load_devices()
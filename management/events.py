@@ -0,0 +1,82 @@
+"""
+FarmPi5 Greenhouse Control System - In-Process Event Hub
+
+A small publish/subscribe hub for live state changes: sensor samples,
+device status transitions and the active motor count. Publishers never
+block; each subscriber (e.g. one /events SSE connection) gets its own
+bounded queue, and a slow subscriber only loses its own oldest events.
+"""
+
+import queue
+import threading
+from management.config import EVENT_QUEUE_SIZE
+
+
+class EventHub:
+    """
+    Fan-out of (event_type, data) tuples to any number of subscriber queues.
+    """
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self) -> queue.Queue:
+        """Return a new queue that receives every event published from now on."""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event_type: str, data: dict):
+        """Deliver an event to every subscriber without blocking."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        event = (event_type, data)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Drop this subscriber's oldest event to make room.
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    pass
+
+
+# Shared hub for the whole process
+event_hub = EventHub()
+
+# Set in web processes of a split deployment, where the hardware daemon's
+# hub is the one every process's /events streams are fed from.
+_forward = None
+
+
+def forward_events(callback):
+    """
+    Hand publish_event() calls to callback(event_type, data) instead of the
+    local hub, or publish locally again with None.
+    """
+    global _forward
+    _forward = callback
+
+
+def publish_event(event_type: str, data: dict):
+    """Publish an event on the shared hub (or wherever forward_events points)."""
+    if _forward is not None:
+        _forward(event_type, data)
+        return
+    event_hub.publish(event_type, data)
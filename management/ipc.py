@@ -0,0 +1,321 @@
+"""
+FarmPi5 Greenhouse Control System - Local IPC Channel
+
+msgpack-RPC style messages over a Unix domain socket, used between the
+hardware daemon (main.py --role hardware), which owns GPIO, the RS485 bus
+and automation, and the web processes (--role web):
+
+    request       [0, msgid, method, params]
+    response      [1, msgid, error, result]    error is None or [type, message]
+    notification  [2, method, params]          no response
+
+IPCServer answers requests with a table of handler functions. A client
+that calls "subscribe" turns its connection into an event stream: every
+event published on the daemon's hub is pushed as an "event" notification
+until the client disconnects. IPCClient keeps a small pool of connections
+so concurrent web threads do not queue behind each other.
+"""
+
+import itertools
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+import msgpack  # bundled
+from management.logger import log_event
+from management.events import event_hub
+from management.metrics import ipc_call_seconds, ipc_errors_total
+from management.config import IPC_TIMEOUT, IPC_POOL_SIZE, IPC_MAX_MESSAGE
+
+REQUEST, RESPONSE, NOTIFICATION = 0, 1, 2
+
+# Exception types re-raised as themselves on the calling side; anything
+# else arrives as RemoteError.
+PASSTHROUGH_ERRORS = {"ValueError": ValueError, "KeyError": KeyError}
+
+
+class HardwareUnavailable(ConnectionError):
+    """The hardware daemon could not be reached or dropped the connection."""
+
+
+class RemoteError(RuntimeError):
+    """A handler in the hardware daemon raised an unexpected exception."""
+
+
+class Channel:
+    """
+    One connected socket exchanging msgpack messages. send() may be called
+    from several threads; receive() from one thread at a time.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._packer = msgpack.Packer()
+        self._unpacker = msgpack.Unpacker(raw=False, max_buffer_size=IPC_MAX_MESSAGE)
+        self._send_lock = threading.Lock()
+
+    def send(self, message: list):
+        with self._send_lock:
+            self.sock.sendall(self._packer.pack(message))
+
+    def receive(self) -> list:
+        """Return the next message; raises ConnectionError when the peer closes."""
+        while True:
+            try:
+                return next(self._unpacker)
+            except StopIteration:
+                pass
+            data = self.sock.recv(64 * 1024)
+            if not data:
+                raise ConnectionError("IPC peer closed the connection")
+            self._unpacker.feed(data)
+
+    def close(self):
+        """Close the socket, waking a thread blocked in receive()."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class _IPCRequestHandler(socketserver.BaseRequestHandler):
+    """Serves one client connection until it closes or the server stops."""
+
+    def handle(self):
+        channel = Channel(self.request)
+        with self.server.channels_lock:
+            self.server.channels.add(channel)
+        try:
+            self._serve(channel)
+        finally:
+            with self.server.channels_lock:
+                self.server.channels.discard(channel)
+
+    def _serve(self, channel: Channel):
+        while not self.server.stopping.is_set():
+            try:
+                message = channel.receive()
+            except (OSError, ValueError):  # disconnected, or not msgpack
+                return
+            if not isinstance(message, list) or not message:
+                return
+            if message[0] == NOTIFICATION and len(message) == 3:
+                self._notify(message[1], message[2])
+            elif message[0] == REQUEST and len(message) == 4:
+                _kind, msgid, method, params = message
+                if method == "subscribe":
+                    channel.send([RESPONSE, msgid, None, True])
+                    self._stream_events(channel)
+                    return
+                try:
+                    channel.send([RESPONSE, msgid, *self._call(method, params)])
+                except OSError:
+                    return
+            else:
+                return
+
+    def _call(self, method: str, params: list) -> tuple:
+        """Run a handler and return (error, result) for the response."""
+        handler = self.server.handlers.get(method)
+        if handler is None:
+            return ["AttributeError", f"Unknown method '{method}'"], None
+        try:
+            return None, handler(*params)
+        except Exception as e:
+            if type(e).__name__ not in PASSTHROUGH_ERRORS:
+                log_event(f"ERROR: IPC call {method} failed: {e!r}")
+            return [type(e).__name__, str(e)], None
+
+    def _notify(self, method: str, params: list):
+        handler = self.server.handlers.get(method)
+        if handler is None:
+            return
+        try:
+            handler(*params)
+        except Exception as e:
+            log_event(f"ERROR: IPC notification {method} failed: {e!r}")
+
+    def _stream_events(self, channel: Channel):
+        """Forward every hub event to this client until it goes away."""
+        subscription = event_hub.subscribe()
+        try:
+            while not self.server.stopping.is_set():
+                try:
+                    event_type, data = subscription.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                channel.send([NOTIFICATION, "event", [event_type, data]])
+        except OSError:
+            pass
+        finally:
+            event_hub.unsubscribe(subscription)
+
+
+class IPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server dispatching requests to handlers ({method: callable}).
+    Each connection is served by its own daemon thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, handlers: dict):
+        self.path = path
+        self.handlers = dict(handlers)
+        self.stopping = threading.Event()
+        self.channels = set()       # open client connections
+        self.channels_lock = threading.Lock()
+        _remove_stale_socket(path)
+        super().__init__(path, _IPCRequestHandler)
+        os.chmod(path, 0o660)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="ipc-server", daemon=True).start()
+        log_event(f"Hardware IPC listening on {self.path}")
+
+    def stop(self):
+        """Stop accepting and close every client connection."""
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+        with self.channels_lock:
+            channels = list(self.channels)
+        for channel in channels:
+            channel.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(path: str):
+    """Unlink a socket file left by a daemon that died; refuse if one is still listening."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"Another hardware daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+class IPCClient:
+    """
+    Calls methods on an IPCServer. Thread-safe; each call checks out one
+    pooled connection for its request and response.
+    """
+
+    def __init__(self, path: str, timeout: float = IPC_TIMEOUT, pool_size: int = IPC_POOL_SIZE):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)  # idle channels, most recently used first
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+
+    def connect(self, timeout: float = None) -> Channel:
+        """Open a new connection to the server."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout if timeout is None else timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise HardwareUnavailable(f"Hardware daemon not reachable at {self.path}: {e}") from e
+        return Channel(sock)
+
+    def _next_id(self) -> int:
+        with self._ids_lock:
+            return next(self._ids)
+
+    def _checkout(self) -> tuple:
+        """Return (channel, pooled): an idle pooled channel if there is one."""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self.connect(), False
+
+    def _checkin(self, channel: Channel):
+        try:
+            self._pool.put_nowait(channel)
+        except queue.Full:
+            channel.close()
+
+    def call(self, method: str, *params):
+        """
+        Call method on the server and return its result. Raises
+        HardwareUnavailable if the daemon cannot be reached.
+        """
+        started = time.perf_counter()
+        try:
+            return self._call(method, params)
+        finally:
+            ipc_call_seconds.observe(time.perf_counter() - started, method=method)
+
+    def _send(self, method: str, message: list) -> Channel:
+        """
+        Send message on a pooled (or new) connection and return it. A pooled
+        connection whose daemon has since gone away fails on send, before
+        the daemon can have seen the request, so only that failure is
+        retried on another connection; a timeout never is.
+        """
+        channel, pooled = self._checkout()
+        try:
+            channel.send(message)
+        except OSError as e:
+            channel.close()
+            if pooled and not isinstance(e, socket.timeout):
+                return self._send(method, message)
+            ipc_errors_total.inc(method=method)
+            raise HardwareUnavailable(f"IPC {method} failed: {e}") from e
+        return channel
+
+    def _call(self, method: str, params: tuple):
+        msgid = self._next_id()
+        channel = self._send(method, [REQUEST, msgid, method, list(params)])
+        try:
+            response = channel.receive()
+        except (OSError, ValueError) as e:  # ValueError: undecodable msgpack
+            # The daemon may already have run the request: never resend it
+            channel.close()
+            ipc_errors_total.inc(method=method)
+            raise HardwareUnavailable(f"IPC call {method} failed: {e}") from e
+        if (not isinstance(response, list) or len(response) != 4
+                or response[0] != RESPONSE or response[1] != msgid):
+            channel.close()
+            ipc_errors_total.inc(method=method)
+            raise HardwareUnavailable(f"IPC call {method}: unexpected response")
+        self._checkin(channel)
+        _kind, _msgid, error, result = response
+        if error is not None:
+            error_type, message = error
+            raise PASSTHROUGH_ERRORS.get(error_type, RemoteError)(message)
+        return result
+
+    def notify(self, method: str, *params):
+        """Send a notification without waiting; raises HardwareUnavailable on failure."""
+        self._checkin(self._send(method, [NOTIFICATION, method, list(params)]))
+
+    def subscribe(self) -> Channel:
+        """
+        Open a dedicated connection receiving "event" notifications. Its
+        receive() blocks until the next event (no timeout).
+        """
+        channel = self.connect()
+        channel.send([REQUEST, self._next_id(), "subscribe", []])
+        channel.receive()  # acknowledgement
+        channel.sock.settimeout(None)
+        return channel
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,162 @@
+"""
+FarmPi5 Greenhouse Control System - Log Rotation and Reading
+
+The background log writer appends to LOG_FILE and rotates it here once it
+passes LOG_MAX_BYTES or LOG_MAX_AGE. Rotated segments are named after the
+time range they cover (logged_data.json.<first>-<last>[.gz|.msgpack]),
+optionally compacted with gzip or msgpack, and pruned down to the retention
+limits. iter_log_entries() streams entries for a time window across all
+segments, opening only the segments whose range overlaps the window.
+"""
+
+import gzip
+import json
+import os
+import re
+import time
+from management.config import (LOG_FILE, LOG_COMPRESSION, LOG_RETENTION_SEGMENTS,
+                               LOG_RETENTION_AGE)
+
+SEGMENT_SUFFIXES = {None: "", "gzip": ".gz", "msgpack": ".msgpack"}
+# Suffix of a segment name after the log file's basename
+_SEGMENT_SUFFIX = r"\.(\d+)-(\d+)(?:\.(\d+))?(\.gz|\.msgpack)?$"
+
+
+def read_first_timestamp(path: str = LOG_FILE):
+    """Return the timestamp of the first entry in a plain log file, or None."""
+    try:
+        with open(path) as f:
+            line = f.readline()
+        return json.loads(line)["timestamp"] if line else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def list_segments(log_file: str = LOG_FILE) -> list:
+    """
+    Return rotated segments as (start, end, path) tuples, oldest first.
+    """
+    directory = os.path.dirname(log_file) or "."
+    pattern = re.compile(re.escape(os.path.basename(log_file)) + _SEGMENT_SUFFIX)
+    segments = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return segments
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+            # Segments rotated within the same second carry a counter; keep them in order
+            counter = int(match.group(3) or 0)
+            segments.append((start, end, counter, os.path.join(directory, name)))
+    segments.sort()
+    return [(start, end, path) for start, end, _counter, path in segments]
+
+
+def rotate_log(start: float, end: float, log_file: str = LOG_FILE):
+    """
+    Move the current log file aside as a segment covering [start, end],
+    compact it according to LOG_COMPRESSION and apply the retention limits.
+    The caller must have closed its handle on log_file.
+    """
+    base = f"{log_file}.{int(start)}-{int(end)}"
+    rotated = base
+    counter = 1
+    while os.path.exists(rotated) or any(os.path.exists(rotated + suffix)
+                                         for suffix in SEGMENT_SUFFIXES.values()):
+        rotated = f"{base}.{counter}"
+        counter += 1
+    os.replace(log_file, rotated)
+
+    if LOG_COMPRESSION is not None:
+        compact_segment(rotated, LOG_COMPRESSION)
+    prune_segments(log_file)
+
+
+def compact_segment(path: str, compression: str) -> str:
+    """
+    Rewrite a plain JSON-lines segment as gzip or msgpack and remove the
+    original. Returns the path of the compacted segment.
+    """
+    target = path + SEGMENT_SUFFIXES[compression]
+    tmp = target + ".tmp"
+    with open(path, "rb") as src:
+        if compression == "gzip":
+            with gzip.open(tmp, "wb", compresslevel=6) as dst:
+                for line in src:
+                    dst.write(line)
+        elif compression == "msgpack":
+            import msgpack  # bundled; only needed when msgpack compaction is enabled
+            packer = msgpack.Packer()
+            with open(tmp, "wb") as dst:
+                for line in src:
+                    line = line.strip()
+                    if line:
+                        dst.write(packer.pack(json.loads(line)))
+        else:
+            raise ValueError(f"Unknown log compression: {compression}")
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+
+def prune_segments(log_file: str = LOG_FILE, now: float = None):
+    """
+    Delete the oldest segments beyond LOG_RETENTION_SEGMENTS and any segment
+    whose newest entry is older than LOG_RETENTION_AGE.
+    """
+    if now is None:
+        now = time.time()
+    segments = list_segments(log_file)
+    excess = max(0, len(segments) - LOG_RETENTION_SEGMENTS)
+    for index, (_start, end, path) in enumerate(segments):
+        if index < excess or now - end > LOG_RETENTION_AGE:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _read_segment(path: str):
+    """Yield the entries of one segment file, whatever its format."""
+    if path.endswith(".msgpack"):
+        import msgpack
+        with open(path, "rb") as f:
+            yield from msgpack.Unpacker(f, raw=False)
+        return
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # partial line from a crash mid-write
+
+
+def iter_log_entries(since: float = None, until: float = None, log_file: str = LOG_FILE):
+    """
+    Yield log entries with since <= timestamp < until, oldest first, across
+    rotated segments and the live log file. Segments are streamed one entry
+    at a time and skipped entirely when their range is outside the window.
+    """
+    paths = [path for start, end, path in list_segments(log_file)
+             if (since is None or end + 1 > since) and (until is None or start < until)]
+    paths.append(log_file)
+
+    for path in paths:
+        try:
+            entries = _read_segment(path)
+            for entry in entries:
+                ts = entry.get("timestamp", 0)
+                if since is not None and ts < since:
+                    continue
+                if until is not None and ts >= until:
+                    continue
+                yield entry
+        except FileNotFoundError:
+            continue  # pruned or rotated while we were reading
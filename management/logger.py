@@ -1,20 +1,290 @@
 import time
 import datetime
 import json
+import queue
+import atexit
 import threading
-from management.config import LOG_FILE
+from management.config import (LOG_FILE, LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL,
+                               LOG_OVERFLOW_POLICY, LOG_BLOCK_TIMEOUT, LOG_MAX_BYTES, LOG_MAX_AGE,
+                               stop_event)
+from management.log_segments import rotate_log, read_first_timestamp
+from management.log_segments import iter_log_entries  # re-exported reader API
+from management.metrics import registry, log_write_seconds, log_dropped_total
 
 LOG_LOCK = threading.Lock()
 
+# Entries waiting for the background writer. log_event only enqueues;
+# the writer thread owns the file handle and the console output.
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_writer_thread = None
+_writer_lock = threading.Lock()
+_dropped_count = 0
+_STOP = object()  # sentinel waking the writer to drain and exit
+# flush() queues a threading.Event, set by the writer once every entry ahead of it is written
+_stop_requested = threading.Event()  # set with _STOP, in case the sentinel cannot be queued
+# Set in web processes of a split deployment: batches go to the hardware
+# daemon, which owns LOG_FILE and its rotation, instead of to the file.
+_forward = None
+
+registry.gauge("log_queue_depth", "Log entries waiting for the background writer.",
+               function=_log_queue.qsize)
+
 def log_event(event: str):
     """
-    Append a log event as a JSON entry to the log file and print it to the console.
+    Queue a log event for the background writer, which appends it as a JSON
+    entry to the log file and prints it to the console.
+
+    When the queue is full, LOG_OVERFLOW_POLICY decides what happens:
+    "drop_oldest" discards the oldest queued entry, "drop_newest" discards
+    this one and "block" waits up to LOG_BLOCK_TIMEOUT for room, then
+    writes the entry directly. Dropped entries are counted and reported by
+    the writer.
     """
     entry = {"timestamp": time.time(), "event": event}
+    if not _ensure_writer():
+        # Writer has shut down (or cannot start); fall back to a direct write.
+        if not _forward_entries([entry]):
+            _write_entries([entry])
+        return
+    _enqueue(entry)
+
+def log_entries(entries: list):
+    """Queue entries logged by another process (see forward_log), keeping their timestamps."""
+    for entry in entries:
+        entry = {"timestamp": float(entry["timestamp"]), "event": str(entry["event"])}
+        if not _ensure_writer():
+            _write_entries([entry])
+        else:
+            _enqueue(entry)
+
+def forward_log(callback):
+    """
+    Hand every batch of entries to callback(entries) instead of writing and
+    rotating LOG_FILE, so a single process owns the file; None writes
+    locally again. If callback raises, the batch is printed and counted
+    as dropped, never written here.
+    """
+    global _forward
+    _forward = callback
+
+def _enqueue(entry: dict):
+    global _dropped_count
+    try:
+        _log_queue.put_nowait(entry)
+        return
+    except queue.Full:
+        pass
+
+    if LOG_OVERFLOW_POLICY == "block":
+        try:
+            _log_queue.put(entry, timeout=LOG_BLOCK_TIMEOUT)
+        except queue.Full:
+            # The writer is stuck or gone; never hang motor or HTTP threads on it.
+            if not _forward_entries([entry]):
+                _write_entries([entry])
+        return
+
+    if LOG_OVERFLOW_POLICY == "drop_oldest":
+        try:
+            oldest = _log_queue.get_nowait()
+        except queue.Empty:
+            oldest = None
+        if oldest is _STOP or isinstance(oldest, threading.Event):
+            entry = oldest  # keep the stop or flush request; the new entry is the one dropped
+        try:
+            _log_queue.put_nowait(entry)
+        except queue.Full:
+            pass
+    with _writer_lock:
+        _dropped_count += 1
+    log_dropped_total.inc()
+
+def _ensure_writer() -> bool:
+    """Start the writer thread on first use. Returns False once logging has been stopped."""
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return True
+    with _writer_lock:
+        if _writer_thread is not None:
+            return _writer_thread.is_alive()
+        _writer_thread = threading.Thread(target=_writer_loop, name="log-writer", daemon=True)
+        _writer_thread.start()
+    return True
+
+def _format_console(entry: dict) -> str:
+    stamp = datetime.datetime.fromtimestamp(entry["timestamp"]).strftime('%Y-%m-%d %H:%M:%S')
+    return f"[LOG] {stamp} - {entry['event']}"
+
+def _write_entries(entries: list, f=None):
+    """Write a batch of entries to the log file (opening it if no handle is given) and the console."""
+    started = time.perf_counter()
+    lines = "".join(json.dumps(entry) + "\n" for entry in entries)
     with LOG_LOCK:
         try:
-            with open(LOG_FILE, "a") as f:
-                f.write(json.dumps(entry) + "\n")
+            if f is None:
+                with open(LOG_FILE, "a") as log_file:
+                    log_file.write(lines)
+            else:
+                f.write(lines)
         except Exception as e:
             print(f"[ERROR] Logging event failed: {e}")
-    print(f"[LOG] {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {event}")
+    print("\n".join(_format_console(entry) for entry in entries))
+    log_write_seconds.observe(time.perf_counter() - started)
+
+def _forward_entries(entries: list) -> bool:
+    """Send a batch to the log's owner. Returns False if this process owns the log."""
+    forward = _forward
+    if forward is None:
+        return False
+    try:
+        forward(entries)
+    except Exception as e:
+        print("\n".join(_format_console(entry) for entry in entries))
+        print(f"[ERROR] Could not forward {len(entries)} log entries: {e}")
+        log_dropped_total.inc(len(entries))
+    return True
+
+def _take_dropped_count() -> int:
+    global _dropped_count
+    with _writer_lock:
+        dropped, _dropped_count = _dropped_count, 0
+    return dropped
+
+def _open_log_file():
+    try:
+        return open(LOG_FILE, "a")
+    except Exception as e:
+        print(f"[ERROR] Could not open log file {LOG_FILE}: {e}")
+        return None
+
+def _rotate_if_needed(f, segment_start: float, segment_end: float):
+    """
+    Rotate the log file when it exceeds LOG_MAX_BYTES or LOG_MAX_AGE.
+    Returns the (possibly new) file handle and segment start time.
+    """
+    if f is None or segment_start is None:
+        return f, segment_start
+    if f.tell() < LOG_MAX_BYTES and time.time() - segment_start < LOG_MAX_AGE:
+        return f, segment_start
+    with LOG_LOCK:
+        f.close()
+        try:
+            rotate_log(segment_start, segment_end, LOG_FILE)
+        except Exception as e:
+            print(f"[ERROR] Log rotation failed: {e}")
+        f = _open_log_file()
+    return f, None
+
+def _writer_loop():
+    """
+    Background writer: batches queued entries, keeps one file handle open and
+    flushes when LOG_BATCH_SIZE entries are pending, LOG_FLUSH_INTERVAL has
+    passed or flush() asks for it. Rotates the file by size and age. Drains the queue and exits when
+    stop_event is set. While forward_log is set, batches go to the log's
+    owner and no handle is kept.
+    """
+    f = _open_log_file()
+    segment_start = read_first_timestamp(LOG_FILE)
+
+    pending = []
+    flushes = []  # flush() requests answered once pending is written
+    last_flush = time.monotonic()
+    stopping = False
+    try:
+        while True:
+            timeout = max(0.0, LOG_FLUSH_INTERVAL - (time.monotonic() - last_flush))
+            try:
+                entry = _log_queue.get(timeout=timeout)
+                if entry is _STOP:
+                    stopping = True
+                elif isinstance(entry, threading.Event):
+                    flushes.append(entry)
+                else:
+                    pending.append(entry)
+                # Pull whatever else is already queued without blocking.
+                while len(pending) < LOG_BATCH_SIZE:
+                    entry = _log_queue.get_nowait()
+                    if entry is _STOP:
+                        stopping = True
+                        continue
+                    if isinstance(entry, threading.Event):
+                        flushes.append(entry)
+                        continue
+                    pending.append(entry)
+            except queue.Empty:
+                pass
+
+            if stop_event.is_set() or _stop_requested.is_set():
+                stopping = True
+
+            dropped = _take_dropped_count()
+            if dropped:
+                pending.append({"timestamp": time.time(),
+                                "event": f"Logger queue full: {dropped} log entries dropped."})
+
+            due = time.monotonic() - last_flush >= LOG_FLUSH_INTERVAL
+            if pending and (len(pending) >= LOG_BATCH_SIZE or due or stopping or flushes):
+                if _forward_entries(pending):
+                    if f is not None:
+                        # Another process rotates LOG_FILE; never write to a stale handle.
+                        f.close()
+                        f = segment_start = None
+                else:
+                    if f is None:
+                        f = _open_log_file()
+                        segment_start = read_first_timestamp(LOG_FILE)
+                    _write_entries(pending, f)
+                    if f is not None:
+                        f.flush()
+                    if segment_start is None:
+                        segment_start = pending[0]["timestamp"]
+                    f, segment_start = _rotate_if_needed(f, segment_start, pending[-1]["timestamp"])
+                pending = []
+            if due or not pending:
+                last_flush = time.monotonic()
+            for done in flushes:
+                done.set()
+            flushes = []
+
+            if stopping and _log_queue.empty():
+                break
+    finally:
+        if pending and not _forward_entries(pending):
+            _write_entries(pending, f)
+        if f is not None:
+            f.close()
+        for done in flushes:
+            done.set()
+
+def flush(timeout: float = 5.0) -> bool:
+    """
+    Wait until every entry logged before the call has been written (or
+    forwarded). Returns False if that did not happen within timeout.
+    """
+    thread = _writer_thread
+    if thread is None or not thread.is_alive():
+        return True  # nothing queued: entries are written as they are logged
+    deadline = time.monotonic() + timeout
+    done = threading.Event()
+    try:
+        _log_queue.put(done, timeout=timeout)
+    except queue.Full:
+        return False
+    return done.wait(max(0.0, deadline - time.monotonic()))
+
+def stop_log_writer(timeout: float = 5.0):
+    """
+    Drain queued entries to disk and stop the writer thread. Later log_event
+    calls write synchronously.
+    """
+    thread = _writer_thread
+    if thread is None or not thread.is_alive():
+        return
+    _stop_requested.set()
+    try:
+        _log_queue.put(_STOP, timeout=timeout)
+    except queue.Full:
+        pass
+    thread.join(timeout)
+
+atexit.register(stop_log_writer)
@@ -0,0 +1,232 @@
+"""
+FarmPi5 Greenhouse Control System - Metrics Registry
+
+In-process counters, gauges and fixed-bucket histograms for the hot paths
+(RS485 bus, actuators, HTTP routes, logger, SQLite), rendered in the
+Prometheus text exposition format at /metrics. Recording a value is a
+dict lookup and an addition under a lock, so it is cheap enough for every
+Modbus transaction and HTTP request. The metrics themselves are defined at
+the bottom of this module so every name is in one place.
+"""
+
+import bisect
+import math
+import threading
+from management.config import METRICS_PREFIX, METRICS_FAST_BUCKETS, METRICS_MOTOR_BUCKETS
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Common part of every metric: a name, help text and label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}   # label values tuple -> value (or histogram state)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. Pass function to read the value at
+    scrape time instead of setting it (only for unlabelled gauges).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list:
+        if self.function is None:
+            return super()._samples()
+        try:
+            value = self.function()
+        except Exception:
+            return []
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple, labelnames: tuple = ()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts, +Inf last; then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def snapshot(self, **labels) -> dict:
+        """Return {"count", "sum", "buckets": {upper bound: cumulative count}} for one label set."""
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, [[0] * (len(self.buckets) + 1), 0.0])
+            counts = list(counts)
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            running += count
+            cumulative[bound] = running
+        return {"count": running, "sum": total, "buckets": cumulative}
+
+    def _samples(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            running = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                running += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named metrics of the process. Registering a name twice returns the
+    existing metric so modules can be reloaded safely.
+    """
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        full_name = f"{self.prefix}_{name}" if self.prefix else name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {full_name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple = (), function=None) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames, function)
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = METRICS_FAST_BUCKETS,
+                  labelnames: tuple = ()) -> Histogram:
+        return self._register(Histogram, name, help_text, buckets, labelnames)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry for the whole process
+registry = MetricsRegistry()
+
+# --- Metrics recorded by the rest of the code base ---
+
+modbus_roundtrip_seconds = registry.histogram(
+    "modbus_roundtrip_seconds", "Modbus request/response round-trip time on the RS485 wire.",
+    labelnames=("slave",))
+modbus_errors_total = registry.counter(
+    "modbus_errors_total", "Failed Modbus transactions by error class.", ("slave", "error"))
+http_request_seconds = registry.histogram(
+    "http_request_seconds", "Time to produce an HTTP response, by route.",
+    labelnames=("route", "method"))
+http_responses_total = registry.counter(
+    "http_responses_total", "HTTP responses by route and status code.", ("route", "method", "status"))
+log_write_seconds = registry.histogram(
+    "log_write_seconds", "Time to write one batch of log entries to the log file and console.")
+log_dropped_total = registry.counter(
+    "log_dropped_total", "Log entries dropped because the log queue was full.")
+motor_runtime_seconds = registry.histogram(
+    "motor_runtime_seconds", "Time a motor output was driven, per device and direction.",
+    METRICS_MOTOR_BUCKETS, ("device", "action"))
+sqlite_transaction_seconds = registry.histogram(
+    "sqlite_transaction_seconds",
+    "Time a pooled SQLite connection was checked out, including the commit.")
+sqlite_errors_total = registry.counter(
+    "sqlite_errors_total", "SQLite transactions that failed with a database error.")
+ipc_call_seconds = registry.histogram(
+    "ipc_call_seconds", "Round-trip time of calls to the hardware daemon, by method.",
+    labelnames=("method",))
+ipc_errors_total = registry.counter(
+    "ipc_errors_total", "Calls to the hardware daemon that failed to get a response.", ("method",))
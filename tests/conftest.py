@@ -0,0 +1,39 @@
+import os
+import sys
+
+# The repository root also holds vendored modules named like the standard
+# library (logging.py, http.py), so it goes at the end of the search path.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+import queue
+import threading
+import pytest
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    """Point the SQLite connection pool at a fresh database file in tmp_path."""
+    from DbUI import connection
+    connection.close_all_connections()
+    path = str(tmp_path / "shutters_control.db")
+    monkeypatch.setattr(connection, "DB_FILE", path)
+    yield path
+    connection.close_all_connections()
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """A fresh log writer state logging to tmp_path; yields the log file path."""
+    from management import logger
+    logger.stop_log_writer()  # a running writer would read the patched queue too
+    path = tmp_path / "logged_data.json"
+    monkeypatch.setattr(logger, "LOG_FILE", str(path))
+    monkeypatch.setattr(logger, "_log_queue", queue.Queue(maxsize=100))
+    monkeypatch.setattr(logger, "_writer_thread", None)
+    monkeypatch.setattr(logger, "_stop_requested", threading.Event())
+    monkeypatch.setattr(logger, "_dropped_count", 0)
+    monkeypatch.setattr(logger, "_forward", None)
+    yield path
+    logger.stop_log_writer()
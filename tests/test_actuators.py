@@ -0,0 +1,133 @@
+import time
+import pytest
+
+from management import config
+from management.devices import load_devices
+from gpio import actuators
+from gpio.actuators import ActuatorManager
+
+# Six vents with long runtimes: every movement runs until a command stops it
+TEST_DEVICES = [
+    {"name": f"Vent {n}", "runtime": 30,
+     "pins": {"open": {"out_pin": 100 + 2 * n}, "close": {"out_pin": 101 + 2 * n}}}
+    for n in range(6)
+]
+
+
+class FakeLine:
+    def __init__(self):
+        self.value = 0
+        self.history = []
+
+    def set_value(self, value: int):
+        self.value = value
+        self.history.append(value)
+
+
+@pytest.fixture
+def rig(monkeypatch):
+    """Fake output lines and position store for TEST_DEVICES; yields (lines, positions, make_manager)."""
+    load_devices(TEST_DEVICES)
+    lines = {}
+    for device in TEST_DEVICES:
+        for action, pins in device["pins"].items():
+            lines[device["name"], action] = lines[pins["out_pin"]] = FakeLine()
+    positions = []
+    managers = []
+
+    def set_outputs(values: dict):
+        for pin, value in values.items():
+            lines[pin].set_value(value)
+
+    def make_manager(workers: int = None) -> ActuatorManager:
+        manager = ActuatorManager(workers)
+        managers.append(manager)
+        return manager
+
+    monkeypatch.setattr(config, "motorControl", True)
+    monkeypatch.setattr(actuators, "gpio_lines", lines)
+    monkeypatch.setattr(actuators, "set_outputs", set_outputs)
+    monkeypatch.setattr(actuators, "record_device_position",
+                        lambda device, position, status=None: positions.append((device, position)))
+    monkeypatch.setattr(actuators, "motor_started", lambda: None)
+    monkeypatch.setattr(actuators, "motor_finished", lambda: None)
+    monkeypatch.setattr(actuators, "all_motors_off", lambda: None)
+    try:
+        yield lines, positions, make_manager
+    finally:
+        for manager in managers:
+            manager.shutdown()
+        load_devices()
+
+
+def wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_repeated_command_is_a_noop(rig):
+    lines, positions, make_manager = rig
+    manager = make_manager()
+    assert manager.command("Vent 0", "open") == "started"
+    wait_for(lambda: lines["Vent 0", "open"].value == 1)
+
+    assert manager.command("Vent 0", "open") == "noop"
+    assert manager.state("Vent 0") == {"state": "opening", "action": "open", "pending": None}
+    assert lines["Vent 0", "open"].history == [1]
+    assert positions == [("Vent 0", "opening")]
+
+
+def test_last_command_wins(rig):
+    lines, positions, make_manager = rig
+    manager = make_manager()
+    assert manager.command("Vent 0", "open") == "started"
+    assert manager.command("Vent 0", "close") == "queued"
+    assert manager.command("Vent 0", "close") == "noop"
+    assert manager.command("Vent 0", "open") == "queued"
+    assert manager.intended_actions["Vent 0"] == "open"
+
+    wait_for(lambda: manager.state("Vent 0") == {"state": "opening", "action": "open", "pending": None})
+    wait_for(lambda: lines["Vent 0", "open"].value == 1)
+    assert lines["Vent 0", "close"].value == 0
+    assert positions[-1] == ("Vent 0", "opening")
+
+
+def test_stop_cancels_movement_and_drops_queued_command(rig):
+    lines, positions, make_manager = rig
+    manager = make_manager()
+    assert manager.command("Vent 0", "open") == "started"
+    assert manager.command("Vent 0", "close") == "queued"
+    assert manager.command("Vent 0", "stop") == "stopping"
+
+    wait_for(lambda: manager.state("Vent 0")["state"] == "idle")
+    assert "Vent 0" not in manager.intended_actions
+    assert lines["Vent 0", "open"].value == 0
+    assert lines["Vent 0", "close"].history in ([], [0])  # never driven high
+    assert ("Vent 0", "closing") not in positions
+    assert manager.command("Vent 0", "stop") == "noop"
+
+
+def test_movement_cancelled_before_pickup_never_starts(rig):
+    lines, positions, make_manager = rig
+    manager = make_manager(workers=1)
+    assert manager.command("Vent 0", "open") == "started"
+    wait_for(lambda: lines["Vent 0", "open"].value == 1)  # the only worker is busy
+    assert manager.command("Vent 1", "open") == "started"
+    assert manager.command("Vent 1", "stop") == "stopping"
+    assert manager.command("Vent 0", "stop") == "stopping"
+
+    wait_for(lambda: manager.state("Vent 1")["state"] == "idle")
+    assert lines["Vent 1", "open"].history == []
+    assert not [entry for entry in positions if entry[0] == "Vent 1"]
+
+
+def test_pool_drives_every_device_at_once(rig):
+    lines, _positions, make_manager = rig
+    manager = make_manager()
+    for device in TEST_DEVICES:
+        assert manager.command(device["name"], "open") == "started"
+    # More devices than ACTUATOR_WORKERS: none waits for a free worker
+    wait_for(lambda: all(lines[device["name"], "open"].value == 1 for device in TEST_DEVICES),
+             timeout=1.0)
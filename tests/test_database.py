@@ -0,0 +1,78 @@
+import sqlite3
+from datetime import datetime
+
+from DbUI.database import MIGRATIONS, init_db, get_all_device_states
+
+# Schema and rows as written by the original init_db, before migrations existed
+BASELINE_SCHEMA = '''
+    CREATE TABLE shutters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL CHECK(name IN ('Slug Sidewall', 'Slug Shutter')),
+        status TEXT NOT NULL CHECK(status IN ('open', 'closed', 'automatic', 'live'))
+    );
+    CREATE TABLE logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        event TEXT NOT NULL
+    );
+'''
+BASELINE_LOGS = [
+    ("2024-05-01 03:15 PM", "Temperature: 72.5"),
+    ("2024-05-01 03:16 PM", "Slug Shutter opened."),
+    ("2024-05-01 11:02 AM", "Database initialized with updated schema."),
+    ("2024-05-02 15:17:00", "Slug Sidewall motor stopped."),
+]
+
+
+def make_baseline_db(path: str):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executemany("INSERT INTO shutters (name, status) VALUES (?, ?)",
+                         [("Slug Sidewall", "open"), ("Slug Shutter", "closed")])
+        conn.executemany("INSERT INTO logs (timestamp, event) VALUES (?, ?)", BASELINE_LOGS)
+    conn.close()
+
+
+def read_db(path: str):
+    conn = sqlite3.connect(path)
+    try:
+        logs = conn.execute("SELECT id, timestamp, category, event FROM logs ORDER BY id").fetchall()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+    return logs, version
+
+
+def legacy_epoch(value: str) -> float:
+    for fmt in ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+
+def test_baseline_database_migrates_without_losing_data(db_file):
+    make_baseline_db(db_file)
+
+    init_db()
+    logs, version = read_db(db_file)
+    states = get_all_device_states()
+
+    assert version == len(MIGRATIONS)
+    assert logs == [
+        (1, legacy_epoch("2024-05-01 03:15 PM"), "temperature", "Temperature: 72.5"),
+        (2, legacy_epoch("2024-05-01 03:16 PM"), "shutter", "Slug Shutter opened."),
+        (3, legacy_epoch("2024-05-01 11:02 AM"), "system", "Database initialized with updated schema."),
+        (4, legacy_epoch("2024-05-02 15:17:00"), "shutter", "Slug Sidewall motor stopped."),
+    ]
+    assert states["Slug Sidewall"]["status"] == "open"
+    assert states["Slug Sidewall"]["position"] == "open"
+    assert states["Slug Shutter"]["status"] == "closed"
+    assert states["Slug Shutter"]["position"] == "closed"
+
+    # A restart runs no migration and leaves rows and device state alone
+    init_db()
+    assert read_db(db_file) == (logs, version)
+    assert get_all_device_states() == states
@@ -0,0 +1,53 @@
+import threading
+import time
+import pytest
+
+from management.ipc import IPCClient, IPCServer, HardwareUnavailable
+
+
+def start_server(path, calls):
+    def slow():
+        calls.append("slow")
+        time.sleep(0.5)
+        return "done"
+
+    def echo(value):
+        calls.append("echo")
+        return value
+
+    server = IPCServer(str(path), {"slow": slow, "echo": echo})
+    server.start()
+    return server
+
+
+def test_timed_out_call_is_not_resent(tmp_path):
+    calls = []
+    server = start_server(tmp_path / "ipc.sock", calls)
+    client = IPCClient(str(tmp_path / "ipc.sock"), timeout=0.2)
+    try:
+        assert client.call("echo", 1) == 1  # leaves a pooled connection behind
+        started = time.monotonic()
+        with pytest.raises(HardwareUnavailable):
+            client.call("slow")
+        assert time.monotonic() - started < 0.4
+        time.sleep(0.5)
+        assert calls.count("slow") == 1
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_stale_pooled_connection_is_replaced(tmp_path):
+    path = tmp_path / "ipc.sock"
+    calls = []
+    server = start_server(path, calls)
+    client = IPCClient(str(path))
+    try:
+        assert client.call("echo", "a") == "a"
+        server.stop()  # the daemon restarts; the pooled connection is now dead
+        server = start_server(path, calls)
+        assert client.call("echo", "b") == "b"
+        assert calls == ["echo", "echo"]
+    finally:
+        client.close()
+        server.stop()
@@ -0,0 +1,43 @@
+import time
+
+from gpio.led import LedEngine, LED_PATTERNS
+
+
+class FakeLine:
+    def __init__(self):
+        self.value = 0
+
+    def set_value(self, value: int):
+        self.value = value
+
+
+def fast_patterns() -> dict:
+    """LED_PATTERNS with every step shortened to 10 ms."""
+    return {name: {**pattern, "steps": [(value, 0.01) for value, _hold in pattern["steps"]]}
+            for name, pattern in LED_PATTERNS.items()}
+
+
+def wait_idle(engine: LedEngine, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while engine.current() is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_start_after_queued_stop_keeps_led_on():
+    line = FakeLine()
+    engine = LedEngine(lambda: line, fast_patterns())
+    engine.play("start")   # motor A starts
+    engine.play("stop")    # A stops during the flash: queued behind it
+    engine.play("start")   # motor B starts before the flash ends
+    wait_idle(engine)
+    assert engine.current() is None
+    assert line.value == 1
+
+
+def test_stop_during_start_flash_plays_afterwards():
+    line = FakeLine()
+    engine = LedEngine(lambda: line, fast_patterns())
+    engine.play("start")
+    engine.play("stop")
+    wait_idle(engine)
+    assert line.value == 0
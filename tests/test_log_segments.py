@@ -0,0 +1,94 @@
+import json
+import os
+import re
+import time
+import pytest
+
+from management import log_segments, logger
+from management.log_segments import (list_segments, rotate_log, prune_segments,
+                                     iter_log_entries)
+
+T0 = int(time.time()) - 3600  # entry timestamps used throughout, inside the retention age
+
+
+def write_entries(path, entries: list):
+    with open(path, "a") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def entries_between(start: int, end: int) -> list:
+    return [{"timestamp": float(ts), "event": f"event {ts}"} for ts in range(start, end + 1)]
+
+
+def test_writer_rotates_past_the_size_limit(log_file, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_MAX_BYTES", 200)
+    monkeypatch.setattr(logger, "LOG_BATCH_SIZE", 2)
+    monkeypatch.setattr(log_segments, "LOG_COMPRESSION", "gzip")
+    for n in range(20):
+        logger.log_event(f"test {n:02d}")
+    logger.stop_log_writer()
+
+    segments = list_segments(str(log_file))
+    assert len(segments) >= 2
+    for start, end, path in segments:
+        assert re.fullmatch(r"logged_data\.json\.\d+-\d+(\.\d+)?\.gz", os.path.basename(path))
+        assert start <= end
+        assert os.path.getsize(path) > 0
+    events = [entry["event"] for entry in iter_log_entries(log_file=str(log_file))]
+    assert [event for event in events if event.startswith("test ")] == [f"test {n:02d}" for n in range(20)]
+
+
+@pytest.mark.parametrize("compression, suffix", [(None, ""), ("gzip", ".gz"), ("msgpack", ".msgpack")])
+def test_compacted_segment_reads_back(tmp_path, monkeypatch, compression, suffix):
+    if compression == "msgpack":
+        pytest.importorskip("msgpack")
+    monkeypatch.setattr(log_segments, "LOG_COMPRESSION", compression)
+    log_file = str(tmp_path / "logged_data.json")
+    entries = entries_between(T0, T0 + 9)
+    write_entries(log_file, entries)
+
+    rotate_log(T0, T0 + 9, log_file)
+
+    assert [os.path.basename(path) for _start, _end, path in list_segments(log_file)] == [
+        f"logged_data.json.{T0}-{T0 + 9}{suffix}"]
+    assert not os.path.exists(log_file)
+    assert list(iter_log_entries(log_file=log_file)) == entries
+    assert list(iter_log_entries(T0 + 3, T0 + 5, log_file)) == entries[3:5]
+
+
+def test_retention_removes_the_oldest_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_segments, "LOG_COMPRESSION", None)
+    monkeypatch.setattr(log_segments, "LOG_RETENTION_SEGMENTS", 2)
+    log_file = str(tmp_path / "logged_data.json")
+    for n in range(4):
+        start = T0 + 100 * n
+        write_entries(log_file, entries_between(start, start + 9))
+        rotate_log(start, start + 9, log_file)
+
+    assert [(start, end) for start, end, _path in list_segments(log_file)] == [
+        (T0 + 200, T0 + 209), (T0 + 300, T0 + 309)]
+
+
+def test_retention_removes_segments_past_the_age_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_segments, "LOG_RETENTION_AGE", 150)
+    log_file = str(tmp_path / "logged_data.json")
+    for n in range(3):
+        start = T0 + 100 * n
+        write_entries(f"{log_file}.{start}-{start + 9}", entries_between(start, start + 9))
+
+    prune_segments(log_file, now=T0 + 300)
+    assert [start for start, _end, _path in list_segments(log_file)] == [T0 + 200]
+
+
+def test_list_segments_matches_the_given_log_file(tmp_path):
+    for name in ("other.log.10-20.gz", "other.log.30-40.1", "logged_data.json.50-60",
+                 "other.log", "other.log.notes"):
+        (tmp_path / name).touch()
+
+    assert list_segments(str(tmp_path / "other.log")) == [
+        (10, 20, str(tmp_path / "other.log.10-20.gz")),
+        (30, 40, str(tmp_path / "other.log.30-40.1")),
+    ]
+    assert [path for _start, _end, path in list_segments(str(tmp_path / "logged_data.json"))] == [
+        str(tmp_path / "logged_data.json.50-60")]
@@ -0,0 +1,128 @@
+import json
+import queue
+import threading
+import time
+import pytest
+
+from management import logger
+from management.logger import log_event, flush, stop_log_writer
+
+
+@pytest.fixture
+def stalled_writer(log_file, monkeypatch):
+    """A writer that never takes anything off a two-entry queue."""
+    monkeypatch.setattr(logger, "_log_queue", queue.Queue(maxsize=2))
+    release = threading.Event()
+    thread = threading.Thread(target=release.wait, daemon=True)
+    thread.start()
+    monkeypatch.setattr(logger, "_writer_thread", thread)
+    yield logger._log_queue
+    release.set()
+    thread.join()
+    monkeypatch.setattr(logger, "_writer_thread", None)
+
+
+def logged_events(path) -> list:
+    if not path.exists():
+        return []
+    with open(path) as f:
+        events = [json.loads(line)["event"] for line in f]
+    return [event for event in events if event.startswith("test ")]
+
+
+def queued_events(log_queue) -> list:
+    return [entry if entry is logger._STOP else entry["event"] for entry in log_queue.queue]
+
+
+def wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_interval(log_file, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_BATCH_SIZE", 3)
+    monkeypatch.setattr(logger, "LOG_FLUSH_INTERVAL", 60)
+    for n in range(3):
+        log_event(f"test {n}")
+    wait_for(lambda: logged_events(log_file) == ["test 0", "test 1", "test 2"])
+
+    log_event("test 3")
+    time.sleep(0.2)
+    assert logged_events(log_file) == ["test 0", "test 1", "test 2"]  # partial batch waits
+
+
+def test_partial_batch_is_flushed_after_the_interval(log_file, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_FLUSH_INTERVAL", 0.1)
+    log_event("test alone")
+    wait_for(lambda: logged_events(log_file) == ["test alone"])
+
+
+def test_stop_drains_the_queue(log_file, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_FLUSH_INTERVAL", 60)
+    for n in range(50):
+        log_event(f"test {n}")
+    stop_log_writer()
+
+    assert not logger._writer_thread.is_alive()
+    assert logged_events(log_file) == [f"test {n}" for n in range(50)]
+    log_event("test after stop")  # written directly once the writer is gone
+    assert logged_events(log_file)[-1] == "test after stop"
+
+
+def test_flush_writes_a_partial_batch_at_once(log_file, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_FLUSH_INTERVAL", 60)
+    for n in range(3):
+        log_event(f"test {n}")
+    assert flush(timeout=2)
+    assert logged_events(log_file) == ["test 0", "test 1", "test 2"]
+    assert flush(timeout=2)  # nothing pending
+
+
+def test_flush_times_out_behind_a_stalled_writer(stalled_writer):
+    log_event("test a")
+    started = time.monotonic()
+    assert not flush(timeout=0.2)
+    assert time.monotonic() - started < 1.0
+
+
+def test_drop_oldest_policy(stalled_writer, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_OVERFLOW_POLICY", "drop_oldest")
+    for name in ("a", "b", "c"):
+        log_event(f"test {name}")
+    assert queued_events(stalled_writer) == ["test b", "test c"]
+    assert logger._dropped_count == 1
+
+
+@pytest.mark.parametrize("request_entry", [logger._STOP, threading.Event()], ids=["stop", "flush"])
+def test_drop_oldest_keeps_stop_and_flush_requests(stalled_writer, monkeypatch, request_entry):
+    monkeypatch.setattr(logger, "LOG_OVERFLOW_POLICY", "drop_oldest")
+    stalled_writer.put_nowait(request_entry)
+    log_event("test a")
+    log_event("test b")
+    assert list(stalled_writer.queue)[1] is request_entry
+    assert logger._dropped_count == 1
+
+
+def test_drop_newest_policy(stalled_writer, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_OVERFLOW_POLICY", "drop_newest")
+    for name in ("a", "b", "c"):
+        log_event(f"test {name}")
+    assert queued_events(stalled_writer) == ["test a", "test b"]
+    assert logger._dropped_count == 1
+
+
+def test_block_policy_waits_then_writes_directly(stalled_writer, log_file, monkeypatch):
+    monkeypatch.setattr(logger, "LOG_OVERFLOW_POLICY", "block")
+    monkeypatch.setattr(logger, "LOG_BLOCK_TIMEOUT", 0.2)
+    log_event("test a")
+    log_event("test b")
+    started = time.monotonic()
+    log_event("test c")
+    waited = time.monotonic() - started
+
+    assert 0.2 <= waited < 1.0
+    assert queued_events(stalled_writer) == ["test a", "test b"]
+    assert logged_events(log_file) == ["test c"]
+    assert logger._dropped_count == 0
@@ -0,0 +1,91 @@
+import threading
+import pytest
+
+import minimalmodbus  # type: ignore[import]
+from gpio import modbus_bus
+from gpio.modbus_bus import ModbusBus
+
+
+class FakeClock:
+    """Virtual management.clock: waiting advances time instead of sleeping."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def wait(self, event: threading.Event, timeout: float = None) -> bool:
+        if event.is_set():
+            return True
+        if timeout is None:
+            return event.wait(1.0)
+        self.now += max(0.0, timeout)
+        return False
+
+
+class FakeSerial:
+    def close(self):
+        pass
+
+
+class FakeInstrument:
+    """One slave; fails the calls whose (1-based) numbers are in failures."""
+
+    roundtrip_time = None
+
+    def __init__(self, bus, clock, slave: int, polls: list, limit: int, failures=()):
+        self.bus, self.clock, self.slave = bus, clock, slave
+        self.polls, self.limit, self.failures = polls, limit, set(failures)
+        self.calls = 0
+        self.serial = FakeSerial()
+
+    def read_registers(self, register: int, count: int, function: int = 3):
+        self.calls += 1
+        self.polls.append((self.slave, self.clock.now))
+        if len(self.polls) >= self.limit:
+            self.bus.stop()
+        if self.calls in self.failures:
+            raise minimalmodbus.NoResponseError("no answer")
+        return [self.slave] * count
+
+
+def run_schedule(monkeypatch, targets: list, limit: int, failures: dict = None,
+                 backoff_max: float = 60.0) -> list:
+    """Poll targets on a virtual clock until limit polls have run; returns [(slave, time)]."""
+    clock = FakeClock()
+    monkeypatch.setattr(modbus_bus, "clock", clock)
+    bus = ModbusBus(port="/dev/null", backoff_max=backoff_max)
+    polls = []
+    instruments = {target["slave"]: FakeInstrument(bus, clock, target["slave"], polls, limit,
+                                                   (failures or {}).get(target["slave"], ()))
+                   for target in targets}
+    monkeypatch.setattr(bus, "_instrument", instruments.__getitem__)
+    bus.schedule(targets, lambda target, sample: None)
+    bus._thread.join(5)
+    assert not bus._thread.is_alive()
+    return [(slave, round(at, 2)) for slave, at in polls]
+
+
+def target(name: str, slave: int, interval: float) -> dict:
+    return {"name": name, "slave": slave, "register": 0, "count": 2, "interval": interval}
+
+
+def test_targets_are_polled_in_order_at_their_intervals(monkeypatch):
+    polls = run_schedule(monkeypatch, [target("climate", 1, 1.0), target("soil", 2, 2.5)], limit=9)
+    assert polls == [(1, 0.0), (2, 0.0), (1, 1.0), (1, 2.0), (2, 2.5),
+                     (1, 3.0), (1, 4.0), (1, 5.0), (2, 5.0)]
+
+
+def test_backoff_grows_after_errors_and_resets_after_success(monkeypatch):
+    polls = run_schedule(monkeypatch, [target("co2", 3, 1.0)], limit=6,
+                         failures={3: (1, 2, 3)}, backoff_max=5.0)
+    # Failed polls wait 2, 4, then 8 capped at 5 seconds; a success restores the interval
+    assert [at for _slave, at in polls] == [0.0, 2.0, 6.0, 11.0, 12.0, 13.0]
+
+
+def test_failing_slave_does_not_delay_the_others(monkeypatch):
+    polls = run_schedule(monkeypatch, [target("climate", 1, 1.0), target("co2", 3, 1.0)], limit=10,
+                         failures={3: range(1, 100)})
+    assert [at for slave, at in polls if slave == 1] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert [at for slave, at in polls if slave == 3] == [0.0, 2.0, 6.0]
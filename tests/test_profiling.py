@@ -0,0 +1,70 @@
+from datetime import datetime
+import pytest
+
+pytest.importorskip("werkzeug")
+from flask import Flask
+from DbUI import profiling
+from DbUI.auth import auth
+from DbUI.profiling import RequestProfiler, profiler
+from management.config import PROFILE_TOP_N, PROFILE_TOP_MAX
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A logged-in client of an app wrapped in a profiler writing to tmp_path."""
+    request_profiler = RequestProfiler(profile_dir=str(tmp_path / "profiles"))
+    monkeypatch.setattr(profiling, "request_profiler", request_profiler)
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(auth, url_prefix="/auth")
+    app.register_blueprint(profiler)
+
+    @app.route("/work")
+    def work():
+        return str(sorted(str(n) for n in range(2000))[:3])
+
+    app.wsgi_app = request_profiler.wrap(app.wsgi_app)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+        session["login_time"] = datetime.utcnow().isoformat()
+    return client
+
+
+def listed_functions(summary: str) -> int:
+    """Number of function rows in a pstats listing."""
+    lines = summary.splitlines()
+    header = next(index for index, line in enumerate(lines) if line.lstrip().startswith("ncalls"))
+    return sum(1 for line in lines[header + 1:] if line.strip())
+
+
+def test_profiler_records_and_summarizes_requests(client):
+    assert client.post("/admin/profiler", json={"enabled": True}).get_json() == {"enabled": True}
+    assert client.get("/work").status_code == 200
+    assert client.get("/work").status_code == 200
+    client.post("/admin/profiler", json={"enabled": False})
+
+    profiles = client.get("/admin/profiler").get_json()["profiles"]
+    assert [(p["method"], p["path"]) for p in profiles] == [("GET", "work"), ("GET", "work")]
+
+    summary = client.get("/admin/profiler/summary?top=3")
+    assert summary.status_code == 200
+    assert summary.get_data(as_text=True).startswith("2 profile(s), sorted by cumulative")
+    assert listed_functions(summary.get_data(as_text=True)) == 3
+
+
+@pytest.mark.parametrize("top, expected", [("-5", "1"), ("0", "1"), ("abc", None),
+                                           ("99999999", str(PROFILE_TOP_MAX))])
+def test_summary_top_is_validated(client, top, expected):
+    client.post("/admin/profiler", json={"enabled": True})
+    client.get("/work")
+    client.post("/admin/profiler", json={"enabled": False})
+
+    response = client.get(f"/admin/profiler/summary?top={top}")
+    assert response.status_code == 200
+    reference = client.get(f"/admin/profiler/summary?top={expected or PROFILE_TOP_N}")
+    assert response.get_data() == reference.get_data()
+
+
+def test_summary_rejects_unknown_sort(client):
+    assert client.get("/admin/profiler/summary?sort=name").status_code == 400
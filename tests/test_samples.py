@@ -0,0 +1,78 @@
+import time
+import pytest
+
+from DbUI.database import init_db
+from DbUI.samples import record_sample, get_rollups, get_samples
+
+HOUR = (int(time.time()) // 3600 - 2) * 3600  # start of a recent hour
+SAMPLES = [  # (offset, temperature, humidity)
+    (0, 70.0, 40.0),
+    (30, 72.0, 44.0),
+    (60, 80.0, 50.0),
+    (900, 60.0, 30.0),
+]
+
+
+@pytest.fixture
+def samples(db_file):
+    init_db()
+    for offset, temperature, humidity in SAMPLES:
+        record_sample(temperature, humidity, timestamp=HOUR + offset)
+
+
+def bucket(timestamp, count, temperature, humidity) -> dict:
+    """Expected rollup row; temperature and humidity are (min, max, avg)."""
+    return {
+        "timestamp": timestamp,
+        "count": count,
+        "temperature": dict(zip(("min", "max", "avg"), temperature)),
+        "humidity": dict(zip(("min", "max", "avg"), humidity)),
+    }
+
+
+def test_one_minute_rollups(samples):
+    assert get_rollups("1m", HOUR, HOUR + 3600) == [
+        bucket(HOUR, 2, (70.0, 72.0, 71.0), (40.0, 44.0, 42.0)),
+        bucket(HOUR + 60, 1, (80.0, 80.0, 80.0), (50.0, 50.0, 50.0)),
+        bucket(HOUR + 900, 1, (60.0, 60.0, 60.0), (30.0, 30.0, 30.0)),
+    ]
+
+
+def test_fifteen_minute_and_hourly_rollups(samples):
+    # since is rounded down to the start of its bucket
+    assert get_rollups("15m", HOUR + 100, HOUR + 3600) == [
+        bucket(HOUR, 3, (70.0, 80.0, 74.0), (40.0, 50.0, pytest.approx(134 / 3))),
+        bucket(HOUR + 900, 1, (60.0, 60.0, 60.0), (30.0, 30.0, 30.0)),
+    ]
+    assert get_rollups("1h", HOUR, HOUR + 3600) == [
+        bucket(HOUR, 4, (60.0, 80.0, 70.5), (30.0, 50.0, 41.0)),
+    ]
+    assert get_rollups("1h", HOUR + 3600, HOUR + 7200) == []
+
+
+def test_raw_samples_window(samples):
+    assert get_samples(HOUR + 30, HOUR + 900) == [(HOUR + 30, 72.0, 44.0), (HOUR + 60, 80.0, 50.0)]
+
+
+def test_samples_endpoint_resolution(samples):
+    flask = pytest.importorskip("flask")
+    from DbUI.shutter_data import shutter_data
+    app = flask.Flask(__name__)
+    app.register_blueprint(shutter_data)
+    client = app.test_client()
+    window = {"since": HOUR, "until": HOUR + 3600}
+
+    response = client.get("/shutter-data/samples", query_string={"resolution": "1h", **window})
+    assert response.get_json() == {
+        "resolution": "1h",
+        "samples": [bucket(HOUR, 4, (60.0, 80.0, 70.5), (30.0, 50.0, 41.0))],
+    }
+
+    response = client.get("/shutter-data/samples", query_string={"resolution": "1m", **window})
+    assert [row["timestamp"] for row in response.get_json()["samples"]] == [HOUR, HOUR + 60, HOUR + 900]
+
+    response = client.get("/shutter-data/samples", query_string={"resolution": "raw", **window})
+    assert [row["temperature"] for row in response.get_json()["samples"]] == [70.0, 72.0, 80.0, 60.0]
+
+    response = client.get("/shutter-data/samples", query_string={"resolution": "5m"})
+    assert response.status_code == 400
@@ -0,0 +1,71 @@
+import socket
+import threading
+import pytest
+
+pytest.importorskip("werkzeug")
+from DbUI.server import PooledWSGIServer
+
+
+def app(environ, start_response):
+    if environ["PATH_INFO"] == "/events":
+        start_response("200 OK", [("Content-Type", "text/event-stream")])
+        stop = environ["test.stop"]
+
+        def stream():
+            yield b": connected\n\n"
+            while not stop.wait(0.05):
+                yield b": keep-alive\n\n"
+        return stream()
+    start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+    return [b"ok"]
+
+
+@pytest.fixture
+def server():
+    stop = threading.Event()
+    server = PooledWSGIServer("127.0.0.1", 0, lambda environ, start_response: app(
+        {**environ, "test.stop": stop}, start_response), workers=2, max_streams=6)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    stop.set()
+    server.draining = True
+    server.shutdown()
+    server.drain(timeout=2)
+
+
+def get(port: int, path: str, timeout: float = 3.0) -> tuple:
+    """Send a GET and return (socket, status code, response headers)."""
+    sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return sock, int(data.split()[1]), data
+
+
+def test_streams_do_not_hold_pool_workers(server):
+    streams = [get(server.port, "/events")[0] for _ in range(5)]  # more than the 2 workers
+    try:
+        assert server.active_streams() == 5
+        for _ in range(3):
+            sock, status, _data = get(server.port, "/status")
+            sock.close()
+            assert status == 200
+    finally:
+        for sock in streams:
+            sock.close()
+
+
+def test_streams_above_limit_are_rejected(server):
+    streams = [get(server.port, "/events")[0] for _ in range(6)]
+    try:
+        sock, status, data = get(server.port, "/events")
+        sock.close()
+        assert status == 503
+        assert b"Retry-After: 30" in data
+    finally:
+        for sock in streams:
+            sock.close()
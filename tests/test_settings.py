@@ -0,0 +1,57 @@
+import pytest
+
+from DbUI import settings
+from DbUI.database import init_db
+from DbUI.settings import update_settings, get_settings, load_settings, add_settings_listener
+
+
+@pytest.fixture
+def notified(db_file, monkeypatch):
+    """Fresh settings on an empty database; yields the list of listener calls."""
+    monkeypatch.setattr(settings, "_listeners", [])
+    init_db()
+    calls = []
+    add_settings_listener(lambda: calls.append(dict(get_settings())))
+    return calls
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", float("-inf")])
+def test_non_finite_value_is_rejected(notified, value):
+    before = get_settings()
+    with pytest.raises(ValueError, match="finite"):
+        update_settings({"higher_temp": value})
+    assert get_settings() is before
+    assert load_settings() == before
+    assert notified == []
+
+
+def test_lower_temp_must_stay_below_higher_temp(notified):
+    before = get_settings()
+    with pytest.raises(ValueError, match="lower_temp must be below higher_temp"):
+        update_settings({"lower_temp": before["higher_temp"]})
+    assert get_settings() is before
+    assert notified == []
+
+
+def test_valid_update_is_saved_and_reaches_listeners(notified):
+    higher = get_settings()["higher_temp"] + 1
+    result = update_settings({"higher_temp": str(higher)})
+
+    assert result["higher_temp"] == higher
+    assert [call["higher_temp"] for call in notified] == [higher]
+    assert load_settings()["higher_temp"] == higher
+
+
+def test_settings_endpoint_reports_invalid_values(notified):
+    pytest.importorskip("flask")
+    from DbUI.ui import app
+    client = app.test_client()
+
+    response = client.post("/settings", json={"lower_temp": "nan"})
+    assert response.status_code == 400
+    assert "finite" in response.get_json()["message"]
+
+    response = client.post("/settings", json={"lower_temp": get_settings()["higher_temp"] + 5})
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "lower_temp must be below higher_temp"
+    assert notified == []
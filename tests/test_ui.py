@@ -0,0 +1,120 @@
+import re
+import pytest
+
+pytest.importorskip("flask")
+from flask import Flask
+from DbUI import ui
+from DbUI.ui import app
+from DbUI.auth import auth, enforce_session_expiration
+from DbUI.database import init_db, update_shutter_status
+from gpio.sensor_cache import sensor_cache
+
+
+@pytest.fixture
+def client(db_file):
+    init_db()
+    return app.test_client()
+
+
+def test_snapshot_etag(client):
+    first = client.get("/api/snapshot")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    unchanged = client.get("/api/snapshot", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.data == b""
+    assert unchanged.headers["ETag"] == etag
+
+    update_shutter_status("Slug Shutter", "open")
+    changed = client.get("/api/snapshot", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["devices"]["Slug Shutter"]["status"] == "open"
+
+
+def test_snapshot_etag_ignores_the_age_of_a_stale_sample(client, monkeypatch):
+    sensor_cache.publish({"temperature": 71.5, "humidity": 40.0})
+    monkeypatch.setattr(sensor_cache, "max_age", 0.0)  # already stale
+    try:
+        first = client.get("/api/snapshot")
+        assert first.get_json()["sensor"] == {"error": "Sensor sample is stale"}
+        assert first.get_json()["sensor_age"] > 0
+        again = client.get("/api/snapshot", headers={"If-None-Match": first.headers["ETag"]})
+        assert again.status_code == 304
+    finally:
+        sensor_cache.clear()
+
+
+SAMPLE_LINE = re.compile(
+    r'(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?P<labels>\{[a-zA-Z_][a-zA-Z0-9_]*="[^"]*"(,[a-zA-Z_][a-zA-Z0-9_]*="[^"]*")*\})?'
+    r' (?P<value>[-+]?(\d+(\.\d*)?([eE][-+]?\d+)?|Inf|NaN))'
+)
+
+
+def parse_exposition(text: str) -> dict:
+    """Return {metric family: (type, [(sample name, labels, value)])}, checking every line."""
+    families = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram")
+            families[name] = (kind, [])
+            continue
+        match = SAMPLE_LINE.fullmatch(line)
+        assert match, f"invalid exposition line: {line!r}"
+        name = match["name"]
+        family = next(f for f in (name, re.sub(r"_(bucket|sum|count)$", "", name)) if f in families)
+        families[family][1].append((name, match["labels"] or "", float(match["value"])))
+    return families
+
+
+def test_metrics_exposition_format(client):
+    assert client.get("/api/snapshot").status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    families = parse_exposition(response.get_data(as_text=True))
+
+    route = 'route="/api/snapshot",method="GET"'
+    kind, samples = families["farmpi_http_responses_total"]
+    assert kind == "counter"
+    responses = [value for _name, labels, value in samples if route in labels]
+    assert any(labels == "{" + route + ',status="200"}' for _name, labels, _value in samples)
+
+    kind, samples = families["farmpi_http_request_seconds"]
+    assert kind == "histogram"
+    buckets = [(labels, value) for name, labels, value in samples
+               if name.endswith("_bucket") and route in labels]
+    counts = [value for name, labels, value in samples if name.endswith("_count") and route in labels]
+    assert buckets[-1][0].endswith(',le="+Inf"}')
+    assert [value for _labels, value in buckets] == sorted(value for _labels, value in buckets)
+    # Every response was timed: the +Inf bucket, _count and the counter agree
+    assert counts == [buckets[-1][1]] == [sum(responses)]
+    assert counts[0] >= 1
+
+
+def test_metrics_access_rule(client, monkeypatch):
+    remote = {"REMOTE_ADDR": "192.0.2.10"}
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base=remote).status_code == 403
+    assert client.get("/metrics/hardware", environ_base=remote).status_code == 403
+
+    monkeypatch.setattr(ui, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/metrics", environ_base=remote,
+                      headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_login_check_lets_metrics_through():
+    auth_app = Flask(__name__)
+    auth_app.secret_key = "test"
+    auth_app.register_blueprint(auth, url_prefix="/auth")
+    with auth_app.test_request_context("/metrics"):
+        assert enforce_session_expiration() is None
+    with auth_app.test_request_context("/api/snapshot"):
+        assert enforce_session_expiration().status_code == 302